@@ -23,18 +23,38 @@ import re
 import datetime
 import sys
 import time
-import traceback
-import numpy as np
-from pathlib import Path
+import importlib.util
 from collections import defaultdict
+import profiling
+import solver_log
+import solver_params
 
-try:
-    from amplpy import AMPL, Environment
-    AMPL_AVAILABLE = True
-except ImportError:
-    AMPL_AVAILABLE = False
+# amplpy 在第一次求解时才导入 (见 solve_model)，这里只检查是否已安装，不加载AMPL库
+AMPL_AVAILABLE = importlib.util.find_spec("amplpy") is not None
+if not AMPL_AVAILABLE:
     print("警告: amplpy未安装。请运行: pip install amplpy")
 
+# 批量提取解时读取的后缀
+VARIABLE_SUFFIXES = ("val",)
+CONSTRAINT_SUFFIXES = ("dual", "slack")
+
+# 模型统计脚本 (一次 getOutput): 规模参数，以及每个实体在 _varname/_conname/_objname 中的起始序号。
+# 同一实体的实例连续排列，只在名称 (去掉 [...] 下标) 变化处输出一行，输出行数等于实体数
+_ENTITY_STARTS = (
+    'printf {{i in 1..{count}: i = 1}} "{tag} %d %s\\n", i, sub({names}[i], "[[].*", "");\n'
+    'printf {{i in 2..{count}: sub({names}[i], "[[].*", "") != sub({names}[i-1], "[[].*", "")}} '
+    '"{tag} %d %s\\n", i, sub({names}[i], "[[].*", "");\n'
+)
+MODEL_STATS_SCRIPT = (
+    'printf "STAT nvars %d\\nSTAT ncons %d\\nSTAT nobjs %d\\n", _nvars, _ncons, _nobjs;\n'
+    + _ENTITY_STARTS.format(count="_nvars", names="_varname", tag="VAR")
+    + _ENTITY_STARTS.format(count="_ncons", names="_conname", tag="CON")
+    + _ENTITY_STARTS.format(count="_nobjs", names="_objname", tag="OBJ")
+)
+# 求解器视角 (预处理后) 的规模: 变量、约束、二进制/整数变量和约束矩阵非零元数
+SOLVER_STATS_SCRIPT = ('printf "STAT snvars %d\\nSTAT sncons %d\\nSTAT snbvars %d\\nSTAT snivars %d\\n'
+                       'STAT snzcons %d\\n", _snvars, _sncons, _snbvars, _snivars, _snzcons;\n')
+
 class AMPLSolver:
     """
     AMPL模型求解器，生成完整且页面友好的LaTeX格式报告
@@ -44,13 +64,21 @@ class AMPLSolver:
     以及详细的结果分析和可视化。
     """
     
-    def __init__(self, model_filepath, data_filepath=None):
+    def __init__(self, model_filepath, data_filepath=None, profiler=None, ampl=None, params=None,
+                 model_loaded=False, data_loaded=False, scenario=None):
         """
         初始化AMPL求解器对象
         
         参数:
         model_filepath - AMPL模型文件(.mod)的路径
         data_filepath - AMPL数据文件(.dat)的路径，可选
+        profiler - 性能剖析器 (--profile 模式)，默认不记录
+        ampl - 复用已有的AMPL对象 (求解守护进程)，求解前会 reset，销毁时不关闭
+        params - 求解参数 (求解器驱动关键字 -> 值)，以 "<求解器>_options" 选项传给求解器
+        model_loaded - 传入的AMPL对象中已经读入了同一个模型 (批处理会话)，求解前只 reset data
+        data_loaded - 传入的AMPL对象中已经读入了模型和数据 (参数扫描会话)，求解前不 reset，
+                      上一次求解的变量值保留为初始点 (热启动)
+        scenario - 场景名称 (参数扫描)，加在日志和报告的文件名中
         
         这个初始化方法设置了求解器的基本属性，检查必要的库是否可用，并验证输入文件是否存在。
         它还初始化了存储求解结果、模型信息和格式化设置的多个数据结构。
@@ -60,17 +88,29 @@ class AMPLSolver:
         
         self.model_filepath = model_filepath  # 模型文件路径
         self.data_filepath = data_filepath    # 数据文件路径
-        self.ampl = None                      # AMPL环境对象
+        self.ampl = ampl                      # AMPL环境对象
+        self._owns_ampl = ampl is None
+        self.data_loaded = data_loaded and ampl is not None
+        self.model_loaded = (model_loaded or data_loaded) and ampl is not None
+        self.scenario = scenario              # 参数扫描的场景名称
         self.solve_status = None              # 求解状态
         self.objective_value = None           # 目标函数值
         self.solution = {}                    # 变量解值字典
         self.model_info = {}                  # 模型基本信息
         self.constraints_info = {}            # 约束信息
         self.variables_info = {}              # 变量信息
+        self.variable_arrays = {}             # 变量取值 (按列: 索引元组列表和 NumPy 数组)
+        self.constraint_arrays = {}           # 约束对偶值和松弛量 (按列)
         self.solve_time = 0                   # 求解时间
         self.solver_name = "auto"             # 求解器名称，默认为自动选择
         self.log_filepath = None              # 日志文件路径
+        self.log = solver_log.NULL_LOG        # 日志 (后台线程成批写入 log_filepath)
         self.var_prefix_counts = {}           # 存储每个变量前缀的计数信息，用于智能格式化
+        self.profiler = profiler or profiling.NULL_PROFILER  # 性能剖析器
+        self.solver_params = dict(params or {})  # 生效的求解参数 (例如 timelimit、mipgap)
+        self.race_result = None               # 求解器竞速结果 (race 模式)
+        self._ampl_pid = None                 # 正在求解的AMPL进程号 (供 kill() 使用)
+        self._killed = False                  # kill() 已被调用
         
         # 检查文件存在性
         if not os.path.exists(model_filepath):
@@ -78,23 +118,18 @@ class AMPLSolver:
         if data_filepath and not os.path.exists(data_filepath):
             raise FileNotFoundError(f"数据文件不存在: {data_filepath}")
     
-    def _log_message(self, message):
+    def _log_message(self, message, level=solver_log.INFO):
         """
         记录消息到日志文件
         
         参数:
         message - 要记录的消息文本
+        level - 日志级别 (solver_log.DEBUG/INFO/WARNING/ERROR)，低于 --log-level 的消息被忽略
         
-        这个方法负责将操作和错误信息记录到指定的日志文件中，附加时间戳以便于追踪。
-        它使用异常处理确保即使写入失败也不会中断主程序流程。
+        消息连同时间戳放入 solver_log 的内存队列，由后台线程成批写入日志文件，
+        调用方不再每条消息打开/关闭一次文件；写入失败也不会中断主程序流程。
         """
-        if self.log_filepath:
-            try:
-                with open(self.log_filepath, 'a', encoding='utf-8') as log_file:
-                    timestamp = datetime.datetime.now().strftime('%H:%M:%S')
-                    log_file.write(f"[{timestamp}] {message}\n")
-            except Exception as e:
-                print(f"写入日志失败: {e}")
+        self.log.log(level, message)
     
     def _analyze_variable_patterns(self, variables):
         """
@@ -281,32 +316,98 @@ class AMPLSolver:
         else:
             return self._escape_latex(var_name)
     
+    def _scenario_suffix(self):
+        """日志和报告文件名中的场景部分 (非字母数字字符替换为下划线)"""
+        if not self.scenario:
+            return ""
+        return "_" + re.sub(r"[^\w.-]+", "_", str(self.scenario)).strip("_")
+    
+    def _race_key(self):
+        """竞速记录的键: 模型文件名 (不含扩展名)"""
+        return os.path.splitext(os.path.basename(self.model_filepath))[0]
+    
+    def _race_options(self, solvers, options):
+        """各参赛求解器的驱动选项字符串: 会话中已有的 <求解器>_options、options 和求解参数 (线程数由竞速分配)"""
+        params = {k: v for k, v in self.solver_params.items() if k != 'threads'}
+        result = {}
+        for name in solvers:
+            option = f"{name}_options"
+            parts = []
+            try:
+                parts.append(self.ampl.getOption(option) or "")
+            except Exception:
+                pass
+            if options and option in options:
+                parts.append(str(options[option]))
+            parts.append(solver_params.ampl_options(name, params).get(option, ""))
+            result[name] = " ".join(part for part in parts if part)
+        return result
+    
+    def _race(self, solvers, options=None):
+        """
+        求解器竞速 (替代 ampl.solve())
+        
+        各求解器并行求解同一个 .nl 文件，线程数平均分配；最先得到确定结论的解读回AMPL会话，
+        获胜者记录到竞速历史并成为 self.solver_name。
+        """
+        import ampl_race
+        senses = [info['sense'] for info in self.model_info.get('objectives', {}).values()]
+        minimize = not senses or senses[0] == 'minimize'
+        time_limit = self.solver_params.get('timelimit')
+        deadline = float(time_limit) + 10 if time_limit is not None else None  # 留时间给求解器写出已有解
+        total_threads = self.solver_params.get('threads')
+        self.race_result = ampl_race.race(self.ampl, solvers, int(total_threads) if total_threads else None,
+                                          deadline, self._race_options(solvers, options), minimize,
+                                          stop=lambda: self._killed)
+        for entry in self.race_result.entries:
+            self._log_message(f"Race entry: {entry}")
+        if self.race_result.winner:
+            self.solver_name = self.race_result.winner
+            ampl_race.record_win(self._race_key(), self.race_result)
+            print(f"竞速获胜: {self.race_result.winner} ({self.race_result.seconds:.3f} 秒)")
+            print(self.race_result.winner_message)
+        else:
+            print("竞速失败: 没有求解器得到可用的解")
+    
+    def _process_id(self):
+        """AMPL进程号 (系统参数 _pid)，无法取得时返回 None"""
+        try:
+            return int(self.ampl.getValue("_pid"))
+        except Exception:
+            return None
+    
+    def kill(self):
+        """
+        从其他线程终止求解 (异步接口的超时和取消)
+        
+        竞速时结束竞速并杀掉各求解器子进程，已经得到的解仍会读回会话；否则杀掉AMPL进程，
+        正在进行的 solve() 随即出错返回，这个AMPL会话之后不能再使用。在求解开始前调用时不再开始求解。
+        """
+        self._killed = True
+        pid = self._ampl_pid
+        if pid is not None:
+            import signal
+            try:
+                os.kill(pid, getattr(signal, 'SIGKILL', signal.SIGTERM))
+            except OSError:
+                pass
+    
     def _detect_available_solvers(self):
-        """检测可用的求解器"""
-        available_solvers = []
-        test_solvers = ['gurobi', 'cplex', 'copt', 'highs', 'cbc', 'ipopt', 'bonmin']
+        """
+        检测可用的求解器
         
+        每个候选求解器都真正求解一个极小模型，结果按AMPL安装、PATH 和许可证文件的指纹
+        缓存在 cache/ampl_solvers.json (见 ampl_solvers.py)，环境不变时直接使用缓存。
+        """
         if self.ampl is None:
-            return available_solvers
-            
-        for solver in test_solvers:
-            try:
-                # 尝试设置求解器，如果可用则不会报错
-                original_solver = self.ampl.getOption('solver')
-                self.ampl.setOption('solver', solver)
-                
-                # 检查是否真的设置成功
-                current_solver = self.ampl.getOption('solver')
-                if current_solver == solver:
-                    available_solvers.append(solver)
-                
-                # 恢复原始设置
-                self.ampl.setOption('solver', original_solver)
-                
-            except Exception:
-                continue
-                
-        return available_solvers
+            return []
+        import ampl_solvers
+        try:
+            return ampl_solvers.available_solvers()
+        except Exception as e:
+            print(f"检测求解器失败: {e}")
+            self._log_message(f"Solver detection failed: {e}")
+            return []
     
     def solve_model(self, solver="auto", options=None):
         """
@@ -334,7 +435,16 @@ class AMPLSolver:
         """
         try:
             print("初始化AMPL环境...")
-            self.ampl = AMPL()
+            with self.profiler.span("env"):
+                if self.ampl is None:
+                    from amplpy import AMPL
+                    self.ampl = AMPL()
+                elif self.data_loaded:
+                    pass  # 参数扫描会话: 模型、数据 (已更新参数) 和上一次的解都保留
+                elif self.model_loaded:
+                    self.ampl.eval("reset data;")  # 批处理会话: 保留已读入的模型，只清除上一个实例的数据
+                else:
+                    self.ampl.reset()  # 复用守护进程中已启动的AMPL进程
             self.solver_name = solver
             
             # 配置求解器许可证路径
@@ -371,63 +481,90 @@ class AMPLSolver:
             # Include data file name in log filename if data file exists
             if self.data_filepath:
                 data_base_name = os.path.splitext(os.path.basename(self.data_filepath))[0]
-                log_name = f"{model_base_name}_{data_base_name}_ampl_log_{timestamp}.log"
+                log_name = f"{model_base_name}_{data_base_name}{self._scenario_suffix()}_ampl_log_{timestamp}.log"
             else:
-                log_name = f"{model_base_name}_ampl_log_{timestamp}.log"
+                log_name = f"{model_base_name}{self._scenario_suffix()}_ampl_log_{timestamp}.log"
             
             self.log_filepath = os.path.join(log_dir, log_name)
             
             # 初始化日志文件 (使用英文以避免编码问题)
-            try:
-                with open(self.log_filepath, 'w', encoding='utf-8') as log_file:
-                    log_file.write(f"AMPL Solving Log - {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                    log_file.write(f"Model File: {self.model_filepath}\n")
-                    if self.data_filepath:
-                        log_file.write(f"Data File: {self.data_filepath}\n")
-                    log_file.write(f"Solver: {solver}\n")
-                    log_file.write("=" * 60 + "\n\n")
+            self.log.close()
+            self.log = solver_log.open_log(self.log_filepath)
+            if self.log.enabled:
+                header = f"AMPL Solving Log - {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+                header += f"Model File: {self.model_filepath}\n"
+                if self.data_filepath:
+                    header += f"Data File: {self.data_filepath}\n"
+                if self.scenario:
+                    header += f"Scenario: {self.scenario}\n"
+                header += f"Solver: {solver}\n"
+                header += "=" * 60 + "\n\n"
+                self.log.write(header)
                 print(f"日志将保存到: {self.log_filepath}")
-            except Exception as e:
-                print(f"创建日志文件时出错: {e}")
             
             print(f"读取模型文件: {self.model_filepath}")
             self._log_message(f"Reading model file: {self.model_filepath}")
-            self.ampl.read(self.model_filepath)
-            self._log_message("Model file loaded successfully")
-            
-            # 如果有数据文件，读取数据
-            if self.data_filepath:
-                print(f"读取数据文件: {self.data_filepath}")
-                self._log_message(f"Reading data file: {self.data_filepath}")
-                self.ampl.readData(self.data_filepath)
-                self._log_message("Data file loaded successfully")
+            with self.profiler.span("read"):
+                if self.model_loaded:
+                    self._log_message("Model already loaded in session")
+                else:
+                    self.ampl.read(self.model_filepath)
+                    self._log_message("Model file loaded successfully")
+                
+                # 如果有数据文件，读取数据
+                if self.data_loaded:
+                    self._log_message("Data already loaded in session, keeping previous solution as starting point")
+                elif self.data_filepath:
+                    print(f"读取数据文件: {self.data_filepath}")
+                    self._log_message(f"Reading data file: {self.data_filepath}")
+                    self.ampl.readData(self.data_filepath)
+                    self._log_message("Data file loaded successfully")
             
             # 提取模型信息
             self._log_message("Starting model information extraction")
-            self._extract_model_info()
+            with self.profiler.span("model_info"):
+                self._extract_model_info()
             self._log_message(f"Model info extracted - Variables: {len(self.variables_info)}, Constraints: {len(self.constraints_info)}")
             
             # 分析变量模式
             variables = list(self.variables_info.keys())
             print("分析变量命名模式...")
             self._log_message("Analyzing variable naming patterns")
-            self._analyze_variable_patterns(variables)
+            with self.profiler.span("analyze_patterns"):
+                self._analyze_variable_patterns(variables)
             
             # 检测可用求解器
-            available_solvers = self._detect_available_solvers()
+            with self.profiler.span("detect_solvers"):
+                available_solvers = self._detect_available_solvers()
             print(f"检测到可用求解器: {available_solvers if available_solvers else '无'}")
             self._log_message(f"Available solvers detected: {available_solvers}")
             
             # 设置求解器
-            if solver == "auto":
+            race_solvers = []
+            if solver == "race" and available_solvers:
+                import ampl_race
+                race_solvers = ampl_race.candidates(available_solvers)
+                if len(race_solvers) < 2:
+                    print(f"可参与竞速的求解器不足两个 ({race_solvers})，改为自动选择")
+                    self._log_message(f"Not enough solvers to race: {race_solvers}")
+                    race_solvers = []
+            if race_solvers:
+                print(f"求解器竞速: {', '.join(race_solvers)}")
+                self._log_message(f"Racing solvers: {race_solvers}")
+            elif solver in ("auto", "race"):
                 if available_solvers:
-                    # 按优先级选择求解器 - 优先使用商业求解器（现在有许可证了）
-                    priority_solvers = ['gurobi', 'copt', 'cplex', 'highs', 'cbc']
-                    chosen_solver = None
-                    for pref_solver in priority_solvers:
-                        if pref_solver in available_solvers:
-                            chosen_solver = pref_solver
-                            break
+                    import ampl_race
+                    # 该模型有竞速记录时使用历史上获胜最多的求解器，
+                    # 否则按优先级选择 - 优先使用商业求解器（现在有许可证了）
+                    chosen_solver = ampl_race.preferred_solver(self._race_key(), available_solvers)
+                    if chosen_solver:
+                        print(f"根据竞速记录选择求解器: {chosen_solver}")
+                    else:
+                        priority_solvers = ['gurobi', 'copt', 'cplex', 'highs', 'cbc']
+                        for pref_solver in priority_solvers:
+                            if pref_solver in available_solvers:
+                                chosen_solver = pref_solver
+                                break
                     
                     if chosen_solver:
                         self.ampl.setOption('solver', chosen_solver)
@@ -443,7 +580,7 @@ class AMPLSolver:
                         self._log_message(f"Using available solver: {chosen_solver}")
                 else:
                     print("错误: 未检测到任何可用的求解器!")
-                    self._log_message("Error: No available solvers detected!")
+                    self._log_message("Error: No available solvers detected!", solver_log.ERROR)
                     print("\n解决方案:")
                     print("1. 安装求解器 (如 Gurobi, CPLEX, COPT, HiGHS)")
                     print("2. 确保求解器在 AMPL 中正确配置")
@@ -479,8 +616,17 @@ class AMPLSolver:
                     print(f"设置选项: {option} = {value}")
                     self._log_message(f"设置求解器选项: {option} = {value}")
             
+            # 设置求解参数 (参数方案和命令行覆盖参数)，与 options 中同名的驱动选项合并
+            # (竞速时参数随各求解器子进程的环境变量传入，见 _race_options)
+            if not race_solvers:
+                for option, value in solver_params.ampl_options(self.solver_name, self.solver_params).items():
+                    if options and option in options:
+                        value = f"{options[option]} {value}"
+                    self.ampl.setOption(option, value)
+                    print(f"设置选项: {option} = {value}")
+                    self._log_message(f"设置求解器选项: {option} = {value}")
+            
             # 记录求解时间
-            import time
             start_time = time.time()
             
             print("开始求解模型...")
@@ -493,9 +639,23 @@ class AMPLSolver:
             # 创建一个StringIO对象来捕获输出
             solver_output = io.StringIO()
             
+            # 记录AMPL进程号供 kill() 使用 (竞速时 kill() 结束的是各求解器子进程)；
+            # 先记录再检查，与 kill() 的先置位再读取配合，求解开始前的 kill() 不会丢失
+            self._ampl_pid = None if race_solvers else self._process_id()
+            if self._killed:
+                print("求解已被终止，不开始求解")
+                self._log_message("Solve killed before it started", solver_log.WARNING)
+                return False
+            
             # 使用contextlib重定向标准输出
-            with contextlib.redirect_stdout(solver_output):
-                self.ampl.solve()
+            try:
+                with contextlib.redirect_stdout(solver_output), self.profiler.span("solve"):
+                    if race_solvers:
+                        self._race(race_solvers, options)
+                    else:
+                        self.ampl.solve()
+            finally:
+                self._ampl_pid = None
             
             # 获取求解器输出
             output_text = solver_output.getvalue()
@@ -531,7 +691,7 @@ class AMPLSolver:
                         
             except Exception as e:
                 print(f"解析求解器输出时出错: {e}")
-                self._log_message(f"Error parsing solver output: {e}")
+                self._log_message(f"Error parsing solver output: {e}", solver_log.WARNING)
             
             self.solve_time = time.time() - start_time
             self._log_message(f"Solving completed, time elapsed: {self.solve_time:.3f} seconds")
@@ -543,16 +703,31 @@ class AMPLSolver:
                 self._log_message(f"Solve status: {solve_result} (code: {solve_result_num})")
             except Exception as e:
                 print(f"获取求解状态时出错: {e}")
-                self._log_message(f"Error getting solve status: {e}")
+                self._log_message(f"Error getting solve status: {e}", solver_log.WARNING)
                 solve_result = "unknown"
                 solve_result_num = -1
+            if self.race_result is not None:
+                # 竞速的解由 solution 命令读入，状态以获胜求解器的 .sol 文件为准
+                solve_result = self.race_result.solve_result
+            
+            with self.profiler.span("solver_stats"):
+                self._extract_solver_stats()
             
             print(f"求解完成，状态: {solve_result}")
             print(f"求解时间: {self.solve_time:.3f} 秒")
             
+            # 达到时间/节点限制 (limit) 或未能确认最优 (solved?) 时，只要求解器返回了可行解就照常提取，
+            # 状态记为 feasible (与 mps.py 中 SolCount > 0 的处理一致)。竞速的获胜者一定带有解
+            if self.race_result is not None:
+                feasible = self.race_result.winner is not None
+            else:
+                import ampl_race
+                feasible = (ampl_race.has_solution(int(solve_result_num))
+                            and re.search(r'objective\s+[-+]?(?:\d|\.\d)', output_text) is not None)
+            
             # 提取解
-            if solve_result in ["solved", "optimal"]:
-                self.solve_status = "optimal"
+            if solve_result in ["solved", "optimal"] or (solve_result in ["solved?", "limit"] and feasible):
+                self.solve_status = "optimal" if solve_result in ["solved", "optimal"] else "feasible"
                 self._log_message("Solving successful, starting solution extraction")
                 
                 # 获取目标函数值
@@ -569,7 +744,7 @@ class AMPLSolver:
                         self._log_message(f"目标函数值: {self.objective_value}")
                     except Exception as e1:
                         print(f"获取 _objective 失败: {e1}")
-                        self._log_message(f"Failed to get _objective: {e1}")
+                        self._log_message(f"Failed to get _objective: {e1}", solver_log.WARNING)
                         try:
                             # 尝试其他方式获取目标值
                             objectives = self.ampl.getObjectives()
@@ -612,11 +787,11 @@ class AMPLSolver:
                                                     self._log_message(f"无法从DataFrame提取目标函数值")
                                             except Exception as e3:
                                                 print(f"从DataFrame提取目标函数值失败: {e3}")
-                                                self._log_message(f"从DataFrame提取目标函数值失败: {e3}")
+                                                self._log_message(f"从DataFrame提取目标函数值失败: {e3}", solver_log.WARNING)
                                                 self.objective_value = None
                                     except Exception as e3:
                                         print(f"获取索引化目标函数值失败: {e3}")
-                                        self._log_message(f"获取索引化目标函数值失败: {e3}")
+                                        self._log_message(f"获取索引化目标函数值失败: {e3}", solver_log.WARNING)
                                         self.objective_value = None
                                 else:
                                     # 单个目标函数实例
@@ -637,7 +812,7 @@ class AMPLSolver:
                                 self.objective_value = None
                         except Exception as e2:
                             print(f"获取目标函数值失败: {e2}")
-                            self._log_message(f"获取目标函数值失败: {e2}")
+                            self._log_message(f"获取目标函数值失败: {e2}", solver_log.WARNING)
                             self.objective_value = None
                 
                 # 检查求解状态
@@ -647,258 +822,197 @@ class AMPLSolver:
                 except:
                     pass
                 
-                # 获取变量值 - 使用正确的AMPL API
+                # 批量提取变量值和约束对偶值/松弛量 (每个实体一次 getValues 调用)
                 print("提取变量值...")
-                for var_name in self.variables_info.keys():
-                    try:
-                        var = self.ampl.getVariable(var_name)
-                        if var is not None:
-                            print(f"  处理变量: {var_name} (实例数: {var.numInstances()})")
-                            
-                            if var.numInstances() == 0:
-                                print(f"    警告: 变量 {var_name} 没有实例")
-                                continue
-                            elif var.numInstances() == 1:
-                                # 标量变量
-                                try:
-                                    value = var.value()
-                                    self.solution[var_name] = float(value)
-                                    print(f"    标量变量 {var_name} = {value}")
-                                except Exception as e:
-                                    print(f"    标量变量获取失败: {e}")
-                            else:
-                                # 数组变量 - 使用正确的AMPL API
-                                try:
-                                    # 方法1：使用getValues()返回的DataFrame，然后转换为dict
-                                    var_df = var.getValues()
-                                    print(f"    获取到DataFrame类型: {type(var_df)}")
-                                    
-                                    # 正确遍历DataFrame
-                                    if hasattr(var_df, 'toDict'):
-                                        # 如果有toDict方法
-                                        values_dict = var_df.toDict()
-                                        for key, value in values_dict.items():
-                                            full_name = f"{var_name}[{key}]"
-                                            self.solution[full_name] = float(value)
-                                            print(f"    Dict变量 {full_name} = {value}")
-                                    elif hasattr(var_df, 'toPandas'):
-                                        # 如果有toPandas方法
-                                        pandas_df = var_df.toPandas()
-                                        print(f"    转换为Pandas: {pandas_df}")
-                                        for index, row in pandas_df.iterrows():
-                                            if len(pandas_df.columns) >= 2:
-                                                key = row.iloc[0]  # 第一列是索引
-                                                value = row.iloc[1]  # 第二列是值
-                                                full_name = f"{var_name}[{key}]"
-                                                self.solution[full_name] = float(value)
-                                                print(f"    Pandas变量 {full_name} = {value}")
-                                    else:
-                                        # 直接遍历DataFrame
-                                        print(f"    尝试直接遍历DataFrame...")
-                                        for row in var_df:
-                                            print(f"    DataFrame行: {row}, 类型: {type(row)}")
-                                            if hasattr(row, '__len__') and len(row) >= 2:
-                                                key = row[0]
-                                                value = row[1]
-                                                full_name = f"{var_name}[{key}]"
-                                                self.solution[full_name] = float(value)
-                                                print(f"    Row变量 {full_name} = {value}")
-                                        
-                                except Exception as e1:
-                                    print(f"    DataFrame方法失败: {e1}")
-                                    try:
-                                        # 方法2：通过索引集合逐个获取值
-                                        print(f"    尝试通过集合获取索引...")
-                                        
-                                        # 获取所有集合
-                                        sets = self.ampl.getSets()
-                                        print(f"    可用集合: {list(sets.keys())}")
-                                        
-                                        # 查找变量对应的索引集合
-                                        index_set = None
-                                        for set_name, set_obj in sets.items():
-                                            if set_name in ['PRODUCTS', 'ITEMS', 'FACTORIES', 'MARKETS', 'J', 'I']:
-                                                index_set = set_obj
-                                                set_name_used = set_name
-                                                break
-                                        
-                                        if index_set is not None:
-                                            print(f"    使用集合: {set_name_used}")
-                                            set_values = list(index_set.getValues())
-                                            print(f"    集合值: {set_values}")
-                                            
-                                            for index_value in set_values:
-                                                try:
-                                                    # 使用get方法获取特定索引的值
-                                                    var_instance = var.get(index_value)
-                                                    if var_instance is not None:
-                                                        value = var_instance.value()
-                                                        full_name = f"{var_name}[{index_value}]"
-                                                        self.solution[full_name] = float(value)
-                                                        print(f"    集合变量 {full_name} = {value}")
-                                                    else:
-                                                        print(f"    无法获取变量实例: {var_name}[{index_value}]")
-                                                except Exception as e:
-                                                    print(f"    获取索引 {index_value} 失败: {e}")
-                                        else:
-                                            print(f"    未找到合适的索引集合")
-                                            
-                                    except Exception as e2:
-                                        print(f"    集合方法也失败: {e2}")
-                                        
-                                        # 方法3：使用AMPL命令直接查询
-                                        try:
-                                            print(f"    尝试使用AMPL命令直接查询...")
-                                            
-                                            # 使用display命令显示变量
-                                            self.ampl.eval(f"display {var_name};")
-                                            
-                                            # 尝试使用getValue获取具体值
-                                            # 首先获取索引范围
-                                            sets = self.ampl.getSets()
-                                            for set_name in ['PRODUCTS', 'ITEMS', 'FACTORIES', 'MARKETS']:
-                                                if set_name in sets:
-                                                    index_set = sets[set_name]
-                                                    for index_val in index_set.getValues():
-                                                        try:
-                                                            # 直接查询变量值
-                                                            query = f"{var_name}['{index_val}']"
-                                                            value = self.ampl.getValue(query)
-                                                            full_name = f"{var_name}[{index_val}]"
-                                                            self.solution[full_name] = float(value)
-                                                            print(f"    查询变量 {full_name} = {value}")
-                                                        except Exception as e:
-                                                            print(f"    查询 {query} 失败: {e}")
-                                                    break
-                                            
-                                        except Exception as e3:
-                                            print(f"    AMPL命令方法也失败: {e3}")
-                                            
-                                            # 方法4：使用官方文档建议的方式
-                                            try:
-                                                print(f"    尝试官方API方式...")
-                                                # 获取solve_result确认求解成功
-                                                if hasattr(self.ampl, 'solve_result'):
-                                                    solve_result = self.ampl.solve_result
-                                                    print(f"    求解结果: {solve_result}")
-                                                
-                                                # 使用get_value方法获取变量
-                                                sets = self.ampl.getSets()
-                                                for set_name in ['PRODUCTS', 'ITEMS', 'FACTORIES', 'MARKETS']:
-                                                    if set_name in sets:
-                                                        index_set = sets[set_name]
-                                                        for index_val in index_set.getValues():
-                                                            try:
-                                                                # 使用官方API方式
-                                                                value = self.ampl.get_value(f"{var_name}['{index_val}']")
-                                                                full_name = f"{var_name}[{index_val}]"
-                                                                self.solution[full_name] = float(value)
-                                                                print(f"    官方API变量 {full_name} = {value}")
-                                                            except Exception as e:
-                                                                print(f"    官方API获取 {index_val} 失败: {e}")
-                                                        break
-                                                        
-                                            except Exception as e4:
-                                                print(f"    官方API方法也失败: {e4}")
-                                        
-                    except Exception as e:
-                        print(f"获取变量 {var_name} 时出错: {e}")
-                        continue
+                with self.profiler.span("extract_solution"):
+                    self._extract_solution()
                 
-                print(f"最优目标值: {self.objective_value}")
-                
-                # 安全地处理变量值统计
-                try:
-                    # 确保所有值都是数字类型
-                    valid_solution = {}
-                    for k, v in self.solution.items():
-                        try:
-                            if isinstance(v, (int, float)):
-                                valid_solution[k] = float(v)
-                            elif hasattr(v, 'value'):
-                                # 如果是AMPL对象，获取其值
-                                valid_solution[k] = float(v.value())
-                            else:
-                                # 尝试转换为float
-                                valid_solution[k] = float(v)
-                        except (ValueError, TypeError, AttributeError):
-                            print(f"    警告: 跳过无效变量值 {k} = {v} (类型: {type(v)})")
-                            continue
-                    
-                    # 更新solution字典
-                    self.solution = valid_solution
-                    
-                    nonzero_vars = {k: v for k, v in self.solution.items() if abs(v) > 1e-12}
-                    print(f"非零变量: {len(nonzero_vars)}/{len(self.solution)}")
-                    
-                    if nonzero_vars:
-                        print("非零变量列表:")
-                        for var_name, value in sorted(nonzero_vars.items()):
-                            print(f"   {var_name} = {value}")
-                    else:
-                        if len(self.solution) > 0:
-                            print("所有变量值都接近零")
-                        else:
-                            print("没有成功提取到任何变量值")
-                            
-                except Exception as e:
-                    print(f"处理变量值时出错: {e}")
-                    print(f"    Solution内容: {self.solution}")
+                print(f"{'最优' if self.solve_status == 'optimal' else '当前可行解的'}目标值: {self.objective_value}")
                 
                 return True
             else:
                 self.solve_status = solve_result
                 print(f"求解失败: {solve_result}")
-                self._log_message(f"求解失败: {solve_result}")
+                self._log_message(f"求解失败: {solve_result}", solver_log.WARNING)
                 return False
                 
         except Exception as e:
             print(f"求解过程发生错误: {e}")
-            self._log_message(f"求解过程发生错误: {e}")
+            self._log_message(f"求解过程发生错误: {e}", solver_log.ERROR)
             import traceback
             traceback.print_exc()
-            self._log_message(f"错误堆栈: {traceback.format_exc()}")
+            self._log_message(f"错误堆栈: {traceback.format_exc()}", solver_log.ERROR)
             return False
+        finally:
+            self.log.flush()  # 返回时日志文件已完整 (批处理结果中引用了日志路径)
+    
+    @staticmethod
+    def _entity_arrays(entity, suffixes):
+        """
+        一次调用 getValues 取出某个变量/约束所有实例的指定后缀值
+
+        返回:
+        (键列表: 每个实例的索引元组，标量实体为空元组; {后缀: NumPy 数组})
+        """
+        import numpy as np
+        df = entity.getValues(list(suffixes))
+        headers = list(df.getHeaders())
+        num_indices = df.getNumIndices()
+        if num_indices:
+            keys = list(zip(*(list(df.getColumn(header)) for header in headers[:num_indices])))
+        else:
+            keys = [()] * df.getNumRows()
+        columns = {suffix: np.asarray(list(df.getColumn(header)), dtype=float)
+                   for suffix, header in zip(suffixes, headers[num_indices:])}
+        return keys, columns
+    
+    @staticmethod
+    def _instance_names(name, keys):
+        """实例名称: 标量为 name，索引实体为 name[i,j] (整数值的浮点索引去掉 .0)"""
+        if len(keys) == 1 and keys[0] == ():
+            return [name]
+        def fmt(value):
+            return str(int(value)) if isinstance(value, float) and value.is_integer() else str(value)
+        return [f"{name}[{','.join(fmt(v) for v in key)}]" for key in keys]
+    
+    def _extract_solution(self):
+        """
+        批量提取变量值以及约束的对偶值和松弛量
+        
+        每个变量/约束只调用一次 getValues，结果按列保存为 NumPy 数组，键保存为索引元组列表:
+        self.variable_arrays[变量名] = {'keys': [...], 'val': 数组}
+        self.constraint_arrays[约束名] = {'keys': [...], 'dual': 数组, 'slack': 数组}
+        报告使用的 self.solution ("名称[索引]" -> 值) 由数组一次性构建，不再逐个打印取值。
+        """
+        import numpy as np
+        self.variable_arrays = {}
+        self.constraint_arrays = {}
+        failed = []
+        for var_name in self.variables_info:
+            try:
+                keys, columns = self._entity_arrays(self.ampl.getVariable(var_name), VARIABLE_SUFFIXES)
+            except Exception as e:
+                failed.append(f"变量 {var_name} ({e})")
+                continue
+            self.variable_arrays[var_name] = dict(columns, keys=keys)
+            self.solution.update(zip(self._instance_names(var_name, keys), columns['val'].tolist()))
+            if self.log.debug_enabled:
+                self.log.debug("变量 %s: %d 个实例, 非零 %d 个", var_name, len(keys),
+                               int(np.count_nonzero(np.abs(columns['val']) > 1e-12)))
+        for cons_name in self.constraints_info:
+            try:
+                keys, columns = self._entity_arrays(self.ampl.getConstraint(cons_name), CONSTRAINT_SUFFIXES)
+            except Exception as e:
+                failed.append(f"约束 {cons_name} ({e})")
+                continue
+            self.constraint_arrays[cons_name] = dict(columns, keys=keys)
+        
+        nonzero = sum(int(np.count_nonzero(np.abs(arrays['val']) > 1e-12))
+                      for arrays in self.variable_arrays.values())
+        num_rows = sum(len(arrays['keys']) for arrays in self.constraint_arrays.values())
+        print(f"已提取 {len(self.variable_arrays)} 个变量的 {len(self.solution)} 个取值 (非零 {nonzero} 个), "
+              f"{len(self.constraint_arrays)} 个约束的 {num_rows} 个对偶值/松弛量")
+        self._log_message(f"提取解: 变量值 {len(self.solution)} 个, 非零 {nonzero} 个, 约束行 {num_rows} 个")
+        if failed:
+            print(f"警告: {len(failed)} 个实体提取失败: {'; '.join(failed[:5])}"
+                  + (" ..." if len(failed) > 5 else ""))
+    
+    @staticmethod
+    def _entity_starts(output, tag):
+        """解析 "<tag> 起始序号 名称" 行，返回 {实体名: 实例数} (按 AMPL 内部顺序)"""
+        starts = []
+        total = None
+        for line in output.splitlines():
+            parts = line.split()
+            if len(parts) == 3 and parts[0] == tag:
+                starts.append((int(parts[1]), parts[2]))
+            elif len(parts) == 3 and parts[0] == "STAT" and parts[1] == f"n{tag.lower()}s":
+                total = int(parts[2])
+        starts.sort()
+        counts = {}
+        for (index, name), (next_index, _) in zip(starts, starts[1:] + [((total or 0) + 1, None)]):
+            counts[name] = counts.get(name, 0) + next_index - index
+        return counts
+    
+    @staticmethod
+    def _parse_declarations(output):
+        """从 show 输出中解析变量类型和目标方向: {名称: 'binary'/'integer'/'continuous'/'minimize'/'maximize'}"""
+        kinds = {}
+        for match in re.finditer(r'^(var|minimize|maximize)\s+([A-Za-z_][\w.]*)(.*?);\s*$', output, re.M | re.S):
+            keyword, name, body = match.groups()
+            if keyword != "var":
+                kinds[name] = keyword
+            elif re.search(r'\bbinary\b', body):
+                kinds[name] = 'binary'
+            elif re.search(r'\binteger\b', body):
+                kinds[name] = 'integer'
+            else:
+                kinds[name] = 'continuous'
+        return kinds
     
     def _extract_model_info(self):
-        """提取模型结构信息"""
+        """
+        提取模型结构信息
+        
+        不再逐个实体调用 numInstances: 一次 getOutput 取得 _nvars/_ncons/_nobjs 以及
+        _varname/_conname/_objname 中每个实体的起始序号 (同一实体的实例连续排列，相邻起始序号之差即实例数)，
+        再用一次 show 取得各实体的声明，解析变量类型 (binary/integer) 和目标方向。
+        往返次数与实体数量无关。
+        """
         try:
-            # 获取变量信息
-            variables = self.ampl.getVariables()
-            for var_name, var in variables:
-                var_info = {
-                    'type': 'continuous',  # AMPL默认
-                    'bounds': {},
-                    'instances': var.numInstances()
-                }
-                self.variables_info[var_name] = var_info
+            output = self.ampl.getOutput(MODEL_STATS_SCRIPT)
+            var_counts = self._entity_starts(output, "VAR")
+            con_counts = self._entity_starts(output, "CON")
+            obj_counts = self._entity_starts(output, "OBJ")
+            names = list(var_counts) + list(obj_counts)
+            kinds = self._parse_declarations(self.ampl.getOutput(f"show {', '.join(names)};")) if names else {}
             
-            # 获取约束信息
-            constraints = self.ampl.getConstraints()
-            for cons_name, cons in constraints:
-                cons_info = {
-                    'type': 'constraint',
-                    'instances': cons.numInstances()
-                }
-                self.constraints_info[cons_name] = cons_info
-            
-            # 获取目标函数信息
-            objectives = self.ampl.getObjectives()
-            obj_info = {}
-            for obj_name, obj in objectives:
-                obj_info[obj_name] = {
-                    'sense': 'minimize',  # 默认值，可能需要进一步检测
-                }
+            self.variables_info = {name: {'type': kinds.get(name, 'continuous'), 'bounds': {}, 'instances': count}
+                                   for name, count in var_counts.items()}
+            self.constraints_info = {name: {'type': 'constraint', 'instances': count}
+                                     for name, count in con_counts.items()}
+            obj_info = {name: {'sense': kinds.get(name, 'minimize'), 'instances': count}
+                        for name, count in obj_counts.items()}
             self.model_info['objectives'] = obj_info
             
+            type_counts = defaultdict(int)
+            for info in self.variables_info.values():
+                type_counts[info['type']] += info['instances']
+            self.model_info['stats'] = {
+                'variables': sum(var_counts.values()),
+                'constraints': sum(con_counts.values()),
+                'objectives': sum(obj_counts.values()),
+                'binary': type_counts['binary'],
+                'integer': type_counts['integer'],
+                'continuous': type_counts['continuous'],
+            }
+            
             print(f"模型信息提取完成:")
-            print(f"  变量: {len(self.variables_info)}")
-            print(f"  约束: {len(self.constraints_info)}")
-            print(f"  目标函数: {len(obj_info)}")
+            print(f"  变量: {len(self.variables_info)} 类 {self.model_info['stats']['variables']} 个 "
+                  f"(二进制 {type_counts['binary']}, 整数 {type_counts['integer']})")
+            print(f"  约束: {len(self.constraints_info)} 类 {self.model_info['stats']['constraints']} 个")
+            print(f"  目标函数: {len(obj_info)}"
+                  + (f" ({', '.join(info['sense'] for info in obj_info.values())})" if obj_info else ""))
             
         except Exception as e:
             print(f"提取模型信息时出错: {e}")
     
+    def _extract_solver_stats(self):
+        """求解后一次取得求解器视角 (预处理后) 的规模和非零元数，存入 model_info['solver_stats']"""
+        try:
+            output = self.ampl.getOutput(SOLVER_STATS_SCRIPT)
+        except Exception as e:
+            self._log_message(f"Failed to get solver statistics: {e}", solver_log.WARNING)
+            return
+        stats = {}
+        for line in output.splitlines():
+            parts = line.split()
+            if len(parts) == 3 and parts[0] == "STAT":
+                stats[parts[1]] = int(float(parts[2]))
+        if stats.get('snvars'):
+            self.model_info['solver_stats'] = stats
+            self._log_message(f"Solver statistics: {stats}")
+    
     def _build_model_summary_latex(self):
         """构建模型摘要的LaTeX"""
         latex = "\\section{模型摘要}\n\n"
@@ -906,6 +1020,9 @@ class AMPLSolver:
         # 统计信息
         total_vars = sum(info['instances'] for info in self.variables_info.values())
         total_constraints = sum(info['instances'] for info in self.constraints_info.values())
+        stats = self.model_info.get('stats', {})
+        solver_stats = self.model_info.get('solver_stats')
+        objectives = self.model_info.get('objectives', {})
         
         latex += "\\subsection{基本统计}\n"
         latex += "\\begin{table}[h!]\n\\centering\n"
@@ -915,7 +1032,18 @@ class AMPLSolver:
         latex += f"变量实例总数 & {total_vars} \\\\\n"
         latex += f"约束类型数 & {len(self.constraints_info)} \\\\\n"
         latex += f"约束实例总数 & {total_constraints} \\\\\n"
-        latex += f"目标函数数 & {len(self.model_info.get('objectives', {}))} \\\\\n"
+        latex += f"其中二进制变量 & {stats.get('binary', 0)} \\\\\n"
+        latex += f"其中整数变量 & {stats.get('integer', 0)} \\\\\n"
+        latex += f"目标函数数 & {len(objectives)} \\\\\n"
+        for obj_name, info in objectives.items():
+            sense = "最小化" if info['sense'] == 'minimize' else "最大化"
+            latex += f"目标 \\texttt{{{self._escape_latex(obj_name)}}} & {sense} \\\\\n"
+        if solver_stats:
+            latex += "\\midrule\n"
+            latex += f"求解器视角变量数 (预处理后) & {solver_stats.get('snvars', 0)} \\\\\n"
+            latex += f"求解器视角约束数 (预处理后) & {solver_stats.get('sncons', 0)} \\\\\n"
+            latex += f"二进制/整数变量 (预处理后) & {solver_stats.get('snbvars', 0)} / {solver_stats.get('snivars', 0)} \\\\\n"
+            latex += f"约束矩阵非零元 & {solver_stats.get('snzcons', 0)} \\\\\n"
         latex += "\\bottomrule\n\\end{tabular}\n"
         latex += "\\caption{模型规模统计}\n\\end{table}\n\n"
         
@@ -953,80 +1081,88 @@ class AMPLSolver:
         
         return latex
     
+    def _solution_arrays(self):
+        """
+        把解拼接为一个数组，并给每个取值一个前缀编号 (变量名开头的字母和下划线，与报告的分组一致)
+
+        返回:
+        (取值数组, 前缀编号数组, 前缀列表)；没有前缀的变量编号为 -1
+        """
+        import numpy as np
+        arrays = self.variable_arrays or {name: {'val': np.array([value], dtype=float)}
+                                          for name, value in self.solution.items()}
+        prefixes = {}
+        codes = []
+        columns = []
+        for var_name, entity in arrays.items():
+            base_match = re.match(r"([a-zA-Z_]+)", var_name)
+            code = prefixes.setdefault(base_match.group(1), len(prefixes)) if base_match else -1
+            columns.append(np.asarray(entity['val'], dtype=float))
+            codes.append(np.full(len(columns[-1]), code, dtype=np.int64))
+        if not columns:
+            return np.zeros(0), np.zeros(0, dtype=np.int64), []
+        return np.concatenate(columns), np.concatenate(codes), list(prefixes)
+    
     def _analyze_solution_structure(self):
-        """分析解的结构"""
+        """
+        分析解的结构
+        
+        全部统计量由 NumPy 归约一次算出: 非零掩码、均值/标准差/最值，以及按前缀编号用
+        bincount 分组的数量、均值和标准差，不再逐个变量转换类型和匹配正则表达式。
+        """
         if not self.solution:
             return "\\subsection{解的统计特征}\n解信息未成功提取，可能是变量值获取过程中出现问题。\n\n"
         
+        import numpy as np
         analysis = ""
         
-        # 安全地处理变量值，确保都是数字
         try:
-            numeric_values = []
-            for v in self.solution.values():
-                try:
-                    if isinstance(v, (int, float)):
-                        numeric_values.append(float(v))
-                    elif hasattr(v, 'value'):
-                        numeric_values.append(float(v.value()))
-                    else:
-                        numeric_values.append(float(v))
-                except (ValueError, TypeError, AttributeError):
-                    continue
-            
-            nonzero_values = [v for v in numeric_values if abs(v) > 1e-12]
-            
+            values, codes, prefixes = self._solution_arrays()
+            finite = np.isfinite(values)
+            values, codes = values[finite], codes[finite]
+            nonzero = np.abs(values) > 1e-12
+            nonzero_values = values[nonzero]
         except Exception as e:
             return f"\\subsection{{解的统计特征}}\n处理解数据时出错: {self._escape_latex(str(e))}。\n\n"
         
-        if nonzero_values:
+        if nonzero_values.size:
             analysis += "\\subsection{解的统计特征}\n"
             analysis += "\\begin{itemize}\n"
-            analysis += f"\\item 总变量数量: {len(numeric_values)}\n"
-            analysis += f"\\item 非零变量数量: {len(nonzero_values)}\n"
-            analysis += f"\\item 非零变量比例: {len(nonzero_values)/len(numeric_values)*100:.1f}\\%\n"
-            analysis += f"\\item 非零变量平均值: {np.mean(nonzero_values):.6g}\n"
-            analysis += f"\\item 非零变量标准差: {np.std(nonzero_values):.6g}\n"
-            analysis += f"\\item 最大变量值: {max(nonzero_values):.6g}\n"
-            analysis += f"\\item 最小非零变量值: {min(nonzero_values):.6g}\n"
+            analysis += f"\\item 总变量数量: {values.size}\n"
+            analysis += f"\\item 非零变量数量: {nonzero_values.size}\n"
+            analysis += f"\\item 非零变量比例: {nonzero_values.size/values.size*100:.1f}\\%\n"
+            analysis += f"\\item 非零变量平均值: {nonzero_values.mean():.6g}\n"
+            analysis += f"\\item 非零变量标准差: {nonzero_values.std():.6g}\n"
+            analysis += f"\\item 最大变量值: {nonzero_values.max():.6g}\n"
+            analysis += f"\\item 最小非零变量值: {nonzero_values.min():.6g}\n"
             analysis += "\\end{itemize}\n\n"
             
-            # 按变量前缀分组统计
-            prefix_stats = defaultdict(list)
-            for var_name, value in self.solution.items():
-                try:
-                    if isinstance(value, (int, float)):
-                        numeric_value = float(value)
-                    elif hasattr(value, 'value'):
-                        numeric_value = float(value.value())
-                    else:
-                        numeric_value = float(value)
-                    
-                    if abs(numeric_value) > 1e-12:
-                        base_match = re.match(r"([a-zA-Z_]+)", var_name)
-                        if base_match:
-                            prefix = base_match.group(1)
-                            prefix_stats[prefix].append(numeric_value)
-                            
-                except (ValueError, TypeError, AttributeError):
-                    continue
+            # 按变量前缀分组统计 (bincount 按前缀编号求数量、和与离差平方和)
+            group_codes = codes[nonzero]
+            has_prefix = group_codes >= 0
+            group_codes, group_values = group_codes[has_prefix], nonzero_values[has_prefix]
+            counts = np.bincount(group_codes, minlength=len(prefixes))
+            means = np.bincount(group_codes, weights=group_values, minlength=len(prefixes)) / np.maximum(counts, 1)
+            deviations = group_values - means[group_codes]
+            stds = np.sqrt(np.bincount(group_codes, weights=deviations * deviations, minlength=len(prefixes))
+                           / np.maximum(counts, 1))
+            present = [i for i in range(len(prefixes)) if counts[i] > 0]
             
-            if len(prefix_stats) > 1:
+            if len(present) > 1:
                 analysis += "\\subsection{按变量类型统计}\n"
                 analysis += "\\begin{table}[h!]\n\\centering\n"
                 analysis += "\\begin{tabular}{llll}\n\\toprule\n"
                 analysis += "\\textbf{变量类型} & \\textbf{非零数量} & \\textbf{平均值} & \\textbf{标准差} \\\\\n\\midrule\n"
                 
-                for prefix in sorted(prefix_stats.keys()):
-                    values = prefix_stats[prefix]
-                    escaped_prefix = self._escape_latex(prefix)
-                    analysis += f"\\texttt{{{escaped_prefix}}} & {len(values)} & {np.mean(values):.4g} & {np.std(values):.4g} \\\\\n"
+                for i in sorted(present, key=lambda i: prefixes[i]):
+                    escaped_prefix = self._escape_latex(prefixes[i])
+                    analysis += f"\\texttt{{{escaped_prefix}}} & {counts[i]} & {means[i]:.4g} & {stds[i]:.4g} \\\\\n"
                 
                 analysis += "\\bottomrule\n\\end{tabular}\n"
                 analysis += "\\caption{按变量类型的解统计}\n\\end{table}\n\n"
         else:
             analysis += "\\subsection{解的统计特征}\n"
-            analysis += f"检测到 {len(numeric_values)} 个变量，但所有变量值都接近零（< 1e-12）。\n\n"
+            analysis += f"检测到 {values.size} 个变量，但所有变量值都接近零（< 1e-12）。\n\n"
         
         return analysis
     
@@ -1058,9 +1194,9 @@ class AMPLSolver:
             # Include data file name in report filename if data file exists
             if self.data_filepath:
                 data_base_name = os.path.splitext(os.path.basename(self.data_filepath))[0]
-                report_name = f"{model_base_name}_{data_base_name}_AMPL_REPORT.tex"
+                report_name = f"{model_base_name}_{data_base_name}{self._scenario_suffix()}_AMPL_REPORT.tex"
             else:
-                report_name = f"{model_base_name}_AMPL_REPORT.tex"
+                report_name = f"{model_base_name}{self._scenario_suffix()}_AMPL_REPORT.tex"
             
             output_filepath = os.path.join(tex_reports_dir, report_name)
         
@@ -1073,6 +1209,8 @@ class AMPLSolver:
             title_suffix = f" + {data_name}"
         else:
             title_suffix = ""
+        if self.scenario:
+            title_suffix += f" ({self._escape_latex(self.scenario)})"
         
         latex_content = f"""\\documentclass[a4paper,11pt]{{article}}
 \\usepackage[UTF8]{{ctex}}
@@ -1120,6 +1258,8 @@ class AMPLSolver:
         
         if self.data_filepath:
             latex_content += f"数据文件 & \\texttt{{{self._escape_latex(os.path.basename(self.data_filepath))}}} \\\\\n"
+        if self.scenario:
+            latex_content += f"扫描场景 & {self._escape_latex(self.scenario)} \\\\\n"
         
         latex_content += f"""求解器 & {self._escape_latex(self.solver_name)} \\\\
 建模语言 & AMPL \\\\
@@ -1138,15 +1278,18 @@ class AMPLSolver:
 """
         
         # 添加模型摘要
-        latex_content += self._build_model_summary_latex()
+        with self.profiler.span("report.summary"):
+            latex_content += self._build_model_summary_latex()
         
         # 求解结果
         latex_content += "\\section{求解结果}\n\n"
         
-        if self.solve_status == "optimal":
-            latex_content += f"""\\subsection{{最优解}}
+        if self.solve_status in ("optimal", "feasible"):
+            title = "最优解" if self.solve_status == "optimal" else "可行解"
+            status_text = "最优解" if self.solve_status == "optimal" else "可行解 (达到求解限制，未证明最优)"
+            latex_content += f"""\\subsection{{{title}}}
 \\begin{{itemize}}
-\\item \\textbf{{求解状态:}} \\textcolor{{green}}{{最优解}}
+\\item \\textbf{{求解状态:}} \\textcolor{{green}}{{{status_text}}}
 \\item \\textbf{{求解器:}} {self._escape_latex(self.solver_name)}
 \\item \\textbf{{求解时间:}} {self.solve_time:.3f} 秒
 """
@@ -1184,11 +1327,13 @@ class AMPLSolver:
             # 临时更新solution用于分析
             original_solution = self.solution
             self.solution = valid_solution
-            solution_analysis = self._analyze_solution_structure()
+            with self.profiler.span("report.analysis"):
+                solution_analysis = self._analyze_solution_structure()
             self.solution = original_solution
             latex_content += solution_analysis
             
             # 变量值表格
+            table_span = self.profiler.begin("report.solution")
             if nonzero_solution:
                 latex_content += """\\subsection{非零变量值}
 \\begin{longtable}{p{3.5cm}@{\\hspace{0.5em}}r@{\\hspace{0.8em}}p{2.5cm}}
@@ -1251,6 +1396,7 @@ class AMPLSolver:
                     latex_content += "\\item 变量索引格式不匹配\n"
                     latex_content += "\\item API调用方式不正确\n"
                     latex_content += "\\end{itemize}\n\n"
+            self.profiler.end(table_span)
         else:
             status_text = self._escape_latex(str(self.solve_status))
             latex_content += f"\\textbf{{求解状态:}} \\textcolor{{red}}{{{status_text}}}\n\n"
@@ -1279,22 +1425,67 @@ class AMPLSolver:
         except Exception as e:
             latex_content += f"无法读取模型文件内容: {self._escape_latex(str(e))}\n\n"
         
+        latex_content += solver_params.to_latex(self.solver_params)
+        if self.race_result is not None:
+            latex_content += self.race_result.to_latex(self._escape_latex)
+        latex_content += self.profiler.to_latex()
         latex_content += "\\end{document}"
         
-        with open(output_filepath, 'w', encoding='utf-8') as f:
-            f.write(latex_content)
+        with self.profiler.span("write"):
+            with open(output_filepath, 'w', encoding='utf-8') as f:
+                f.write(latex_content)
         
         print(f"已生成求解报告: {output_filepath}")
         return output_filepath
     
+    def export_solution(self, formats=None, output_dir=None):
+        """
+        把解导出为机器可读格式 (.sol、非零取值 CSV、.solbin，见 solution_export.py)
+        
+        文件名与报告一致 (模型名、数据文件名和场景名)，变量名为 "名称[索引]" 形式。
+        
+        参数:
+        formats - 格式列表，默认全部格式
+        output_dir - 输出目录，默认 solution_exports/
+        
+        返回:
+        写出的文件路径列表，没有解时为空列表
+        """
+        if not self.solution:
+            print("没有可导出的解。")
+            return []
+        import solution_export
+        formats = solution_export.FORMATS if formats is None else formats
+        output_dir = solution_export.DEFAULT_DIR if output_dir is None else output_dir
+        base_name = os.path.splitext(os.path.basename(self.model_filepath))[0]
+        if self.data_filepath:
+            base_name += "_" + os.path.splitext(os.path.basename(self.data_filepath))[0]
+        base_name += self._scenario_suffix()
+        return solution_export.export(self.solution, os.path.join(output_dir, f"{base_name}_AMPL"), formats,
+                                      objective=self.objective_value)
+    
     def __del__(self):
         """清理AMPL资源"""
         try:
-            if hasattr(self, 'ampl') and self.ampl is not None:
+            self.log.close()
+            if hasattr(self, 'ampl') and self.ampl is not None and self._owns_ampl:
                 self.ampl.close()
         except Exception:
             pass
 
+def _find_ampl_file(name, fmt, possible_paths):
+    """先查询实例目录，目录不可用或未命中时回退到逐个路径探测"""
+    if name.endswith(f".{fmt}") and os.path.isfile(name):
+        return name
+    import catalog
+    path = catalog.find_instance(name, (fmt,))
+    if path is not None:
+        return path
+    for path in possible_paths:
+        if path and os.path.isfile(path):
+            return path
+    return None
+
 def find_ampl_files(model_input, data_input=None):
     """
     智能查找AMPL文件
@@ -1352,32 +1543,21 @@ def find_ampl_files(model_input, data_input=None):
             os.path.join("ampl", model_input) if model_input.endswith('.dat') else None,
         ]
     
-    mod_file = None
-    dat_file = None
-    
-    # 查找模型文件
-    print("查找模型文件:")
-    for path in possible_mod_paths:
-        if path and os.path.exists(path):
-            print(f"  找到: {path}")
-            mod_file = path
-            break
-        elif path:
-            print(f"  未找到: {path}")
+    mod_file = _find_ampl_file(model_input if model_input.endswith('.mod') else model_base_name,
+                               "mod", possible_mod_paths)
+    print(f"模型文件: {mod_file or '未找到'}")
     
     # 查找数据文件（可选）
-    print("查找数据文件:")
-    for path in possible_dat_paths:
-        if path and os.path.exists(path):
-            print(f"  找到: {path}")
-            dat_file = path
-            break
-        elif path:
-            print(f"  未找到: {path}")
+    if data_input:
+        dat_file = _find_ampl_file(data_input, "dat", possible_dat_paths)
+    else:
+        dat_file = _find_ampl_file(model_input if model_input.endswith('.dat') else model_base_name,
+                                   "dat", possible_dat_paths)
+    print(f"数据文件: {dat_file or '未找到'}")
     
     return mod_file, dat_file
 
-def list_ampl_files():
+def list_ampl_files(use_catalog=True):
     """
     列出可用的AMPL文件
     
@@ -1387,7 +1567,15 @@ def list_ampl_files():
     这个函数扫描多个常见目录，查找所有可用的AMPL模型文件(.mod)和数据文件(.dat)，
     帮助用户了解有哪些文件可供使用。这在用户不确定系统中有哪些模型可用时特别有用。
     结果按字母顺序排序，方便查找。
+    use_catalog 为 False 时不查询实例目录，直接扫描各目录 (--list 快速路径)。
     """
+    if use_catalog:
+        import catalog
+        mod_files = catalog.list_instances(("mod",))
+        dat_files = catalog.list_instances(("dat",))
+        if mod_files is not None and dat_files is not None:
+            return mod_files, dat_files
+    
     mod_files = []
     dat_files = []
     search_dirs = [".", "ampl", "models", "data"]
@@ -1431,6 +1619,17 @@ def main():
     print("  第三步: 选择求解器")
     print("=" * 60)
     
+    # 快速路径: 只列出文件，不需要 amplpy
+    if '--list' in sys.argv:
+        mod_files, dat_files = list_ampl_files(use_catalog=False)
+        print("\nAMPL模型文件:")
+        for file in mod_files:
+            print(f"  {file}")
+        print("\nAMPL数据文件:")
+        for file in dat_files:
+            print(f"  {file}")
+        return
+    
     if not AMPL_AVAILABLE:
         print("错误: amplpy库未安装")
         print("请运行: pip install amplpy")
@@ -1448,15 +1647,45 @@ def main():
         print("  python ampl.py mps ampl/bgprtr.dat        # 推荐用法")
         print("  python ampl.py ampl/mps.mod ampl/bgprtr.dat")
         print("  python ampl.py mps --data ampl/bgprtr.dat")
+        print("  python ampl.py --list                     # 只列出可用文件")
+        print("  python ampl.py mps --param-profile fast-feasible --time-limit 60")
         print("\n提示:")
         print("  - 第一个参数是模型文件(.mod)")
         print("  - 第二个参数是数据文件(.dat)，可选")
         print("  - 不提供数据文件时，使用模型中的默认数据")
+        print("  - --param-profile/--time-limit/--gap/--threads/--param 名称=值 设置求解参数")
+        print("  - 同一模型批量求解多个数据文件请使用 ampl_batch.py (模型只读一次)")
+        print("  - --refresh-solvers 重新检测可用的求解器 (默认使用 cache/ampl_solvers.json 中的结果)")
+        print("  - --log-level debug|info|warning|error 设置日志级别 (默认 info)")
+        print("  - --compiled copt|gurobi 把模型和数据编译为缓存的 MPS/NL 实例 (只展开一次)，由 COPT/Gurobi 直接求解")
+        print("  - --export sol,csv,bin 另外把解导出到 solution_exports/ (.sol、非零取值 CSV、可内存映射的 .solbin)")
         return
     
+    profiler = profiling.from_argv()
+    if '--refresh-solvers' in sys.argv:
+        import ampl_solvers
+        ampl_solvers.from_argv()
+    try:
+        solver_log.from_argv()
+        import solution_export
+        export_formats = solution_export.from_argv()
+        compiled_backend = None
+        if '--compiled' in sys.argv:
+            import ampl_compile
+            compiled_backend = ampl_compile.from_argv()
+    except ValueError as e:
+        print(f"错误: {e}")
+        return
+    try:
+        param_profile, param_overrides = solver_params.from_argv()
+        params = solver_params.resolve("ampl", param_profile, param_overrides)
+    except (ValueError, OSError) as e:
+        print(f"求解参数错误: {e}")
+        return
     try:
         # 显示可用文件
-        available_mod_files, available_dat_files = list_ampl_files()
+        with profiler.span("discover"):
+            available_mod_files, available_dat_files = list_ampl_files()
         
         if available_mod_files:
             print(f"\n发现 {len(available_mod_files)} 个AMPL模型文件:")
@@ -1586,7 +1815,8 @@ def main():
         # 查找文件
         if specific_data_file:
             # 如果指定了数据文件，使用新的查找函数
-            mod_file, dat_file = find_ampl_files(filename_input, specific_data_file)
+            with profiler.span("discover"):
+                mod_file, dat_file = find_ampl_files(filename_input, specific_data_file)
             if dat_file:
                 print(f"使用指定的数据文件: {dat_file}")
             else:
@@ -1603,7 +1833,8 @@ def main():
                 for path in possible_dat_paths:
                     print(f"  - {path}")
         else:
-            mod_file, dat_file = find_ampl_files(filename_input)
+            with profiler.span("discover"):
+                mod_file, dat_file = find_ampl_files(filename_input)
         
         if mod_file is None:
             print(f"\n模型文件未找到!")
@@ -1615,6 +1846,10 @@ def main():
                 print(f"- 您输入了数据文件，请尝试: {base_name} 或 {base_name}.mod")
             print("- 检查文件路径是否正确")
             print("- 确保文件扩展名为 .mod")
+            import catalog
+            suggestions = catalog.suggest_instances(filename_input, ("mod",))
+            if suggestions:
+                print(f"- 您是否要找: {', '.join(suggestions)}")
             
             if available_mod_files:
                 print(f"\n可用的模型文件:")
@@ -1658,6 +1893,26 @@ def main():
         else:
             print("未找到对应的数据文件，将使用模型文件中的默认数据")
         
+        # --compiled: 使用编译缓存中的平面实例 (首次运行时编译)，由 COPT/Gurobi 直接求解
+        if compiled_backend:
+            print(f"\n使用编译实例，由 {compiled_backend} 直接求解 (跳过AMPL模型展开)")
+            with profiler.span("compile"):
+                instance = ampl_compile.compile_instance(mod_file, dat_file)
+            try:
+                backend_params = solver_params.resolve(compiled_backend, param_profile, param_overrides,
+                                                       instance=instance.mps_path)
+            except (ValueError, OSError) as e:
+                print(f"求解参数错误: {e}")
+                return
+            profiler.name = instance.meta['stub']
+            solver, report_path = ampl_compile.solve_compiled(instance, compiled_backend, backend_params, profiler)
+            if report_path:
+                print(f"\nLaTeX报告: {os.path.abspath(report_path)}")
+            if export_formats:
+                for path in solver.export_solution(export_formats):
+                    print(f"解文件: {os.path.abspath(path)}")
+            return
+        
         # 询问求解器选择
         print("\n第三步：选择求解器")
         print("=" * 40)
@@ -1667,7 +1922,8 @@ def main():
         print("  • copt     - 商业求解器 (Cardinal Optimizer)")
         print("  • highs    - 开源求解器 (推荐)")
         print("  • cbc      - 开源求解器")
-        print("  • auto     - 自动检测最佳可用求解器")
+        print("  • auto     - 自动检测最佳可用求解器 (优先使用竞速记录中获胜最多的)")
+        print("  • race     - 多个求解器同时求解，取最先得到确定结论的结果")
         print()
         
         solver_choice = input("请选择求解器 (默认auto): ").strip().lower()
@@ -1687,11 +1943,19 @@ def main():
         print("=" * 40)
         
         # 创建求解器并求解
-        solver = AMPLSolver(mod_file, dat_file)
+        profiler.name = os.path.splitext(os.path.basename(mod_file))[0]
+        solver = AMPLSolver(mod_file, dat_file, profiler=profiler, params=params)
         success = solver.solve_model(solver=solver_choice)
         
         print("\n正在生成LaTeX报告...")
-        report_path = solver.generate_latex_report()
+        with profiler.span("report"):
+            report_path = solver.generate_latex_report()
+
+        if export_formats:
+            with profiler.span("export"):
+                export_paths = solver.export_solution(export_formats)
+            for path in export_paths:
+                print(f"解文件: {os.path.abspath(path)}")
         
         if report_path:
             print("\n" + "=" * 20)
@@ -1720,6 +1984,7 @@ def main():
         traceback.print_exc()
     
     finally:
+        profiler.finish()
         print("\n" + "=" * 60)
 
 if __name__ == "__main__":
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AMPL 批量求解
+
+ampl.py 每次运行只求解一个模型/数据组合: 启动 AMPL 进程、读模型、读数据、检测求解器、
+求解后关闭。同一个模型 (如 mps.mod) 配合大量 ampl/*.dat 实例做研究时，模型解析和进程
+启动的开销每个实例都要付一次。本脚本:
+- 在每个工作进程中启动一个 AMPL 会话并只读一次模型
+- 对每个数据文件执行 reset data、读数据、求解、提取结果并生成报告 (与 ampl.py 相同)
+- 会话分布在多个工作进程中 (--workers)，数百个数据文件可以用满整台机器
+- 每完成一个实例打印一行结果，汇总结果写入 CSV
+
+详细中文注释:
+每个工作进程在初始化时创建自己的 AMPLSession，此后该进程处理的所有数据文件都复用它。
+求解过程的控制台输出被收集起来不显示 (每个实例仍有自己的 ampl_logs/ 日志和报告)。
+某个实例失败后如果 AMPL 进程已经退出，会话会自动重新启动并重新读入模型。
+求解参数选项 (--param-profile、--time-limit 等) 与 ampl.py 相同。
+
+用法:
+python ampl_batch.py mps "ampl/*.dat" --workers 8
+python ampl_batch.py ampl/mps.mod ampl/bgprtr.dat ampl/pilot4.dat --solver gurobi --time-limit 60
+python ampl_batch.py mps "ampl/*.dat" --no-report --csv results.csv
+"""
+import concurrent.futures
+import contextlib
+import csv
+import datetime
+import glob
+import io
+import multiprocessing.util
+import os
+import sys
+import time
+
+import ampl
+import solution_export
+import solver_params
+
+_session = None  # 工作进程中的 AMPL 会话 (每个进程一个)
+
+
+class AMPLSession:
+    """
+    已读入模型的 AMPL 进程，在多个数据文件之间复用
+
+    参数:
+    model_filepath - 模型文件 (.mod) 路径
+    """
+
+    def __init__(self, model_filepath):
+        self.model_filepath = model_filepath
+        self.ampl = None
+        self.solved = 0
+        self.restarts = 0
+        self._start()
+
+    def _start(self):
+        from amplpy import AMPL
+        self.ampl = AMPL()
+        self.ampl.read(self.model_filepath)
+
+    def _healthy(self):
+        try:
+            return self.ampl.isRunning()
+        except Exception:
+            return False
+
+    def solve(self, data_filepath, solver="auto", params=None, report=True, export=()):
+        """
+        求解一个数据文件
+
+        参数:
+        export - 导出解的格式列表 (见 solution_export.py)，为空时不导出
+
+        返回:
+        结果字典 (数据文件、是否成功、状态、目标值、求解时间、求解器、报告和日志路径)
+        """
+        if not self._healthy():
+            self.close()
+            self._start()
+            self.restarts += 1
+        result = {'data': data_filepath, 'success': False, 'status': None, 'objective': None,
+                  'solve_time': None, 'solver': None, 'report': None, 'log': None, 'error': None}
+        start = time.time()
+        try:
+            instance = ampl.AMPLSolver(self.model_filepath, data_filepath, ampl=self.ampl, params=params,
+                                       model_loaded=True)
+            result['success'] = bool(instance.solve_model(solver=solver))
+            result.update(status=instance.solve_status, objective=instance.objective_value,
+                          solve_time=instance.solve_time, solver=instance.solver_name,
+                          log=instance.log_filepath)
+            if report and result['success']:
+                result['report'] = instance.generate_latex_report()
+            if export and result['success']:
+                instance.export_solution(export)
+        except Exception as e:
+            result['error'] = f"{type(e).__name__}: {e}"
+        result['elapsed'] = time.time() - start
+        self.solved += 1
+        return result
+
+    def close(self):
+        if self.ampl is not None:
+            try:
+                self.ampl.close()
+            except Exception:
+                pass
+            self.ampl = None
+
+
+def _init_worker(model_filepath):
+    """
+    工作进程初始化: 创建本进程的会话 (只读一次模型)
+
+    工作进程通过 os._exit 退出，不执行 atexit 注册的函数；会话由 multiprocessing 的终结器关闭，
+    进程池关闭时每个工作进程退出前都会执行它。
+    """
+    global _session
+    with contextlib.redirect_stdout(io.StringIO()):
+        _session = AMPLSession(model_filepath)
+    multiprocessing.util.Finalize(_session, _session.close, exitpriority=10)
+
+
+def _solve_in_worker(data_filepath, solver, params, report, export):
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = _session.solve(data_filepath, solver, params, report, export)
+    result['worker'] = os.getpid()
+    return result
+
+
+def collect_data_files(patterns):
+    """把数据文件名或通配符解析为 .dat 文件路径列表"""
+    paths = []
+    for pattern in patterns:
+        if any(ch in pattern for ch in "*?["):
+            matched = sorted(glob.glob(pattern))
+            if not matched:
+                print(f"警告: 没有与 {pattern} 匹配的数据文件")
+            paths.extend(matched)
+            continue
+        candidates = [pattern, f"{pattern}.dat", os.path.join("ampl", pattern), os.path.join("ampl", f"{pattern}.dat"),
+                      os.path.join("data", f"{pattern}.dat")]
+        path = ampl._find_ampl_file(pattern, "dat", candidates)
+        if path is None:
+            print(f"警告: 未找到数据文件 {pattern}")
+        else:
+            paths.append(path)
+    return list(dict.fromkeys(paths))
+
+
+def run_batch(model_filepath, data_files, workers=None, solver="auto", params=None, report=True, export=()):
+    """
+    用工作进程池批量求解，每完成一个实例打印一行进度
+
+    返回:
+    结果字典列表 (与 data_files 同序)
+    """
+    workers = max(1, min(workers or os.cpu_count() or 1, len(data_files)))
+    print(f"批量求解: 模型 {model_filepath}, {len(data_files)} 个数据文件, {workers} 个AMPL会话")
+    results = {}
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                                initargs=(model_filepath,)) as executor:
+        futures = {executor.submit(_solve_in_worker, path, solver, params, report, export): path for path in data_files}
+        for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+            path = futures[future]
+            try:
+                result = future.result()
+            except concurrent.futures.BrokenExecutor as e:
+                result = {'data': path, 'success': False, 'error': f"工作进程异常退出: {e}"}
+            results[path] = result
+            if result.get('error'):
+                outcome = f"错误 ({result['error']})"
+            elif result['success']:
+                outcome = f"目标值 {result['objective']}, {result['elapsed']:.2f} 秒"
+            else:
+                outcome = f"未求解成功 ({result['status']})"
+            print(f"  [{done}/{len(data_files)}] {os.path.basename(path)}: {outcome}")
+    return [results[path] for path in data_files]
+
+
+CSV_COLUMNS = ("data", "success", "status", "objective", "solve_time", "elapsed", "solver", "report", "log",
+               "error")
+
+
+def write_csv(results, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def main():
+    """
+    主函数
+
+    用法:
+    python ampl_batch.py 模型 数据文件或通配符... [选项]
+
+    选项:
+    --workers N      AMPL会话 (工作进程) 数，默认 CPU 数
+    --solver 名称    求解器 (默认 auto 自动选择)
+    --no-report      不生成LaTeX报告
+    --csv 路径       汇总结果的 CSV 文件 (默认 ampl_reports/batch_<模型>_<时间>.csv)
+    --export 格式    另外把每个实例的解导出到 solution_exports/ (sol,csv,bin 或 all)
+    另外支持 --param-profile、--time-limit、--gap、--threads、--param 名称=值
+    """
+    try:
+        param_profile, param_overrides = solver_params.from_argv()
+        params = solver_params.resolve("ampl", param_profile, param_overrides)
+    except (ValueError, OSError) as e:
+        print(f"求解参数错误: {e}")
+        return 2
+    try:
+        export = solution_export.from_argv()
+    except ValueError as e:
+        print(f"错误: {e}")
+        return 2
+    args = sys.argv[1:]
+    options = {'--workers': None, '--solver': "auto", '--csv': None}
+    for flag in list(options):
+        if flag in args:
+            index = args.index(flag)
+            options[flag] = args[index + 1]
+            del args[index:index + 2]
+    report = '--no-report' not in args
+    if '-h' in args or '--help' in args:
+        print(main.__doc__)
+        return 0
+    args = [arg for arg in args if not arg.startswith('--')]
+    if len(args) < 2:
+        print(main.__doc__)
+        return 2
+    if not ampl.AMPL_AVAILABLE:
+        print("错误: amplpy库未安装")
+        return 2
+
+    model_filepath, _ = ampl.find_ampl_files(args[0])
+    if model_filepath is None:
+        print(f"未找到模型文件: {args[0]}")
+        return 2
+    data_files = collect_data_files(args[1:])
+    if not data_files:
+        print("没有可求解的数据文件")
+        return 2
+
+    start = time.time()
+    results = run_batch(model_filepath, data_files, int(options['--workers']) if options['--workers'] else None,
+                        options['--solver'], params, report, export)
+    elapsed = time.time() - start
+
+    solved = sum(1 for r in results if r['success'])
+    print(f"\n完成: {solved}/{len(results)} 个实例求解成功, 总耗时 {elapsed:.1f} 秒 "
+          f"({len(results) / elapsed if elapsed > 0 else 0:.2f} 个实例/秒)")
+    csv_path = options['--csv']
+    if csv_path is None:
+        model_name = os.path.splitext(os.path.basename(model_filepath))[0]
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        csv_path = os.path.join("ampl_reports", f"batch_{model_name}_{timestamp}.csv")
+    write_csv(results, csv_path)
+    print(f"汇总结果: {os.path.abspath(csv_path)}")
+    return 0 if solved == len(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AMPL 模型实例编译缓存
+
+AMPLSolver 每次求解都要重新读入代数模型并展开全部下标集合，大模型在求解器启动之前就要
+花几分钟。本模块把一个 模型 + 数据 组合只展开一次，保存为平面实例:
+- <模型>_<数据>.nl   (AMPL 求解器驱动可以直接读取)
+- <模型>_<数据>.mps  (变量/约束使用 AMPL 中的名称，mps.py / mps_gurobi.py 可以直接求解)
+- names.json         (行/列编号 -> AMPL 名称，目标函数名称和方向)
+- meta.json          (模型和数据文件的哈希、规模、编译时间)
+缓存键由 .mod 和 .dat 文件内容的 SHA-256 计算，文件内容不变时以后的运行直接使用缓存，
+完全跳过 AMPL 的模型展开 (命中缓存时不需要启动 AMPL)。
+
+详细中文注释:
+编译时在 AMPL 中设置 option auxfiles rc 后执行 write g... 和 write m...，AMPL 写出 .nl、.mps 以及
+.row/.col 名称文件。.mps 中的行列使用通用名称 (R0001、C0001 等，编号从 1 开始)，本模块按名称中的
+编号对应 .row/.col 中的名称改写为自由格式 MPS (名称中的空白替换为下划线，替换后重名的保留通用名称)。如果 AMPL 把最大化目标
+取反写成了最小化，改写时恢复原系数并加上 OBJSENSE MAX 段，保证求解得到的目标值与 AMPL 一致。
+模型文件中 include 的其他文件不参与缓存键计算，修改它们后请使用 --force 重新编译。
+
+用法:
+python ampl_compile.py mps ampl/bgprtr.dat                 # 编译 (或使用缓存)，输出实例路径
+python ampl_compile.py mps ampl/bgprtr.dat --solve copt    # 用 COPT 直接求解编译好的实例并生成报告
+python ampl_compile.py mps ampl/bgprtr.dat --solve gurobi --force
+python ampl_compile.py mps ampl/bgprtr.dat --solve copt --export all   # 另外导出 .sol/CSV/.solbin 解文件
+"""
+import datetime
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+DEFAULT_CACHE_DIR = os.path.join("cache", "ampl_compiled")
+
+
+def file_hash(path):
+    """文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CompiledInstance:
+    """缓存目录中的一个编译好的实例"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json"), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.stub = os.path.join(directory, self.meta['stub'])
+        self.mps_path = self.stub + ".mps"
+        self.nl_path = self.stub + ".nl"
+        self.from_cache = True
+
+    def names(self):
+        """names.json 的内容 (行列名称映射)"""
+        with open(os.path.join(self.directory, "names.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def complete(self):
+        return all(os.path.isfile(path) for path in (self.mps_path, self.nl_path,
+                                                        os.path.join(self.directory, "names.json")))
+
+
+def cache_key(model_filepath, data_filepath=None):
+    model_hash = file_hash(model_filepath)
+    data_hash = file_hash(data_filepath) if data_filepath else ""
+    return hashlib.sha256(f"{model_hash}:{data_hash}".encode('ascii')).hexdigest(), model_hash, data_hash
+
+
+def _stub_name(model_filepath, data_filepath):
+    name = os.path.splitext(os.path.basename(model_filepath))[0]
+    if data_filepath:
+        name += "_" + os.path.splitext(os.path.basename(data_filepath))[0]
+    return name
+
+
+def _read_names(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return [line.rstrip("\n") for line in f if line.strip()]
+    except OSError:
+        return []
+
+
+def _mps_name(name, used):
+    """MPS 中使用的名称: 空白替换为下划线；替换后与已有名称重复时返回 None (保留通用名称)"""
+    clean = re.sub(r'\s+', "_", name.strip())
+    if not clean or clean in used:
+        return None
+    used.add(clean)
+    return clean
+
+
+def _generic_index(generic, count, kind):
+    """AMPL 通用名称 (如 C0012) 中编码的序号 (从 0 开始)，与名称文件对不上时抛出 ValueError"""
+    match = re.fullmatch(r'[A-Za-z]+(\d+)', generic)
+    if not match or not 1 <= int(match.group(1)) <= count:
+        raise ValueError(f"MPS 中的{kind}名称 {generic} 与名称文件 ({count} 个) 对不上")
+    return int(match.group(1)) - 1
+
+
+def _objective_coefficient(ampl, column_index):
+    """在 AMPL 中求目标函数对第 column_index 个变量 (从 0 开始) 的系数: obj(e_k) - obj(0)"""
+    ampl.eval("let {j in 1.._snvars} _svar[j] := 0;")
+    base = float(ampl.getValue("_sobj[1]"))
+    ampl.eval(f"let _svar[{column_index + 1}] := 1;")
+    return float(ampl.getValue("_sobj[1]")) - base
+
+
+def rewrite_mps(source, target, row_names, col_names, maximize, probe_coefficient=None):
+    """
+    把 AMPL 写出的 MPS 改写为使用 AMPL 名称的自由格式 MPS
+
+    参数:
+    source/target - 输入和输出 MPS 路径
+    row_names - .row 文件中的名称 (约束在前，目标函数在后)
+    col_names - .col 文件中的名称
+    maximize - 目标是否为最大化
+    probe_coefficient - 函数 (列序号) -> 该列的真实目标系数，用于判断 AMPL 是否取反了最大化目标
+
+    返回:
+    {'rows': {通用名: AMPL名}, 'cols': {...}, 'objective_row': 名称, 'negated': 是否恢复了取反的目标}
+
+    通用名称按其中编码的序号对应 .row/.col 中的名称，MPS 省略或调换某些行列不会错位；
+    列数与 .col 不一致、行数多于 .row 或序号超出范围时抛出 ValueError。
+    """
+    with open(source, 'r', encoding='utf-8', errors='replace') as f:
+        lines = [line.rstrip("\n") for line in f]
+
+    # 第一遍: 收集行和列的通用名称
+    section = None
+    constraint_rows, objective_rows, columns = [], [], []
+    seen_columns = set()
+    has_objsense = False
+    for line in lines:
+        if not line.strip() or line.startswith("*"):
+            continue
+        if not line[0].isspace():
+            section = line.split()[0]
+            has_objsense = has_objsense or section == "OBJSENSE"
+            continue
+        tokens = line.split()
+        if section == "ROWS":
+            (objective_rows if tokens[0] == "N" else constraint_rows).append(tokens[1])
+        elif section == "COLUMNS" and "'MARKER'" not in tokens and tokens[0] not in seen_columns:
+            seen_columns.add(tokens[0])
+            columns.append(tokens[0])
+
+    if len(columns) != len(col_names):
+        raise ValueError(f"MPS 中有 {len(columns)} 列，而 .col 文件中有 {len(col_names)} 个名称")
+    if len(constraint_rows) + len(objective_rows) > len(row_names):
+        raise ValueError(f"MPS 中有 {len(constraint_rows) + len(objective_rows)} 行，"
+                         f"而 .row 文件中只有 {len(row_names)} 个名称")
+    used = set()
+    rows = {}
+    for generic in constraint_rows + objective_rows:
+        rows[generic] = _mps_name(row_names[_generic_index(generic, len(row_names), "行")], used) or generic
+    column_index = {generic: _generic_index(generic, len(col_names), "列") for generic in columns}
+    cols = {generic: (_mps_name(col_names[index], used) or generic) for generic, index in column_index.items()}
+    objective_row = objective_rows[0] if objective_rows else None
+
+    # AMPL 写 MPS 时可能把最大化目标取反: 用一个目标系数与 AMPL 中的真实系数比较
+    negate = False
+    if maximize and not has_objsense and objective_row and probe_coefficient is not None:
+        for line in lines:
+            tokens = line.split()
+            if len(tokens) >= 3 and tokens[0] in cols and "'MARKER'" not in tokens:
+                pairs = dict(zip(tokens[1::2], tokens[2::2]))
+                if objective_row in pairs:
+                    written = float(pairs[objective_row])
+                    try:
+                        actual = probe_coefficient(column_index[tokens[0]])
+                    except Exception as e:
+                        print(f"警告: 无法确认MPS中最大化目标的符号 ({e})，按原样保留")
+                        break
+                    negate = written != 0 and actual != 0 and (written > 0) != (actual > 0)
+                    break
+
+    def flip(row, value):
+        return repr(-float(value)) if negate and row == objective_row else value
+
+    out = []
+    section = None
+    for line in lines:
+        if not line.strip() or line.startswith("*"):
+            continue
+        if not line[0].isspace():
+            section = line.split()[0]
+            out.append(line.strip())
+            if section == "NAME" and negate:
+                out.extend(["OBJSENSE", "    MAX"])
+            continue
+        tokens = line.split()
+        if section == "ROWS":
+            tokens[1] = rows.get(tokens[1], tokens[1])
+        elif section == "COLUMNS" and "'MARKER'" not in tokens:
+            rest = [(rows.get(r, r), flip(r, v)) for r, v in zip(tokens[1::2], tokens[2::2])]
+            tokens = [cols.get(tokens[0], tokens[0])] + [x for pair in rest for x in pair]
+        elif section in ("RHS", "RANGES"):
+            rest = [(rows.get(r, r), flip(r, v)) for r, v in zip(tokens[1::2], tokens[2::2])]
+            tokens = [tokens[0]] + [x for pair in rest for x in pair]
+        elif section == "BOUNDS" and len(tokens) >= 3:
+            tokens[2] = cols.get(tokens[2], tokens[2])
+        out.append("    " + "  ".join(tokens))
+    with open(target, 'w', encoding='utf-8') as f:
+        f.write("\n".join(out) + "\n")
+    return {'rows': rows, 'cols': cols, 'objective_row': objective_row, 'negated': negate}
+
+
+def compile_instance(model_filepath, data_filepath=None, force=False, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    编译 模型 + 数据 为平面实例 (命中缓存时直接返回，不启动 AMPL)
+
+    返回:
+    CompiledInstance
+    """
+    key, model_hash, data_hash = cache_key(model_filepath, data_filepath)
+    stub_name = _stub_name(model_filepath, data_filepath)
+    directory = os.path.join(cache_dir, f"{stub_name}_{key[:12]}")
+    if not force and os.path.isfile(os.path.join(directory, "meta.json")):
+        instance = CompiledInstance(directory)
+        if instance.meta.get('key') == key and instance.complete():
+            print(f"使用已编译的实例: {instance.mps_path} (编译于 {instance.meta['created']})")
+            return instance
+
+    from amplpy import AMPL
+    os.makedirs(cache_dir, exist_ok=True)
+    workdir = tempfile.mkdtemp(prefix=".compile_", dir=cache_dir)
+    ampl = AMPL()
+    try:
+        start = datetime.datetime.now()
+        print(f"编译模型实例: {model_filepath}" + (f" + {data_filepath}" if data_filepath else ""))
+        ampl.read(model_filepath)
+        if data_filepath:
+            ampl.readData(data_filepath)
+        raw_stub = os.path.join(workdir, "raw")
+        ampl.eval("option auxfiles rc;")
+        ampl.eval(f"write ('g{raw_stub}');")
+        ampl.eval(f"write ('m{raw_stub}');")
+
+        senses = []
+        for _, objective in ampl.getObjectives():
+            senses.append('minimize' if objective.minimization() else 'maximize')
+        row_names = _read_names(raw_stub + ".row")
+        col_names = _read_names(raw_stub + ".col")
+        stub = os.path.join(workdir, stub_name)
+        mapping = rewrite_mps(raw_stub + ".mps", stub + ".mps", row_names, col_names,
+                              bool(senses) and senses[0] == 'maximize',
+                              lambda index: _objective_coefficient(ampl, index))
+        os.replace(raw_stub + ".nl", stub + ".nl")
+        for suffix in (".mps", ".row", ".col"):
+            if os.path.exists(raw_stub + suffix):
+                os.remove(raw_stub + suffix)
+
+        names = {'rows': row_names, 'cols': col_names, 'mps_rows': mapping['rows'], 'mps_cols': mapping['cols'],
+                 'objective_row': mapping['objective_row'], 'senses': senses}
+        with open(os.path.join(workdir, "names.json"), 'w', encoding='utf-8') as f:
+            json.dump(names, f, ensure_ascii=False)
+        meta = {
+            'key': key, 'stub': stub_name, 'model': os.path.abspath(model_filepath), 'model_sha256': model_hash,
+            'data': os.path.abspath(data_filepath) if data_filepath else None, 'data_sha256': data_hash,
+            'variables': len(col_names), 'constraints': len(mapping['rows']) - (1 if mapping['objective_row'] else 0),
+            'objective_negated': mapping['negated'], 'created': start.isoformat(timespec='seconds'),
+            'compile_seconds': round((datetime.datetime.now() - start).total_seconds(), 3),
+        }
+        with open(os.path.join(workdir, "meta.json"), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=1)
+
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+        os.replace(workdir, directory)
+        print(f"实例已编译: {meta['variables']} 个变量, {meta['constraints']} 个约束, "
+              f"耗时 {meta['compile_seconds']:.2f} 秒 -> {directory}")
+        instance = CompiledInstance(directory)
+        instance.from_cache = False
+        return instance
+    finally:
+        try:
+            ampl.close()
+        except Exception:
+            pass
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def solve_compiled(instance, backend="copt", params=None, profiler=None, force_solve=False):
+    """
+    用 mps.py (copt) 或 mps_gurobi.py (gurobi) 直接求解编译好的实例并生成LaTeX报告
+
+    返回:
+    (求解器对象, 报告路径)
+    """
+    if backend == "copt":
+        from mps import MPSCOPTSolver as solver_class
+    elif backend == "gurobi":
+        from mps_gurobi import MPSSolver as solver_class
+    else:
+        raise ValueError(f"未知的求解后端: {backend} (可选 copt, gurobi)")
+    solver = solver_class(instance.mps_path, profiler=profiler, force_solve=force_solve, params=params)
+    solver.solve_model()
+    return solver, solver.extract_to_latex()
+
+
+def from_argv(argv=None):
+    """
+    从命令行参数中取出 --compiled 后端 (原地删除)，返回后端名称或 None
+
+    支持的参数:
+    --compiled copt|gurobi   使用编译缓存中的平面实例，由 COPT/Gurobi 直接求解 (跳过AMPL展开)
+    """
+    argv = sys.argv if argv is None else argv
+    if '--compiled' not in argv:
+        return None
+    index = argv.index('--compiled')
+    backend = argv[index + 1] if index + 1 < len(argv) else ""
+    del argv[index:index + 2]
+    if backend not in ("copt", "gurobi"):
+        raise ValueError(f"--compiled 需要指定 copt 或 gurobi，而不是 '{backend}'")
+    return backend
+
+
+def main():
+    import ampl
+    import solution_export
+    import solver_params
+    try:
+        param_profile, param_overrides = solver_params.from_argv()
+    except ValueError as e:
+        print(f"求解参数错误: {e}")
+        return 2
+    try:
+        export_formats = solution_export.from_argv()
+    except ValueError as e:
+        print(f"错误: {e}")
+        return 2
+    args = sys.argv[1:]
+    backend = None
+    if '--solve' in args:
+        index = args.index('--solve')
+        backend = args[index + 1] if index + 1 < len(args) else ""
+        del args[index:index + 2]
+    force = '--force' in args
+    args = [arg for arg in args if not arg.startswith('--')]
+    if not args:
+        print(__doc__)
+        return 2
+
+    model_filepath, data_filepath = ampl.find_ampl_files(args[0], args[1] if len(args) > 1 else None)
+    if model_filepath is None:
+        print(f"未找到模型文件: {args[0]}")
+        return 2
+    try:
+        instance = compile_instance(model_filepath, data_filepath, force=force)
+    except ImportError:
+        print("错误: 实例不在编译缓存中，编译需要 amplpy")
+        return 2
+    except ValueError as e:
+        print(f"编译失败: {e}")
+        return 1
+    print(f"MPS: {os.path.abspath(instance.mps_path)}")
+    print(f"NL:  {os.path.abspath(instance.nl_path)}")
+    if backend is None:
+        return 0
+    try:
+        params = solver_params.resolve(backend, param_profile, param_overrides, instance=instance.mps_path)
+        solver, report_path = solve_compiled(instance, backend, params)
+    except (ValueError, OSError) as e:
+        print(f"错误: {e}")
+        return 2
+    if report_path:
+        print(f"LaTeX报告位置: {os.path.abspath(report_path)}")
+    if export_formats:
+        for path in solver.export_solution(export_formats):
+            print(f"解文件: {os.path.abspath(path)}")
+    return 0 if solver.objective_value is not None else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+AMPL 求解器竞速
+
+同一个模型在不同实例上，各求解器的表现可能相差几个数量级，按固定优先级选择求解器
+往往不是最快的。本模块为 ampl.py 的 race 模式提供:
+- 把当前模型写成一个 .nl 文件，同时启动多个可用求解器的子进程，线程预算平均分配
+- 第一个得到确定结论 (证明最优、不可行或无界) 的求解器获胜，其余进程立即终止；
+  到达截止时间或全部结束时取已有解 (solved?、limit) 中目标值最好的一个
+- 把获胜求解器的 .sol 文件读回 AMPL 会话 (solution 命令)，之后的结果提取与普通求解相同
+- 每个模型的获胜记录保存在 cache/ampl_race_history.json，auto 模式优先选择历史上赢得最多的求解器
+
+详细中文注释:
+求解器子进程按 AMPL 的约定调用: <求解器> <stub>.nl -AMPL，选项通过环境变量
+<求解器>_options 传入 (包括用户设置的求解参数和分到的线程数 threads=k)。.nl 使用文本格式
+(write g...)，求解器写出的 .sol 也是文本格式，本模块从中解析 solve_result_num 和求解消息。
+各求解器的输出写在临时目录的 <求解器>.log 中，竞速结束后临时目录被删除。
+"""
+import datetime
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+
+DEFAULT_HISTORY_PATH = os.path.join("cache", "ampl_race_history.json")
+# 参与竞速的求解器 (按优先级)，最多同时启动 MAX_RACERS 个
+RACE_SOLVERS = ('gurobi', 'copt', 'cplex', 'highs', 'cbc')
+MAX_RACERS = 4
+POLL_INTERVAL = 0.05
+
+_OBJECTIVE_RE = re.compile(r'objective\s+([-+]?\d*\.?\d+(?:[eE][-+]?\d+)?)')
+_OBJNO_RE = re.compile(r'^objno\s+\d+\s+(-?\d+)\s*$', re.MULTILINE)
+
+
+def solve_result_name(code):
+    """solve_result_num -> solve_result (AMPL 约定的区间)"""
+    if code is None:
+        return "failure"
+    if code < 100:
+        return "solved"
+    if code < 200:
+        return "solved?"
+    if code < 300:
+        return "infeasible"
+    if code < 400:
+        return "unbounded"
+    if code < 500:
+        return "limit"
+    return "failure"
+
+
+def solver_executable(name):
+    """求解器程序路径: 先查 PATH，再查 ampl 程序所在目录"""
+    path = shutil.which(name)
+    if path is None:
+        ampl_bin = shutil.which("ampl")
+        if ampl_bin:
+            path = shutil.which(name, path=os.path.dirname(ampl_bin))
+    return path
+
+
+def conclusive(code):
+    """证明最优 (0-99)、不可行 (200-299) 或无界 (300-399) 都是确定的结论"""
+    return code is not None and (code < 100 or 200 <= code < 400)
+
+
+def has_solution(code):
+    """solved? (100-199) 和 limit (400-499) 的 .sol 中带有可用的解"""
+    return code is not None and (100 <= code < 200 or 400 <= code < 500)
+
+
+def candidates(available):
+    """从可用求解器中选出参与竞速的求解器 (有可执行文件的，最多 MAX_RACERS 个)"""
+    return [name for name in RACE_SOLVERS if name in available and solver_executable(name)][:MAX_RACERS]
+
+
+def read_sol(path):
+    """
+    读取文本格式 .sol 文件的求解消息和 solve_result_num
+
+    返回:
+    (消息, solve_result_num)，文件不存在或无法解析时 solve_result_num 为 None
+    """
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            text = f.read()
+    except OSError:
+        return "", None
+    message = text.split("\n\n", 1)[0].strip()
+    match = _OBJNO_RE.search(text)
+    return message, int(match.group(1)) if match else None
+
+
+class Racer:
+    """一个参与竞速的求解器子进程"""
+
+    def __init__(self, name, stub, threads, options, workdir):
+        self.name = name
+        self.threads = threads
+        self.sol_path = os.path.join(workdir, f"{name}.sol")
+        self.log_path = os.path.join(workdir, f"{name}.log")
+        # 每个求解器使用自己的 stub 副本，避免 .sol 文件互相覆盖
+        nl_path = os.path.join(workdir, f"{name}.nl")
+        try:
+            os.link(stub + ".nl", nl_path)
+        except (OSError, AttributeError):
+            shutil.copyfile(stub + ".nl", nl_path)
+        env = dict(os.environ)
+        env[f"{name}_options"] = " ".join(part for part in (options, f"threads={threads}") if part)
+        self.started = time.time()
+        self.finished = None
+        self.code = None
+        self.message = ""
+        self.objective = None
+        self.killed = False
+        with open(self.log_path, 'w') as log:
+            self.process = subprocess.Popen([solver_executable(name), nl_path, "-AMPL"], cwd=workdir, env=env,
+                                            stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL)
+
+    def poll(self):
+        """进程结束时读取结果，返回是否已结束"""
+        if self.finished is not None:
+            return True
+        if self.process.poll() is None:
+            return False
+        self.finished = time.time()
+        self.message, self.code = read_sol(self.sol_path)
+        match = _OBJECTIVE_RE.search(self.message)
+        self.objective = float(match.group(1)) if match else None
+        return True
+
+    def kill(self):
+        if self.process.poll() is None:
+            self.killed = True
+            self.process.kill()
+            self.process.wait()
+        if self.finished is None:
+            self.finished = time.time()
+
+    @property
+    def seconds(self):
+        return (self.finished or time.time()) - self.started
+
+    def summary(self):
+        return {'solver': self.name, 'threads': self.threads, 'seconds': round(self.seconds, 3),
+                'solve_result': "killed" if self.killed else solve_result_name(self.code),
+                'code': self.code, 'objective': self.objective, 'message': self.message}
+
+
+class RaceResult:
+    """竞速结果: 获胜者 (可能为 None) 和所有参赛者的摘要"""
+
+    def __init__(self, winner, racers, seconds):
+        self.winner = winner.name if winner else None
+        self.winner_message = winner.message if winner else ""
+        self.solve_result = solve_result_name(winner.code) if winner else "failure"
+        self.seconds = seconds
+        self.entries = [r.summary() for r in racers]
+
+    def to_latex(self, escape):
+        """生成报告中的竞速章节 (escape 为LaTeX转义函数)"""
+        latex = "\\section{求解器竞速}\n\n"
+        if self.winner:
+            latex += f"获胜求解器: \\textbf{{{escape(self.winner)}}}，竞速用时 {self.seconds:.3f} 秒。\n\n"
+        else:
+            latex += f"没有求解器在截止时间内得到可用的解 (用时 {self.seconds:.3f} 秒)。\n\n"
+        latex += "\\begin{table}[h!]\n\\centering\n\\begin{tabular}{lrrlr}\n\\toprule\n"
+        latex += "\\textbf{求解器} & \\textbf{线程} & \\textbf{用时 (秒)} & \\textbf{结果} & \\textbf{目标值} \\\\\n"
+        latex += "\\midrule\n"
+        for entry in self.entries:
+            objective = f"{entry['objective']:.8g}" if entry['objective'] is not None else "--"
+            name = escape(entry['solver']) + (" (胜)" if entry['solver'] == self.winner else "")
+            latex += (f"{name} & {entry['threads']} & {entry['seconds']:.3f} & {escape(entry['solve_result'])} & "
+                      f"{objective} \\\\\n")
+        latex += "\\bottomrule\n\\end{tabular}\n\\caption{各求解器的竞速结果}\n\\end{table}\n\n"
+        return latex
+
+
+def _better(a, b, minimize):
+    if b is None or b.objective is None:
+        return True
+    if a.objective is None:
+        return False
+    return a.objective < b.objective if minimize else a.objective > b.objective
+
+
+def race(ampl, solvers, total_threads=None, deadline=None, options=None, minimize=True, stop=None):
+    """
+    在当前AMPL会话中让多个求解器竞速，并把获胜的解读回会话
+
+    参数:
+    ampl - 已读入模型和数据的 AMPL 对象
+    solvers - 参赛求解器列表
+    total_threads - 线程总预算 (默认 CPU 数)，平均分给各求解器
+    deadline - 截止秒数，None 表示等到有求解器得到确定结论或全部结束
+    options - {求解器: 选项字符串}
+    minimize - 目标方向，用于截止时比较各求解器的解
+    stop - 可选的无参函数，返回 True 时立即结束竞速 (与到达截止时间相同，已有的解仍会读回)
+
+    返回:
+    RaceResult
+    """
+    options = options or {}
+    total_threads = total_threads or os.cpu_count() or 1
+    threads = max(1, total_threads // len(solvers))
+    workdir = tempfile.mkdtemp(prefix="ampl_race_")
+    stub = os.path.join(workdir, "model")
+    racers = []
+    start = time.time()
+    try:
+        ampl.eval(f"write ('g{stub}');")
+        racers = [Racer(name, stub, threads, options.get(name, ""), workdir) for name in solvers]
+        winner = None
+        while True:
+            finished = [r for r in racers if r.poll()]
+            proven = [r for r in finished if conclusive(r.code)]
+            if proven:
+                winner = min(proven, key=lambda r: r.finished)
+                break
+            if len(finished) == len(racers) or (deadline is not None and time.time() - start >= deadline):
+                break
+            if stop is not None and stop():
+                break
+            time.sleep(POLL_INTERVAL)
+        for racer in racers:
+            racer.kill()
+        if winner is None:
+            # 没有确定结论: 在已有解 (例如达到时间限制) 中取目标值最好的
+            for racer in racers:
+                if has_solution(racer.code) and racer.objective is not None and _better(racer, winner, minimize):
+                    winner = racer
+        if winner is not None:
+            ampl.eval(f"solution ('{winner.sol_path}');")
+        return RaceResult(winner, racers, time.time() - start)
+    finally:
+        for racer in racers:
+            racer.kill()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+# ---- 竞速历史 (供 auto 模式选择求解器) ----
+
+def _load_history(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def record_win(model_key, result, path=DEFAULT_HISTORY_PATH):
+    """记录一次竞速的获胜求解器和用时"""
+    if not result.winner:
+        return
+    history = _load_history(path)
+    stats = history.setdefault(model_key, {}).setdefault(result.winner, {'wins': 0, 'best_seconds': None})
+    stats['wins'] += 1
+    if stats['best_seconds'] is None or result.seconds < stats['best_seconds']:
+        stats['best_seconds'] = round(result.seconds, 3)
+    stats['last'] = datetime.datetime.now().isoformat(timespec='seconds')
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(history, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"写入竞速记录失败: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def preferred_solver(model_key, available, path=DEFAULT_HISTORY_PATH):
+    """该模型历史上获胜次数最多 (相同时用时最短) 且当前可用的求解器，没有记录时返回 None"""
+    stats = _load_history(path).get(model_key, {})
+    ranked = sorted((name for name in stats if name in available),
+                    key=lambda name: (-stats[name]['wins'], stats[name]['best_seconds'] or float('inf')))
+    return ranked[0] if ranked else None
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AMPL 求解器可用性检测缓存
+
+以前 ampl.py 每次运行都依次设置 solver 选项来"检测"七个求解器，但设置选项成功并不说明
+求解器程序真的存在或有许可证，选错的求解器要到 solve() 时才失败。本模块:
+- 对每个候选求解器真正求解一个极小的线性规划 (max x s.t. x <= 3)，结果正确才算可用
+- 各求解器的探测并行进行，每个探测在单独的子进程中运行 (python ampl_solvers.py --probe 求解器)；
+  超时的探测连同它启动的 AMPL 和求解器进程一起被杀掉，本次视为不可用
+- 结果按环境指纹缓存在 cache/ampl_solvers.json，以后的运行直接复用；超时的结果不写入缓存，
+  下次运行只重新探测这些求解器
+
+详细中文注释:
+环境指纹包括: amplpy 和 AMPL 模块的安装位置、PATH 中的 ampl 程序和各求解器程序 (路径和
+修改时间)、PATH 本身，以及许可证文件 (license/ 目录、GRB_LICENSE_FILE、COPT_LICENSE_FILE、
+COPT_LICENSE_KEY、ampl.lic) 的修改时间。安装或升级求解器、更换许可证后指纹随之改变，
+自动重新探测。多个进程 (例如 ampl_batch.py 的工作进程) 同时启动时，探测在缓存文件的
+锁上串行化，只有第一个进程真正探测。
+
+用法:
+python ampl_solvers.py            # 显示检测结果 (使用缓存)
+python ampl_solvers.py --refresh  # 忽略缓存重新探测
+"""
+import concurrent.futures
+import contextlib
+import datetime
+import hashlib
+import importlib.util
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: 不加锁，最坏情况下多个进程重复探测
+    fcntl = None
+
+DEFAULT_CACHE_PATH = os.path.join("cache", "ampl_solvers.json")
+CANDIDATES = ('gurobi', 'cplex', 'copt', 'highs', 'cbc', 'ipopt', 'bonmin')
+PROBE_TIMEOUT = 30.0
+LICENSE_ENV_VARS = ('GRB_LICENSE_FILE', 'COPT_LICENSE_FILE', 'COPT_LICENSE_KEY', 'AMPL_LICFILE')
+
+# 探测模型: 最优解 x = 3
+_PROBE_MODEL = "var x >= 0; maximize probe_obj: x; subject to probe_con: x <= 3;"
+
+
+def _stat(path):
+    """(路径, 修改时间)，文件不存在时修改时间为 None"""
+    try:
+        return path, os.path.getmtime(path)
+    except (OSError, TypeError):
+        return path, None
+
+
+def _module_location(name):
+    try:
+        spec = importlib.util.find_spec(name)
+    except (ImportError, ValueError):
+        return None
+    return spec.origin if spec is not None else None
+
+
+def fingerprint(solvers=CANDIDATES):
+    """当前环境的指纹 (SHA-256)，AMPL安装、PATH 或许可证文件变化时随之改变"""
+    ampl_bin = shutil.which("ampl")
+    parts = {
+        'amplpy': _module_location("amplpy"),
+        'ampl_module_base': _module_location("ampl_module_base"),
+        'ampl': _stat(ampl_bin),
+        'path': os.environ.get('PATH', ""),
+        'solvers': [_stat(shutil.which(name)) for name in solvers],
+        'licenses': [_stat(os.environ.get(var)) for var in LICENSE_ENV_VARS],
+    }
+    license_dir = os.path.abspath("license")
+    if os.path.isdir(license_dir):
+        parts['license_dir'] = [_stat(os.path.join(license_dir, name)) for name in sorted(os.listdir(license_dir))]
+    if ampl_bin:
+        parts['ampl_lic'] = _stat(os.path.join(os.path.dirname(ampl_bin), "ampl.lic"))
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def probe(solver):
+    """
+    用极小模型真正求解一次，检查求解器是否可用
+
+    返回:
+    {'ok': bool, 'seconds': 耗时, 'error': 失败原因}
+    """
+    from amplpy import AMPL
+    start = time.time()
+    ampl = None
+    try:
+        ampl = AMPL()
+        ampl.eval(_PROBE_MODEL)
+        ampl.setOption('solver', solver)
+        output = ampl.getOutput("solve;")
+        result = ampl.getValue("solve_result")
+        value = ampl.getValue("x")
+        ok = result == "solved" and abs(float(value) - 3.0) < 1e-6
+        error = None if ok else f"solve_result={result}, x={value}: {output.strip()[-200:]}"
+    except Exception as e:
+        ok, error = False, f"{type(e).__name__}: {e}"
+    finally:
+        if ampl is not None:
+            with contextlib.suppress(Exception):
+                ampl.close()
+    return {'ok': ok, 'seconds': round(time.time() - start, 3), 'error': error}
+
+
+def _kill(process):
+    """杀掉探测子进程及其启动的 AMPL 和求解器进程 (子进程在单独的进程组中)"""
+    with contextlib.suppress(OSError):
+        if hasattr(os, 'killpg'):
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    process.wait()
+
+
+def probe_isolated(solver, timeout=PROBE_TIMEOUT):
+    """
+    在子进程中探测一个求解器，超时时杀掉子进程
+
+    返回:
+    与 probe() 相同；超时的结果带有 'timeout': True
+    """
+    start = time.time()
+    process = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--probe", solver],
+                               stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                               start_new_session=True)
+    try:
+        output, _ = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        _kill(process)
+        return {'ok': False, 'seconds': timeout, 'error': f"探测超过 {timeout:.0f} 秒", 'timeout': True}
+    lines = output.decode('utf-8', 'replace').strip().splitlines()
+    try:
+        return json.loads(lines[-1])
+    except (ValueError, IndexError):
+        return {'ok': False, 'seconds': round(time.time() - start, 3),
+                'error': f"探测进程异常退出 (退出码 {process.returncode})"}
+
+
+def probe_all(solvers=CANDIDATES, timeout=PROBE_TIMEOUT):
+    """并行探测所有求解器 (每个探测一个子进程)，超时的探测视为不可用"""
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(solvers)) as executor:
+        results = list(executor.map(lambda name: probe_isolated(name, timeout), solvers))
+    return dict(zip(solvers, results))
+
+
+@contextlib.contextmanager
+def _locked(cache_path):
+    directory = os.path.dirname(cache_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(cache_path + ".lock", 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _load(cache_path):
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save(cache, cache_path):
+    directory = os.path.dirname(cache_path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"写入求解器检测缓存失败: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def detect(solvers=CANDIDATES, refresh=False, cache_path=DEFAULT_CACHE_PATH):
+    """
+    返回各求解器的探测结果 {求解器: {'ok', 'seconds', 'error'}}
+
+    环境指纹与缓存一致时使用缓存中的结果，只并行探测缓存中没有的求解器并写入缓存；
+    超时的探测结果只用于本次，不写入缓存 (下次运行重新探测)。
+    """
+    key = fingerprint(solvers)
+    with _locked(cache_path):
+        cache = _load(cache_path)
+        entry = cache.get(key) if not refresh else None
+        known = dict(entry['solvers']) if entry is not None else {}
+        missing = [name for name in solvers if name not in known]
+        if not missing:
+            return {name: known[name] for name in solvers}
+        results = probe_all(missing)
+        known.update({name: result for name, result in results.items() if not result.get('timeout')})
+        cache[key] = {'checked_at': datetime.datetime.now().isoformat(timespec='seconds'), 'solvers': known}
+        _save(cache, cache_path)
+    return {name: known.get(name) or results[name] for name in solvers}
+
+
+def available_solvers(solvers=CANDIDATES, refresh=False, cache_path=DEFAULT_CACHE_PATH):
+    """探测通过的求解器列表 (保持候选顺序)"""
+    return [name for name, result in detect(solvers, refresh, cache_path).items() if result['ok']]
+
+
+def clear(cache_path=DEFAULT_CACHE_PATH):
+    """删除检测缓存，下次运行重新探测"""
+    if os.path.exists(cache_path):
+        os.remove(cache_path)
+
+
+def from_argv(argv=None):
+    """从命令行参数中取出 --refresh-solvers (原地删除)，出现时清除检测缓存"""
+    argv = sys.argv if argv is None else argv
+    if '--refresh-solvers' in argv:
+        argv.remove('--refresh-solvers')
+        clear()
+        return True
+    return False
+
+
+def main():
+    if '--probe' in sys.argv:
+        # 子进程探测 (见 probe_isolated)，结果以一行 JSON 写到标准输出
+        print(json.dumps(probe(sys.argv[sys.argv.index('--probe') + 1]), ensure_ascii=False))
+        return 0
+    if importlib.util.find_spec("amplpy") is None:
+        print("错误: amplpy库未安装")
+        return 2
+    refresh = '--refresh' in sys.argv
+    start = time.time()
+    results = detect(refresh=refresh)
+    print(f"AMPL求解器检测结果 ({time.time() - start:.2f} 秒, 缓存 {DEFAULT_CACHE_PATH}):")
+    for name, result in results.items():
+        state = f"可用 ({result['seconds']:.2f} 秒)" if result['ok'] else f"不可用: {result['error']}"
+        print(f"  {name:<8} {state}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AMPL 参数扫描
+
+同一个模型只改一个参数 (需求场景、容量等) 反复求解时，以前每个变体都要单独运行一次
+ampl.py: 启动 AMPL、读模型、读数据、从零开始求解。本脚本:
+- 在一个 AMPL 会话中只读一次模型和数据
+- 每个场景用 getParameter(...).setValues 一次性更新整个参数，然后在原地重新求解；
+  上一个场景的解保留在会话中，作为下一个场景的初始点 (热启动)
+- 所有场景的结果汇总为一张对比表 (控制台和 CSV)，包括相对第一个成功场景的目标值变化
+- 可选地把场景分成连续的几段，分布在多个 AMPL 会话 (工作进程) 中并行求解
+
+详细中文注释:
+场景有三种给法:
+--values 100,120,140   参数取这些值 (标量参数)，或所有下标都取同一个值 (带下标的参数)
+--scale 0.8,1,1.2      参数在数据文件中的取值乘以这些系数
+--scenarios 文件.csv   每行一个 (场景, 下标..., 值)，标量参数没有下标列；
+                       文件中没有出现的下标保持数据文件中的取值
+每个场景都以数据文件中的取值为基准整体写入参数，场景之间互不影响 (只有初始点被继承)。
+--cold 时设置 option reset_initial_guesses 1，每次求解都不使用上一个场景的解。
+多个会话时每个会话处理一段相邻的场景，热启动只在段内继承，相邻场景的解通常最接近。
+求解参数选项 (--param-profile、--time-limit 等) 与 ampl.py 相同。
+
+用法:
+python ampl_sweep.py transport transport.dat --sweep demand --scale 0.8,0.9,1,1.1,1.2
+python ampl_sweep.py ampl/plan.mod ampl/plan.dat --sweep capacity --values 100,150,200 --solver gurobi
+python ampl_sweep.py plan plan.dat --sweep demand --scenarios scenarios.csv --workers 4 --reports
+"""
+import concurrent.futures
+import contextlib
+import csv
+import datetime
+import io
+import multiprocessing.util
+import os
+import sys
+import time
+
+import ampl
+import ampl_batch
+import solution_export
+import solver_params
+
+_session = None  # 工作进程中的扫描会话 (每个进程一个)
+
+
+def _member(text):
+    """CSV 中的下标和取值: 能转换为数字的按数字处理 (与 AMPL 的数值集合一致)"""
+    text = text.strip()
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+class SweepSession(ampl_batch.AMPLSession):
+    """
+    已读入模型和数据的 AMPL 进程，在多个场景之间复用
+
+    参数:
+    model_filepath - 模型文件 (.mod) 路径
+    data_filepath - 数据文件 (.dat) 路径，可选
+    param_name - 扫描的参数名
+    warm - 是否把上一个场景的解作为初始点
+    """
+
+    def __init__(self, model_filepath, data_filepath, param_name, warm=True):
+        self.data_filepath = data_filepath
+        self.param_name = param_name
+        self.warm = warm
+        super().__init__(model_filepath)
+
+    def _start(self):
+        super()._start()
+        if self.data_filepath:
+            self.ampl.readData(self.data_filepath)
+        self.ampl.setOption('reset_initial_guesses', 0 if self.warm else 1)
+        self.parameter = self.ampl.getParameter(self.param_name)
+        self.indexed = self.parameter.indexarity() > 0
+        # 数据文件中的取值: 每个场景都以它为基准
+        self.base = self.parameter.getValues().toDict() if self.indexed else self.parameter.value()
+        self.since_start = 0  # 本次启动以来求解的场景数 (大于 0 时为热启动)
+
+    def apply(self, scenario):
+        """把场景的取值一次性写入参数"""
+        if scenario.get('scale') is not None:
+            factor = scenario['scale']
+            values = {key: value * factor for key, value in self.base.items()} if self.indexed else self.base * factor
+        elif not self.indexed:
+            values = scenario['values']
+        elif isinstance(scenario['values'], dict):
+            values = dict(self.base)
+            values.update(scenario['values'])
+        else:
+            values = dict.fromkeys(self.base, scenario['values'])
+        if self.indexed:
+            self.parameter.setValues(values)
+        else:
+            self.parameter.set(values)
+
+    def solve_scenario(self, scenario, solver="auto", params=None, report=False, export=()):
+        """
+        更新参数并在原地重新求解一个场景
+
+        参数:
+        export - 导出解的格式列表 (见 solution_export.py)，为空时不导出
+
+        返回:
+        结果字典 (场景、是否成功、状态、目标值、求解时间、求解器、是否热启动、报告和日志路径)
+        """
+        if not self._healthy():
+            self.close()
+            self._start()
+            self.restarts += 1
+        result = {'scenario': scenario['name'], 'success': False, 'status': None, 'objective': None,
+                  'solve_time': None, 'solver': None, 'warm': self.warm and self.since_start > 0,
+                  'report': None, 'log': None, 'error': None}
+        start = time.time()
+        try:
+            self.apply(scenario)
+            instance = ampl.AMPLSolver(self.model_filepath, self.data_filepath, ampl=self.ampl, params=params,
+                                       data_loaded=True, scenario=scenario['name'])
+            result['success'] = bool(instance.solve_model(solver=solver))
+            result.update(status=instance.solve_status, objective=instance.objective_value,
+                          solve_time=instance.solve_time, solver=instance.solver_name,
+                          log=instance.log_filepath)
+            if report and result['success']:
+                result['report'] = instance.generate_latex_report()
+            if export and result['success']:
+                instance.export_solution(export)
+            self.since_start += 1
+        except Exception as e:
+            result['error'] = f"{type(e).__name__}: {e}"
+        result['elapsed'] = time.time() - start
+        self.solved += 1
+        return result
+
+
+def _init_worker(model_filepath, data_filepath, param_name, warm):
+    """
+    工作进程初始化: 创建本进程的扫描会话 (只读一次模型和数据)
+
+    工作进程通过 os._exit 退出，atexit 不会执行，会话由 multiprocessing 的终结器在进程池关闭时关闭。
+    """
+    global _session
+    with contextlib.redirect_stdout(io.StringIO()):
+        _session = SweepSession(model_filepath, data_filepath, param_name, warm)
+    multiprocessing.util.Finalize(_session, _session.close, exitpriority=10)
+
+
+def _run_chunk(session, chunk, solver, params, report, export, on_result=None):
+    """在一个会话中依次求解一段相邻的场景"""
+    results = []
+    for scenario in chunk:
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = session.solve_scenario(scenario, solver, params, report, export)
+        result['worker'] = os.getpid()
+        results.append(result)
+        if on_result is not None:
+            on_result(result)
+    return results
+
+
+def _sweep_in_worker(chunk, solver, params, report, export):
+    return _run_chunk(_session, chunk, solver, params, report, export)
+
+
+def split(scenarios, parts):
+    """把场景按顺序分成 parts 段相邻的场景 (各段长度最多相差 1)"""
+    size, extra = divmod(len(scenarios), parts)
+    chunks, start = [], 0
+    for index in range(parts):
+        end = start + size + (1 if index < extra else 0)
+        chunks.append(scenarios[start:end])
+        start = end
+    return chunks
+
+
+def _outcome(result):
+    if result.get('error'):
+        return f"错误 ({result['error']})"
+    if result['success']:
+        start = "热启动" if result['warm'] else "冷启动"
+        return f"目标值 {result['objective']}, {result['elapsed']:.2f} 秒 ({start})"
+    return f"未求解成功 ({result['status']})"
+
+
+def run_sweep(model_filepath, data_filepath, param_name, scenarios, workers=1, solver="auto", params=None,
+              report=False, warm=True, export=()):
+    """
+    依次 (或分段并行) 求解所有场景，每完成一个场景打印一行进度
+
+    返回:
+    结果字典列表 (与 scenarios 同序)
+    """
+    workers = max(1, min(workers or 1, len(scenarios)))
+    print(f"参数扫描: 模型 {model_filepath}, 参数 {param_name}, {len(scenarios)} 个场景, {workers} 个AMPL会话")
+    done = [0]
+
+    def show(result):
+        done[0] += 1
+        print(f"  [{done[0]}/{len(scenarios)}] {result['scenario']}: {_outcome(result)}")
+
+    if workers == 1:
+        with contextlib.redirect_stdout(io.StringIO()):
+            session = SweepSession(model_filepath, data_filepath, param_name, warm)
+        try:
+            return _run_chunk(session, scenarios, solver, params, report, export, show)
+        finally:
+            session.close()
+
+    results = {}
+    chunks = split(scenarios, workers)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                                initargs=(model_filepath, data_filepath, param_name, warm)) as executor:
+        futures = {executor.submit(_sweep_in_worker, chunk, solver, params, report, export): chunk for chunk in chunks}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                chunk_results = future.result()
+            except concurrent.futures.BrokenExecutor as e:
+                chunk_results = [{'scenario': scenario['name'], 'success': False, 'warm': False,
+                                  'error': f"工作进程异常退出: {e}"} for scenario in futures[future]]
+            for scenario, result in zip(futures[future], chunk_results):
+                results[id(scenario)] = result
+                show(result)
+    return [results[id(scenario)] for scenario in scenarios]
+
+
+def compare(results):
+    """
+    以第一个求解成功的场景为基准，计算各场景目标值的变化量和变化百分比 (原地加入结果字典)
+    """
+    baseline = next((r['objective'] for r in results if r.get('success') and r.get('objective') is not None), None)
+    for result in results:
+        result['delta'] = result['delta_pct'] = None
+        if baseline is None or not result.get('success') or result.get('objective') is None:
+            continue
+        result['delta'] = result['objective'] - baseline
+        if baseline != 0:
+            result['delta_pct'] = 100.0 * result['delta'] / abs(baseline)
+    return results
+
+
+def print_table(results):
+    """在控制台打印场景对比表"""
+    width = max([len("场景")] + [len(str(r['scenario'])) for r in results])
+    print(f"\n{'场景':<{width}}  {'状态':<10} {'目标值':>16} {'变化':>14} {'变化%':>9} {'求解(秒)':>9}")
+    for r in results:
+        status = "错误" if r.get('error') else (r.get('status') or "-")
+        objective = f"{r['objective']:.8g}" if r.get('objective') is not None else "-"
+        delta = f"{r['delta']:+.6g}" if r.get('delta') is not None else "-"
+        delta_pct = f"{r['delta_pct']:+.2f}" if r.get('delta_pct') is not None else "-"
+        solve_time = f"{r['solve_time']:.3f}" if r.get('solve_time') is not None else "-"
+        print(f"{str(r['scenario']):<{width}}  {status:<10} {objective:>16} {delta:>14} {delta_pct:>9} {solve_time:>9}")
+
+
+CSV_COLUMNS = ("scenario", "success", "status", "objective", "delta", "delta_pct", "solve_time", "elapsed",
+               "warm", "solver", "report", "log", "error")
+
+
+def write_csv(results, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def _numbers(text, flag):
+    try:
+        return [float(part) for part in text.split(',') if part.strip()]
+    except ValueError:
+        raise ValueError(f"{flag} 需要逗号分隔的数值: {text}")
+
+
+def load_scenarios(path):
+    """
+    读取场景文件 (CSV)
+
+    每行: 场景名, 下标1, ..., 下标k, 值 (标量参数只有场景名和值)；以 # 开头的行和空行被忽略，
+    第一行如果最后一列不是数值则作为表头跳过。
+
+    返回:
+    场景列表 (按首次出现的顺序)，带下标的场景取值为 {下标: 值}
+    """
+    scenarios = {}
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        for line_number, row in enumerate(csv.reader(f), 1):
+            if not row or not row[0].strip() or row[0].lstrip().startswith('#'):
+                continue
+            if len(row) < 2:
+                raise ValueError(f"{path}:{line_number}: 每行至少需要场景名和值")
+            value = _member(row[-1])
+            if not isinstance(value, float):
+                if line_number == 1:
+                    continue
+                raise ValueError(f"{path}:{line_number}: 值不是数值: {row[-1]}")
+            name = row[0].strip()
+            index = [_member(part) for part in row[1:-1]]
+            if not index:
+                scenarios[name] = value
+                continue
+            values = scenarios.setdefault(name, {})
+            if not isinstance(values, dict):
+                raise ValueError(f"{path}:{line_number}: 场景 {name} 同时给出了标量值和带下标的值")
+            values[index[0] if len(index) == 1 else tuple(index)] = value
+    return [{'name': name, 'values': values, 'scale': None} for name, values in scenarios.items()]
+
+
+def main():
+    """
+    主函数
+
+    用法:
+    python ampl_sweep.py 模型 [数据文件] --sweep 参数名 (--values 列表 | --scale 列表 | --scenarios 文件) [选项]
+
+    选项:
+    --sweep 参数名     扫描的参数
+    --values a,b,...   参数取值列表 (带下标的参数所有下标取同一个值)
+    --scale a,b,...    数据文件取值的缩放系数列表
+    --scenarios 路径   场景文件 (CSV，每行: 场景名, 下标..., 值)
+    --workers N        AMPL会话 (工作进程) 数，默认 1 (所有场景依次热启动)
+    --solver 名称      求解器 (默认 auto 自动选择)
+    --cold             不使用上一个场景的解作为初始点
+    --reports          为每个场景生成LaTeX报告
+    --csv 路径         对比表 CSV 文件 (默认 ampl_reports/sweep_<模型>_<参数>_<时间>.csv)
+    --export 格式      另外把每个场景的解导出到 solution_exports/ (sol,csv,bin 或 all)
+    另外支持 --param-profile、--time-limit、--gap、--threads、--param 名称=值
+    """
+    try:
+        param_profile, param_overrides = solver_params.from_argv()
+        params = solver_params.resolve("ampl", param_profile, param_overrides)
+    except (ValueError, OSError) as e:
+        print(f"求解参数错误: {e}")
+        return 2
+    try:
+        export = solution_export.from_argv()
+    except ValueError as e:
+        print(f"错误: {e}")
+        return 2
+    args = sys.argv[1:]
+    options = {'--sweep': None, '--values': None, '--scale': None, '--scenarios': None, '--workers': None,
+               '--solver': "auto", '--csv': None}
+    for flag in list(options):
+        if flag in args:
+            index = args.index(flag)
+            options[flag] = args[index + 1] if index + 1 < len(args) else None
+            del args[index:index + 2]
+    report = '--reports' in args
+    warm = '--cold' not in args
+    if '-h' in args or '--help' in args:
+        print(main.__doc__)
+        return 0
+    args = [arg for arg in args if not arg.startswith('--')]
+    sources = [flag for flag in ('--values', '--scale', '--scenarios') if options[flag]]
+    if not args or not options['--sweep'] or len(sources) != 1:
+        print(main.__doc__)
+        return 2
+    if not ampl.AMPL_AVAILABLE:
+        print("错误: amplpy库未安装")
+        return 2
+
+    model_filepath, data_filepath = ampl.find_ampl_files(args[0], args[1] if len(args) > 1 else None)
+    if model_filepath is None:
+        print(f"未找到模型文件: {args[0]}")
+        return 2
+    param_name = options['--sweep']
+    try:
+        if options['--values']:
+            scenarios = [{'name': f"{param_name}={value:g}", 'values': value, 'scale': None}
+                         for value in _numbers(options['--values'], '--values')]
+        elif options['--scale']:
+            scenarios = [{'name': f"x{factor:g}", 'values': None, 'scale': factor}
+                         for factor in _numbers(options['--scale'], '--scale')]
+        else:
+            scenarios = load_scenarios(options['--scenarios'])
+    except (ValueError, OSError) as e:
+        print(f"场景错误: {e}")
+        return 2
+    if not scenarios:
+        print("没有可求解的场景")
+        return 2
+
+    start = time.time()
+    results = run_sweep(model_filepath, data_filepath, param_name, scenarios,
+                        int(options['--workers']) if options['--workers'] else 1, options['--solver'], params,
+                        report, warm, export)
+    elapsed = time.time() - start
+
+    compare(results)
+    print_table(results)
+    solved = sum(1 for r in results if r['success'])
+    print(f"\n完成: {solved}/{len(results)} 个场景求解成功, 总耗时 {elapsed:.1f} 秒")
+    csv_path = options['--csv']
+    if csv_path is None:
+        model_name = os.path.splitext(os.path.basename(model_filepath))[0]
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        csv_path = os.path.join("ampl_reports", f"sweep_{model_name}_{param_name}_{timestamp}.csv")
+    write_csv(results, csv_path)
+    print(f"场景对比表: {os.path.abspath(csv_path)}")
+    return 0 if solved == len(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
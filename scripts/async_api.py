@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+asyncio 求解接口
+
+本模块供 asyncio 服务 (如 Web 服务) 嵌入 mps.py / mps_gurobi.py / qps.py / ampl.py 的求解器，
+不阻塞事件循环。
+主要功能:
+- await solve(path, backend=..., params=...): 创建求解器、读取/求解和生成报告都在执行器线程中运行
+- 超时: 到时后中断求解器，返回当前结果并标记 timed_out；AMPL 没有中断接口，超时时杀掉
+  AMPL进程 (竞速时杀掉各求解器子进程，已有的解仍会读回)，被杀掉的AMPL会话 (env) 不能再使用
+- 协作式取消: 任务被取消时调用求解器的中断接口 (COPT interrupt / Gurobi terminate / AMPL kill)，
+  求解尚未开始时在进入求解阶段前停止
+- 进度事件: async for event in job 逐个得到阶段开始/结束、MIP进度 (当前解/最优界) 和结束事件
+
+用法:
+    import async_api
+
+    result = await async_api.solve("mps/ran10x10.mps", backend="copt", params={"TimeLimit": 60})
+
+    job = async_api.submit("qps/values.qps", backend="qps", timeout=30)
+    async for event in job:
+        print(event)
+    result = await job
+
+详细中文注释:
+阶段事件来自传给求解器的 profiler (与 --profile 使用同一组 span 名称: read、build.*、solve、report.* 等)，
+MIP 进度来自求解器的 progress_listeners (挂到 SolveTrajectory 上)。这两类回调都在执行器线程中
+触发，通过 loop.call_soon_threadsafe 放入事件队列。每个任务的求解器对象只在一个线程中使用，
+多个任务可以在同一个事件循环中并发等待；并发数由执行器的线程数决定。
+求解器在求解真正开始之前收到的中断会被忽略 (检查取消标志之后、调用求解器之前的短暂窗口)，
+因此中断之后每隔 INTERRUPT_RETRY 秒重发一次，直到求解返回。
+"""
+import asyncio
+import contextlib
+import os
+import time
+
+# 后端名 -> (模块名, 求解器类名, 中断方法名)；AMPL 的中断方法在求解器对象上，其他后端在模型对象上
+BACKENDS = {
+    "copt": ("mps", "MPSCOPTSolver", "interrupt"),
+    "gurobi": ("mps_gurobi", "MPSSolver", "terminate"),
+    "qps": ("qps", "QPSSolver", "interrupt"),
+    "ampl": ("ampl", "AMPLSolver", "kill"),
+}
+INTERRUPT_RETRY = 1.0  # 中断后求解仍未返回时重发中断的间隔 (秒)
+
+
+class SolveCancelled(BaseException):
+    """
+    在求解阶段开始前取消任务时抛出
+
+    继承 BaseException，避免被各脚本 solve_model() 中的 except Exception 吞掉。
+    """
+
+
+class _ProgressProfiler:
+    """把阶段的开始/结束转发为进度事件的 profiler，接口与 profiling.NULL_PROFILER 相同"""
+
+    enabled = False
+    name = None
+
+    def __init__(self, job):
+        self.job = job
+
+    @contextlib.contextmanager
+    def span(self, name, **args):
+        token = self.begin(name, **args)
+        try:
+            yield
+        finally:
+            self.end(token)
+
+    def begin(self, name, **args):
+        if self.job.cancel_requested and name == "solve":
+            raise SolveCancelled(name)
+        self.job._emit({'type': 'phase', 'phase': name, 'state': 'start'})
+        return name
+
+    def end(self, token):
+        if token is not None:
+            self.job._emit({'type': 'phase', 'phase': token, 'state': 'end'})
+
+    def to_latex(self):
+        return ""
+
+    def finish(self):
+        return None
+
+
+class SolveJob:
+    """
+    一个异步求解任务 (由 submit() 创建)
+
+    await job 得到结果字典；async for event in job 得到进度事件，任务结束后迭代停止。
+    job.cancel() 请求取消，被等待的任务随后抛出 asyncio.CancelledError。
+    """
+
+    def __init__(self, path, backend, params, report, force_solve, timeout, executor, env, data_path):
+        if backend not in BACKENDS:
+            raise ValueError(f"未知的后端: {backend} (可选: {', '.join(BACKENDS)})")
+        self.path = path
+        self.backend = backend
+        self.params = dict(params or {})
+        self.report = report
+        self.force_solve = force_solve
+        self.timeout = timeout
+        self.executor = executor
+        self.env = env
+        self.data_path = data_path
+        self.solver = None
+        self.cancel_requested = False
+        self.timed_out = False
+        self.loop = asyncio.get_running_loop()
+        self.events = asyncio.Queue()
+        self.started = time.time()
+        self.task = self.loop.create_task(self._run())
+
+    # ---- 进度事件 ----
+
+    def _emit(self, event):
+        """可以在任意线程中调用"""
+        event.setdefault('time', round(time.time() - self.started, 6))
+        self.loop.call_soon_threadsafe(self.events.put_nowait, event)
+
+    def _on_progress(self, t, incumbent, bound, nodes):
+        self._emit({'type': 'progress', 'incumbent': incumbent, 'bound': bound,
+                    'nodes': None if nodes != nodes else nodes})
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        while True:
+            event = await self.events.get()
+            yield event
+            if event['type'] in ('done', 'error', 'cancelled'):
+                return
+
+    def __await__(self):
+        return self.task.__await__()
+
+    def cancel(self):
+        """请求取消任务"""
+        self.task.cancel()
+
+    # ---- 执行 ----
+
+    def _interrupt(self):
+        """请求求解器停止: 尚未进入求解阶段时由 profiler 抛出 SolveCancelled，求解中调用中断接口"""
+        self.cancel_requested = True
+        method = BACKENDS[self.backend][2]
+        target = self.solver if self.backend == "ampl" else getattr(self.solver, 'model', None)
+        if target is not None and hasattr(target, method):
+            try:
+                getattr(target, method)()
+            except Exception as e:
+                self._emit({'type': 'warning', 'message': f"中断求解器失败: {e}"})
+
+    async def _stop(self, future):
+        """中断求解器并等待 future 结束，求解仍未返回时每隔 INTERRUPT_RETRY 秒重发中断"""
+        self._interrupt()
+        while not (await asyncio.wait({future}, timeout=INTERRUPT_RETRY))[0]:
+            self._interrupt()
+
+    def _create_solver(self):
+        import importlib
+        module_name, class_name, _ = BACKENDS[self.backend]
+        cls = getattr(importlib.import_module(module_name), class_name)
+        profiler = _ProgressProfiler(self)
+        if self.backend == "ampl":
+            kwargs = {'ampl': self.env} if self.env is not None else {}
+            solver = cls(self.path, self.data_path, profiler=profiler, **kwargs)
+        else:
+            kwargs = {'env': self.env} if self.env is not None else {}
+            solver = cls(self.path, profiler=profiler, force_solve=self.force_solve, params=self.params, **kwargs)
+            if hasattr(solver, 'progress_listeners'):
+                solver.progress_listeners.append(self._on_progress)
+        return solver
+
+    def _solve(self):
+        if self.backend == "ampl":
+            self.solver.solve_model(options=self.params or None)
+        else:
+            self.solver.solve_model()
+
+    def _write_report(self):
+        if self.backend in ("qps", "ampl"):
+            return self.solver.generate_latex_report()
+        return self.solver.extract_to_latex()
+
+    async def _offload(self, func, deadline=None):
+        """
+        在执行器中运行 func；到达 deadline 或任务被取消时中断求解器并等待其结束
+
+        返回:
+        (func 的返回值, 是否超时)
+        """
+        future = self.loop.run_in_executor(self.executor, func)
+        try:
+            remaining = None if deadline is None else max(0.0, deadline - self.loop.time())
+            done, _ = await asyncio.wait({future}, timeout=remaining)
+            if done:
+                return future.result(), False
+            self.timed_out = True
+            await self._stop(future)
+        except asyncio.CancelledError:
+            with contextlib.suppress(BaseException):
+                await self._stop(future)
+            raise
+        try:
+            return await future, True
+        except SolveCancelled:
+            return None, True
+
+    async def _run(self):
+        deadline = None if self.timeout is None else self.loop.time() + self.timeout
+        try:
+            self.solver, _ = await self._offload(self._create_solver)
+            try:
+                _, timed_out = await self._offload(self._solve, deadline)
+            except SolveCancelled:
+                timed_out = True
+            report = None
+            if self.report and not timed_out:
+                report, _ = await self._offload(self._write_report)
+            result = self._result(report)
+        except asyncio.CancelledError:
+            self._emit({'type': 'cancelled'})
+            raise
+        except Exception as e:
+            self._emit({'type': 'error', 'error': f"{type(e).__name__}: {e}"})
+            raise
+        self._emit({'type': 'done', 'result': {k: v for k, v in result.items() if k != 'solution'}})
+        return result
+
+    def _result(self, report):
+        solver = self.solver
+        return {
+            'path': self.path,
+            'backend': self.backend,
+            'status': solver.solve_status,
+            'objective': solver.objective_value,
+            'solution': solver.solution,
+            'solve_time': solver.solve_time,
+            'from_cache': getattr(solver, 'from_cache', False),
+            'timed_out': self.timed_out,
+            'report': os.path.abspath(report) if report else None,
+            'log': os.path.abspath(solver.log_filepath) if solver.log_filepath else None,
+        }
+
+
+def submit(path, backend="copt", params=None, report=True, force_solve=False, timeout=None,
+           executor=None, env=None, data_path=None):
+    """
+    在当前事件循环中启动一个求解任务，立即返回 SolveJob
+
+    参数:
+    path - 实例文件路径 (ampl 后端为 .mod 文件)
+    backend - copt / gurobi / qps / ampl
+    params - 求解参数字典 (ampl 后端作为求解器选项)
+    report - 是否生成LaTeX报告 (超时的任务不生成)
+    force_solve - 忽略求解结果缓存
+    timeout - 超时秒数，到时中断求解器并返回当前结果 (timed_out=True)
+    executor - concurrent.futures 执行器，默认使用事件循环的默认线程池
+    env - 复用的求解器环境 (COPT Envr / Gurobi Env / AMPL 对象)，调用方负责保证同一时刻只有一个任务使用
+    data_path - ampl 后端的 .dat 文件
+    """
+    return SolveJob(path, backend, params, report, force_solve, timeout, executor, env, data_path)
+
+
+async def solve(path, backend="copt", params=None, **kwargs):
+    """求解并返回结果字典，参数同 submit()"""
+    return await submit(path, backend=backend, params=params, **kwargs)
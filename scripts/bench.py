@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内部微基准测试
+
+本脚本单独测量本工具自身各阶段的开销 (不含真实求解时间)。
+测量的阶段:
+- parse:       QPSParser.parse
+- variables:   QPSSolver._create_variables
+- objective:   QPSSolver._set_objective
+- constraints: QPSSolver._add_constraints
+- solve:       模型求解 (默认使用不需要许可证的桩后端 copt_stub)
+- sort_keys:   变量/约束排序键 (_get_variable_sort_key, _get_constraint_sort_key)
+- names:       变量名格式化 (_analyze_variable_patterns, _parse_variable_name)
+- model_latex / solution_latex / report: 各LaTeX章节生成器和完整报告
+- startup (--startup): 各脚本 --list 快速路径的启动时间，以及导入脚本模块时是否加载了求解器库/NumPy
+
+详细中文注释:
+基准实例由 instance_gen.py 按规模档位生成到临时目录 (随机稀疏LP + 带状QP)。
+每个档位重复运行整个流程 --repeat 次，每个阶段取最短时间；随后在 tracemalloc
+下额外运行一次，记录每个阶段的峰值内存。结果以 "非零元/秒" 的吞吐量显示。
+--save 将结果保存为JSON基线，--check 与基线比较，任何阶段的时间或内存
+超过阈值 (默认 25%) 即视为性能退化，程序以退出码 1 结束，可直接用于CI。
+"""
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import copt_stub
+
+DEFAULT_BASELINE = os.path.join("benchmarks", "baseline.json")
+
+# 规模档位: 名称 -> (LP 行数, LP 列数, QP 变量数)，LP 每列 3 个非零元
+SCALES = {
+    "small": (50, 500, 500),
+    "medium": (200, 2000, 2000),
+    "large": (800, 8000, 8000),
+}
+
+PHASES = ("parse", "variables", "objective", "constraints", "solve",
+          "sort_keys", "names", "model_latex", "solution_latex", "report")
+
+# 短于该时间(秒)的阶段计时噪声太大，不参与时间退化判断
+MIN_CHECKED_SECONDS = 0.005
+# 小于该值(KB)的内存峰值不参与内存退化判断
+MIN_CHECKED_KB = 256
+
+# 启动时间预算(秒): 列出文件等不需要求解器的操作必须在该时间内完成
+STARTUP_BUDGET = 0.1
+# 这些模块只允许在真正求解或分析时导入
+HEAVY_MODULES = ("coptpy", "gurobipy", "amplpy", "numpy")
+STARTUP_SCRIPTS = ("mps.py", "mps_gurobi.py", "ampl.py")
+IMPORT_CHECK_MODULES = ("mps", "mps_gurobi", "qps", "ampl", "log_ingest", "dashboard", "instance_gen")
+
+
+def _load_qps_module(backend):
+    """按所选后端导入 qps 模块 (桩后端在导入前注册为 coptpy)"""
+    using_stub = copt_stub.install(force=(backend == "stub"))
+    if backend == "copt" and using_stub:
+        raise RuntimeError("未安装 coptpy，无法使用 copt 后端")
+    import qps
+    return qps
+
+
+def build_instances(scale, directory):
+    """生成某个档位的基准实例，返回 [(实例名, 路径)]"""
+    from instance_gen import generate
+    rows, cols, qp_vars = SCALES[scale]
+    instances = []
+    for label, family, size in (("lp", "lp", (rows, cols)), ("qp", "qp-band", (qp_vars,))):
+        path = os.path.join(directory, f"bench_{scale}_{label}.qps")
+        if not os.path.exists(path):
+            generate(family, path, size, density=3.0 / rows, seed=0, width=3)
+        instances.append((f"{scale}/{label}", path))
+    return instances
+
+
+class PhaseTimer:
+    """记录一次流程中每个阶段的耗时，可选地记录 tracemalloc 峰值"""
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.seconds = {}
+        self.peak_kb = {}
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = time.perf_counter() - start
+            if self.trace_memory:
+                self.peak_kb[name] = (tracemalloc.get_traced_memory()[1] - base) / 1024.0
+
+
+def run_pipeline(qps, path, timer, report_dir):
+    """完整运行一次 解析 -> 建模 -> 求解 -> 报告 流程，返回非零元数量"""
+    solver = qps.QPSSolver(path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        with timer.phase("parse"):
+            solver.parser.parse()
+
+        solver.env = qps.cp.Envr()
+        solver.model = solver.env.createModel("bench")
+        with timer.phase("variables"):
+            solver._create_variables()
+        with timer.phase("objective"):
+            solver._set_objective()
+        with timer.phase("constraints"):
+            solver._add_constraints()
+
+        with timer.phase("solve"):
+            solver.model.solve()
+            solver.solve_status = solver.model.Status
+            solver.objective_value = solver.model.ObjVal
+            solver.solution = {name: var.X for name, var in solver.variables.items()}
+
+        names = list(solver.variables)
+        with timer.phase("sort_keys"):
+            sorted(names, key=solver._get_variable_sort_key)
+            sorted(solver.parser.rows, key=solver._get_constraint_sort_key)
+        with timer.phase("names"):
+            solver._analyze_variable_patterns()
+            for name in names:
+                solver._parse_variable_name(name)
+
+        with timer.phase("model_latex"):
+            solver._build_mathematical_model_latex()
+        with timer.phase("solution_latex"):
+            solver._summarize_bounds()
+            solver._analyze_solution()
+        with timer.phase("report"):
+            solver.generate_latex_report(os.path.join(report_dir, "bench_report.tex"))
+
+    return sum(len(coeffs) for coeffs in solver.parser.cols.values()) + len(solver.parser.quadobj)
+
+
+def run_benchmarks(scales, repeat=3, backend="stub"):
+    """
+    运行基准测试
+
+    返回:
+    {实例名: {'nonzeros': n, 'phases': {阶段: {'seconds': s, 'peak_kb': kb}}}}
+    """
+    qps = _load_qps_module(backend)
+    workdir = tempfile.mkdtemp(prefix="opt_bench_")
+    results = {}
+    try:
+        for scale in scales:
+            for instance, path in build_instances(scale, workdir):
+                best = {}
+                nonzeros = 0
+                for _ in range(repeat):
+                    timer = PhaseTimer()
+                    nonzeros = run_pipeline(qps, path, timer, workdir)
+                    for name, seconds in timer.seconds.items():
+                        best[name] = min(seconds, best.get(name, float('inf')))
+
+                memory_timer = PhaseTimer(trace_memory=True)
+                tracemalloc.start()
+                try:
+                    run_pipeline(qps, path, memory_timer, workdir)
+                finally:
+                    tracemalloc.stop()
+
+                results[instance] = {
+                    'nonzeros': nonzeros,
+                    'phases': {name: {'seconds': best[name], 'peak_kb': memory_timer.peak_kb.get(name, 0.0)}
+                               for name in PHASES},
+                }
+                print(f"  完成 {instance} ({nonzeros} 个非零元)")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def measure_startup(repeat=5):
+    """
+    测量各脚本 --list 快速路径的启动时间 (含解释器启动，取最短时间)，
+    并检查导入所有脚本模块后是否加载了 HEAVY_MODULES 中的模块
+
+    返回:
+    ({命令: 秒}, [被提前导入的模块])
+    """
+    scripts_dir = os.path.dirname(os.path.abspath(__file__))
+    workdir = tempfile.mkdtemp(prefix="opt_startup_")
+    timings = {}
+    try:
+        commands = {"python -c pass": [sys.executable, "-c", "pass"]}
+        for script in STARTUP_SCRIPTS:
+            commands[f"{script} --list"] = [sys.executable, os.path.join(scripts_dir, script), "--list"]
+        for label, command in commands.items():
+            best = float('inf')
+            for _ in range(repeat):
+                start = time.perf_counter()
+                subprocess.run(command, cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                best = min(best, time.perf_counter() - start)
+            timings[label] = best
+
+        check = (f"import sys; sys.path.insert(0, {scripts_dir!r}); "
+                 f"import {', '.join(IMPORT_CHECK_MODULES)}; "
+                 f"print('HEAVY:' + ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+        output = subprocess.run([sys.executable, "-c", check], cwd=workdir, capture_output=True, text=True)
+        if output.returncode != 0:
+            raise RuntimeError(f"导入脚本模块失败:\n{output.stderr}")
+        # 脚本模块导入时可能打印警告，只取标记行
+        marked = [line for line in output.stdout.splitlines() if line.startswith("HEAVY:")]
+        eager = [m for m in marked[-1][len("HEAVY:"):].split(",") if m] if marked else []
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return timings, eager
+
+
+def check_startup(budget=STARTUP_BUDGET, repeat=5):
+    """运行启动基准并打印结果，超出预算或提前导入重量级模块时返回 False"""
+    timings, eager = measure_startup(repeat)
+    print(f"\n启动时间 (预算 {budget * 1000:.0f} 毫秒):")
+    ok = True
+    for label, seconds in timings.items():
+        over = label != "python -c pass" and seconds > budget
+        ok = ok and not over
+        print(f"  {label:<24}{seconds * 1000:>10.1f} 毫秒{'  超出预算' if over else ''}")
+    if eager:
+        ok = False
+        print(f"  导入脚本模块时提前加载了: {', '.join(eager)}")
+    else:
+        print(f"  导入脚本模块时未加载 {', '.join(HEAVY_MODULES)}")
+    return ok
+
+
+def print_results(results):
+    """打印每个实例各阶段的耗时、吞吐量和内存峰值"""
+    for instance, data in results.items():
+        nonzeros = data['nonzeros']
+        print(f"\n{instance}  (非零元: {nonzeros})")
+        print(f"  {'阶段':<16}{'耗时(毫秒)':>14}{'非零元/秒':>16}{'峰值内存(KB)':>16}")
+        for name, phase in data['phases'].items():
+            seconds = phase['seconds']
+            throughput = nonzeros / seconds if seconds > 0 else float('inf')
+            print(f"  {name:<16}{seconds * 1000:>14.2f}{throughput:>16.0f}{phase['peak_kb']:>16.0f}")
+
+
+def save_baseline(results, path=DEFAULT_BASELINE):
+    """将结果保存为JSON基线"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    payload = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': results,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2, ensure_ascii=False)
+    print(f"\n基线已保存: {path}")
+
+
+def compare_with_baseline(results, baseline, threshold=0.25):
+    """
+    与基线比较，返回退化列表
+
+    返回:
+    [(实例名, 阶段, 指标, 基线值, 当前值)]，指标为 'seconds' 或 'peak_kb'
+    """
+    regressions = []
+    for instance, data in results.items():
+        base = baseline.get('results', {}).get(instance)
+        if base is None:
+            continue
+        for name, phase in data['phases'].items():
+            base_phase = base['phases'].get(name)
+            if base_phase is None:
+                continue
+            for metric, minimum in (('seconds', MIN_CHECKED_SECONDS), ('peak_kb', MIN_CHECKED_KB)):
+                old, new = base_phase[metric], phase[metric]
+                if max(old, new) < minimum:
+                    continue
+                if new > old * (1.0 + threshold):
+                    regressions.append((instance, name, metric, old, new))
+    return regressions
+
+
+def main():
+    """
+    主函数
+
+    用法:
+    python bench.py                         # 运行 small 和 medium 档位
+    python bench.py --scales small,medium,large --repeat 5
+    python bench.py --save                  # 保存为基线 benchmarks/baseline.json
+    python bench.py --check --threshold 0.3 # 与基线比较，退化时退出码为 1
+    python bench.py --backend copt          # 使用真实的 COPT 求解
+    python bench.py --startup               # 只检查启动时间 (预算 100 毫秒)
+    """
+    args = sys.argv[1:]
+    if '-h' in args or '--help' in args:
+        print(main.__doc__)
+        return 0
+
+    options = {'--scales': "small,medium", '--repeat': 3, '--baseline': DEFAULT_BASELINE,
+               '--threshold': 0.25, '--backend': "stub", '--startup-budget': STARTUP_BUDGET}
+    for flag in list(options):
+        if flag in args:
+            index = args.index(flag)
+            options[flag] = args[index + 1]
+            del args[index:index + 2]
+
+    if '--startup' in args:
+        return 0 if check_startup(float(options['--startup-budget'])) else 1
+
+    scales = [s for s in options['--scales'].split(",") if s]
+    unknown = [s for s in scales if s not in SCALES]
+    if unknown:
+        print(f"未知的规模档位: {', '.join(unknown)} (可选: {', '.join(SCALES)})")
+        return 2
+
+    print(f"运行基准测试: 档位={','.join(scales)} 重复={options['--repeat']} 后端={options['--backend']}")
+    results = run_benchmarks(scales, int(options['--repeat']), options['--backend'])
+    print_results(results)
+
+    if '--save' in args:
+        save_baseline(results, options['--baseline'])
+
+    if '--check' in args:
+        baseline_path = options['--baseline']
+        if not os.path.exists(baseline_path):
+            print(f"\n基线文件不存在: {baseline_path}，请先运行 --save")
+            return 2
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        threshold = float(options['--threshold'])
+        regressions = compare_with_baseline(results, baseline, threshold)
+        if regressions:
+            print(f"\n发现 {len(regressions)} 处性能退化 (阈值 {threshold:.0%}):")
+            for instance, name, metric, old, new in regressions:
+                unit = "毫秒" if metric == 'seconds' else "KB"
+                scale = 1000 if metric == 'seconds' else 1
+                print(f"  {instance} {name} {metric}: {old * scale:.2f} -> {new * scale:.2f} {unit} "
+                      f"(+{(new / old - 1) if old else float('inf'):.0%})")
+            return 1
+        print(f"\n未发现性能退化 (阈值 {threshold:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+实例文件目录 (catalog)
+
+本模块维护一个保存在磁盘上的实例文件目录 (SQLite，默认位置 cache/instance_catalog.db)，
+替代 find_mps_file / find_qps_file / find_ampl_files 中逐个探测路径的做法。
+主要功能:
+- 记录每个实例文件的 名称 -> 路径、大小、修改时间、内容哈希、格式、是否压缩、基本规模(行/列/非零元)
+- 并行扫描器 (线程池) 计算哈希和规模，适合网络存储上的大量文件
+- 增量刷新: 目录只在其修改时间变化时重新列出，文件只在大小或修改时间变化时重新扫描
+- 按名称的索引查找，以及供交互式输入使用的模糊前缀匹配
+
+详细中文注释:
+目录中的路径与各脚本原来的搜索目录一致 (相对于当前工作目录)，因此查找结果
+可以直接替代原来的路径探测。查找命中后只对该文件做一次 os.stat 校验，文件已被
+删除或修改时自动更新目录。内容哈希为文件原始字节的 SHA-256，可用作结果缓存的键。
+MPS/QPS 文件的规模在计算哈希的同一遍读取中统计 (压缩文件需要额外解压一遍)。
+
+用法:
+python catalog.py                 # 增量刷新并显示统计
+python catalog.py --rebuild       # 重新扫描所有文件
+python catalog.py --find ran10x10
+python catalog.py --complete ran1
+python catalog.py 目录1 目录2      # 额外扫描指定目录
+"""
+import bz2
+import gzip
+import hashlib
+import lzma
+import os
+import sqlite3
+import sys
+import time
+
+DEFAULT_CATALOG_PATH = os.path.join("cache", "instance_catalog.db")
+
+# 各脚本原来的搜索目录 (非递归)，按优先级排列
+DEFAULT_ROOTS = (".", "mps", "milp", "qps", "ampl", "models", "data", "instances")
+
+# 扩展名 -> 格式
+FORMATS = {".mps": "mps", ".qps": "qps", ".mod": "mod", ".dat": "dat"}
+COMPRESSED_OPENERS = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS instances (
+    path TEXT PRIMARY KEY,
+    name TEXT,
+    stem TEXT,
+    directory TEXT,
+    root_rank INTEGER,
+    format TEXT,
+    compressed INTEGER,
+    size INTEGER,
+    mtime REAL,
+    content_hash TEXT,
+    rows INTEGER,
+    cols INTEGER,
+    nonzeros INTEGER,
+    scanned_at REAL
+);
+CREATE INDEX IF NOT EXISTS instances_stem ON instances(stem, format);
+CREATE INDEX IF NOT EXISTS instances_name ON instances(name);
+CREATE TABLE IF NOT EXISTS directories (
+    path TEXT PRIMARY KEY,
+    mtime REAL
+);
+"""
+
+_COLUMNS = ("path", "name", "stem", "directory", "root_rank", "format", "compressed", "size", "mtime",
+            "content_hash", "rows", "cols", "nonzeros", "scanned_at")
+
+
+def classify(filename):
+    """
+    根据文件名判断实例格式
+
+    返回:
+    (格式, 是否压缩, 去掉扩展名的主干名)，不是实例文件时返回 None
+    """
+    base, ext = os.path.splitext(filename)
+    compressed = ext.lower() in COMPRESSED_OPENERS
+    if compressed:
+        base, ext = os.path.splitext(base)
+    fmt = FORMATS.get(ext.lower())
+    if fmt is None:
+        return None
+    return fmt, compressed, base
+
+
+def _count_mps_dimensions(lines):
+    """流式统计MPS/QPS的行数(不含目标行)、列数和约束矩阵非零元数"""
+    section = None
+    rows = cols = nonzeros = 0
+    objective_rows = set()
+    last_col = None
+    for raw in lines:
+        line = raw.decode('latin-1') if isinstance(raw, bytes) else raw
+        if not line.strip() or line.startswith('*'):
+            continue
+        if not line[0].isspace():
+            section = line.split()[0].upper()
+            continue
+        parts = line.split()
+        if section == 'ROWS':
+            if parts[0].upper() == 'N':
+                objective_rows.add(parts[1])
+            else:
+                rows += 1
+        elif section == 'COLUMNS':
+            if len(parts) >= 3 and parts[1] == "'MARKER'":
+                continue
+            if parts[0] != last_col:
+                cols += 1
+                last_col = parts[0]
+            for i in range(1, len(parts) - 1, 2):
+                if parts[i] not in objective_rows:
+                    nonzeros += 1
+    return rows, cols, nonzeros
+
+
+def scan_file(path, fmt, compressed):
+    """
+    计算单个文件的内容哈希和规模 (在线程池中运行)
+
+    返回:
+    (content_hash, rows, cols, nonzeros)，无法读取时返回 None
+    """
+    digest = hashlib.sha256()
+    dims = (None, None, None)
+    is_matrix = fmt in ("mps", "qps")
+    try:
+        with open(path, 'rb') as f:
+            if is_matrix and not compressed:
+                def hashed_lines():
+                    for line in f:
+                        digest.update(line)
+                        yield line
+                dims = _count_mps_dimensions(hashed_lines())
+            else:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+        if is_matrix and compressed:
+            opener = COMPRESSED_OPENERS[os.path.splitext(path)[1].lower()]
+            with opener(path, 'rb') as f:
+                dims = _count_mps_dimensions(f)
+    except (OSError, EOFError, lzma.LZMAError) as e:
+        print(f"扫描文件失败: {path} ({e})")
+        return None
+    return (digest.hexdigest(),) + tuple(dims)
+
+
+class InstanceCatalog:
+    """
+    实例文件目录
+
+    参数:
+    db_path - 目录数据库路径
+    roots - 要扫描的目录列表 (非递归)，顺序决定同名文件的优先级
+    workers - 并行扫描的线程数
+    """
+
+    def __init__(self, db_path=DEFAULT_CATALOG_PATH, roots=DEFAULT_ROOTS, workers=8):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+        self.roots = list(roots)
+        self.workers = workers
+
+    def close(self):
+        self.conn.close()
+
+    def refresh(self, force=False):
+        """
+        增量刷新目录
+
+        参数:
+        force - 为 True 时忽略修改时间，重新列出所有目录并重新扫描所有文件
+
+        返回:
+        (新增数, 更新数, 删除数)
+        """
+        known_dirs = dict(self.conn.execute("SELECT path, mtime FROM directories"))
+        candidates = []
+        listed_dirs = []
+        for rank, root in enumerate(self.roots):
+            try:
+                mtime = os.stat(root).st_mtime
+            except OSError:
+                if root in known_dirs:
+                    listed_dirs.append((root, None))
+                continue
+            if not force and known_dirs.get(root) == mtime:
+                continue
+            listed_dirs.append((root, mtime))
+            with os.scandir(root) as entries:
+                for entry in entries:
+                    info = classify(entry.name)
+                    if info is None or not entry.is_file():
+                        continue
+                    path = entry.name if root == "." else os.path.join(root, entry.name)
+                    stat = entry.stat()
+                    candidates.append((path, entry.name, root, rank, info, stat.st_size, stat.st_mtime))
+
+        if not listed_dirs:
+            return 0, 0, 0
+
+        known = {}
+        placeholders = ",".join("?" for _ in listed_dirs)
+        for path, size, mtime in self.conn.execute(
+                f"SELECT path, size, mtime FROM instances WHERE directory IN ({placeholders})",
+                [d for d, _ in listed_dirs]):
+            known[path] = (size, mtime)
+
+        present = {c[0] for c in candidates}
+        removed = [path for path in known if path not in present]
+        changed = [c for c in candidates if force or known.get(c[0]) != (c[5], c[6])]
+        added = sum(1 for c in changed if c[0] not in known)
+
+        results = self._scan_parallel(changed)
+        now = time.time()
+        with self.conn:
+            self.conn.executemany("DELETE FROM instances WHERE path = ?", [(p,) for p in removed])
+            rows = []
+            for (path, name, root, rank, (fmt, compressed, stem), size, mtime), scanned in zip(changed, results):
+                if scanned is None:
+                    continue
+                rows.append((path, name, stem, root, rank, fmt, int(compressed), size, mtime) + scanned + (now,))
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO instances ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' for _ in _COLUMNS)})",
+                rows)
+            for root, mtime in listed_dirs:
+                if mtime is None:
+                    self.conn.execute("DELETE FROM directories WHERE path = ?", (root,))
+                else:
+                    self.conn.execute("INSERT OR REPLACE INTO directories (path, mtime) VALUES (?, ?)", (root, mtime))
+        return added, len(changed) - added, len(removed)
+
+    def _scan_parallel(self, candidates):
+        """在线程池中并行计算哈希和规模，返回与 candidates 顺序一致的结果"""
+        if not candidates:
+            return []
+        jobs = [(c[0], c[4][0], c[4][1]) for c in candidates]
+        if len(jobs) == 1 or self.workers <= 1:
+            return [scan_file(*job) for job in jobs]
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(lambda job: scan_file(*job), jobs))
+
+    def _validate(self, row):
+        """确认目录中的文件仍然存在且未被修改，修改过则重新扫描"""
+        path = row[0]
+        try:
+            stat = os.stat(path)
+        except OSError:
+            with self.conn:
+                self.conn.execute("DELETE FROM instances WHERE path = ?", (path,))
+            return None
+        if (stat.st_size, stat.st_mtime) != (row[7], row[8]):
+            fmt, compressed = row[5], bool(row[6])
+            scanned = scan_file(path, fmt, compressed)
+            if scanned is not None:
+                with self.conn:
+                    self.conn.execute(
+                        "UPDATE instances SET size=?, mtime=?, content_hash=?, rows=?, cols=?, nonzeros=?, "
+                        "scanned_at=? WHERE path=?",
+                        (stat.st_size, stat.st_mtime) + scanned + (time.time(), path))
+        return path
+
+    def entry(self, path):
+        """返回某个路径的目录记录 (dict)，不存在时返回 None"""
+        row = self.conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM instances WHERE path = ?", (path,)).fetchone()
+        return dict(zip(_COLUMNS, row)) if row else None
+
+    def lookup(self, name, formats=None):
+        """
+        按名称查找实例文件
+
+        参数:
+        name - 用户输入的名称，可以带或不带扩展名、目录 (如 ran10x10, ran10x10.mps, milp/22433)
+        formats - 允许的格式元组，如 ("mps",)
+
+        返回:
+        文件路径，未找到时返回 None
+        """
+        info = classify(os.path.basename(name))
+        stem = info[2] if info else os.path.basename(name)
+        wanted_dir = os.path.dirname(name)
+        sql = f"SELECT {', '.join(_COLUMNS)} FROM instances WHERE stem = ?"
+        params = [stem]
+        if formats:
+            sql += f" AND format IN ({','.join('?' for _ in formats)})"
+            params.extend(formats)
+        sql += " ORDER BY root_rank, compressed, path"
+        for row in self.conn.execute(sql, params).fetchall():
+            if wanted_dir and os.path.normpath(row[3]) != os.path.normpath(wanted_dir):
+                continue
+            if info and info[0] != row[5]:
+                continue
+            path = self._validate(row)
+            if path is not None:
+                return path
+        return None
+
+    def complete(self, prefix, formats=None, limit=20):
+        """
+        模糊前缀匹配: 先按主干名前缀 (不区分大小写) 匹配，没有结果时按子串匹配
+
+        返回:
+        路径列表
+        """
+        stem = os.path.basename(prefix)
+        info = classify(stem)
+        if info:
+            stem = info[2]
+        escaped = stem.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        format_sql = ""
+        params_tail = []
+        if formats:
+            format_sql = f" AND format IN ({','.join('?' for _ in formats)})"
+            params_tail = list(formats)
+        for pattern in (f"{escaped}%", f"%{escaped}%"):
+            rows = self.conn.execute(
+                f"SELECT path FROM instances WHERE stem LIKE ? ESCAPE '\\'{format_sql} "
+                f"ORDER BY length(stem), root_rank, path LIMIT ?",
+                [pattern] + params_tail + [limit]).fetchall()
+            if rows:
+                return [r[0] for r in rows]
+        return []
+
+    def paths(self, formats=None):
+        """按路径排序列出目录中的文件"""
+        sql = "SELECT path FROM instances"
+        params = []
+        if formats:
+            sql += f" WHERE format IN ({','.join('?' for _ in formats)})"
+            params = list(formats)
+        return [r[0] for r in self.conn.execute(sql + " ORDER BY path", params)]
+
+    def summary(self):
+        """按格式统计文件数量和总大小"""
+        return self.conn.execute(
+            "SELECT format, COUNT(*), SUM(size), SUM(compressed) FROM instances GROUP BY format ORDER BY format"
+        ).fetchall()
+
+
+def _open_catalog():
+    try:
+        return InstanceCatalog()
+    except (sqlite3.Error, OSError) as e:
+        print(f"无法打开实例目录 ({e})，改为直接查找文件")
+        return None
+
+
+def find_instance(name, formats):
+    """
+    供各脚本使用的查找函数: 先查目录，未命中时增量刷新后再查一次
+
+    返回:
+    文件路径，未找到或目录不可用时返回 None (调用方应回退到原来的路径探测)
+    """
+    catalog = _open_catalog()
+    if catalog is None:
+        return None
+    try:
+        path = catalog.lookup(name, formats)
+        if path is None:
+            catalog.refresh()
+            path = catalog.lookup(name, formats)
+        return path
+    except (sqlite3.Error, OSError) as e:
+        print(f"查询实例目录失败 ({e})")
+        return None
+    finally:
+        catalog.close()
+
+
+def list_instances(formats):
+    """供各脚本使用的列表函数，目录不可用时返回 None"""
+    catalog = _open_catalog()
+    if catalog is None:
+        return None
+    try:
+        catalog.refresh()
+        return catalog.paths(formats)
+    except (sqlite3.Error, OSError) as e:
+        print(f"查询实例目录失败 ({e})")
+        return None
+    finally:
+        catalog.close()
+
+
+def suggest_instances(name, formats, limit=10):
+    """供交互式输入使用: 返回与输入前缀模糊匹配的文件路径"""
+    catalog = _open_catalog()
+    if catalog is None:
+        return []
+    try:
+        return catalog.complete(name, formats, limit)
+    except sqlite3.Error:
+        return []
+    finally:
+        catalog.close()
+
+
+def main():
+    """主函数"""
+    args = sys.argv[1:]
+    options = {'--find': None, '--complete': None, '--db': DEFAULT_CATALOG_PATH}
+    for flag in list(options):
+        if flag in args:
+            index = args.index(flag)
+            options[flag] = args[index + 1]
+            del args[index:index + 2]
+    rebuild = '--rebuild' in args
+    extra_roots = [arg for arg in args if not arg.startswith('--')]
+
+    catalog = InstanceCatalog(options['--db'], roots=list(DEFAULT_ROOTS) + extra_roots)
+    try:
+        start = time.time()
+        added, updated, removed = catalog.refresh(force=rebuild)
+        print(f"目录刷新完成: 新增 {added}, 更新 {updated}, 删除 {removed} (耗时 {time.time() - start:.2f} 秒)")
+
+        if options['--find']:
+            path = catalog.lookup(options['--find'])
+            if path:
+                entry = catalog.entry(path)
+                print(f"{path}: 格式={entry['format']} 大小={entry['size']} 行={entry['rows']} "
+                      f"列={entry['cols']} 非零元={entry['nonzeros']} 哈希={entry['content_hash'][:16]}")
+            else:
+                print(f"未找到: {options['--find']}")
+        elif options['--complete']:
+            for path in catalog.complete(options['--complete']):
+                print(path)
+        else:
+            for fmt, count, size, compressed in catalog.summary():
+                print(f"  {fmt:<6}{count:>8} 个文件{(size or 0) / 1e6:>12.1f} MB  (压缩 {compressed})")
+    finally:
+        catalog.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+MIP 求解检查点
+
+大模型的求解可能需要一小时以上，进程被终止或中断时当前最优解会全部丢失。本模块为
+mps.py / mps_gurobi.py 提供:
+- 求解过程中定期把当前最优解 (incumbent) 写入 checkpoints/ 目录
+- --resume: 重新运行时把保存的解作为 MIP 初始解 (MIP start) 传给求解器
+- SIGINT/SIGTERM: 中断求解器，写出最终检查点，并照常生成 (部分结果的) 报告
+
+详细中文注释:
+MIP 回调在每次找到新的可行解时调用 update()，只在内存中保留目标值最好的解 (回调给出的候选解
+不一定优于当前最优解，按目标方向比较，严格更好时才替换)；距上次写盘超过
+interval 秒时才写文件 (临时文件 + os.replace 原子替换)，因此频繁出现新解时也不会拖慢
+求解。检查点文件名包含实例文件内容哈希的前缀，实例文件被修改后不会误用旧的检查点。
+同时记录求解日志文件路径和当时的大小 (日志偏移)，便于对照恢复前的求解过程。
+求解得到最优解或证明不可行后检查点自动删除。
+"""
+import datetime
+import gzip
+import json
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+
+DEFAULT_CHECKPOINT_DIR = "checkpoints"
+DEFAULT_INTERVAL = 60.0
+
+
+class Checkpointer:
+    """
+    当前最优解的检查点
+
+    参数:
+    instance_path - 实例文件路径
+    solver_name - 求解器名称 (copt / gurobi)，不同求解器的检查点分开保存
+    interval - 两次写盘之间的最短间隔 (秒)
+    output_dir - 检查点目录
+    minimize - 目标方向 (最小化为 True)，用于判断新的解是否更好
+    content_hash - 实例文件的哈希 (省略时读取文件计算)
+    """
+
+    def __init__(self, instance_path, solver_name, interval=DEFAULT_INTERVAL, output_dir=DEFAULT_CHECKPOINT_DIR,
+                 minimize=True, content_hash=None):
+        import result_cache
+        self.instance_path = instance_path
+        self.solver_name = solver_name
+        self.interval = interval
+        self.minimize = minimize
+        self.content_hash = content_hash or result_cache.file_hash(instance_path)
+        stem = os.path.splitext(os.path.basename(instance_path))[0]
+        self.path = os.path.join(output_dir, f"{stem}_{solver_name}_{self.content_hash[:12]}.json.gz")
+        self.names = []
+        self.values = None
+        self.objective = None
+        self.bound = None
+        self.log_filepath = None
+        self.started = time.time()
+        self.last_save = self.started
+        self.saves = 0
+        self.lock = threading.Lock()
+
+    def set_variables(self, names):
+        """设置解向量对应的变量名 (与回调中取解时的变量顺序一致)"""
+        self.names = list(names)
+
+    def improves(self, objective):
+        """objective 是否严格优于已保存的解 (还没有解时总是成立)"""
+        if self.objective is None:
+            return True
+        if objective is None:
+            return False
+        return objective < self.objective if self.minimize else objective > self.objective
+
+    def update(self, objective, bound, values):
+        """
+        记录新的可行解 (在求解器回调中调用)，只有严格优于已保存的解时才替换；
+        距上次写盘超过 interval 时写入文件
+
+        返回:
+        是否写了文件
+        """
+        with self.lock:
+            self.bound = bound
+            if not self.improves(objective):
+                return False
+            self.objective = objective
+            self.values = list(values)
+            due = time.time() - self.last_save >= self.interval
+        if due:
+            self.save()
+        return due
+
+    def save(self, status="running"):
+        """把当前最优解写入检查点文件，没有可行解时不写，返回文件路径"""
+        with self.lock:
+            if self.values is None:
+                return None
+            record = {
+                'instance': self.instance_path,
+                'solver': self.solver_name,
+                'content_hash': self.content_hash,
+                'status': status,
+                'objective': self.objective,
+                'bound': self.bound,
+                'elapsed': time.time() - self.started,
+                'saved': datetime.datetime.now().isoformat(timespec='seconds'),
+                'log_file': self.log_filepath,
+                'log_offset': _file_size(self.log_filepath),
+                'solution': dict(zip(self.names, self.values)),
+            }
+            self.last_save = time.time()
+            self.saves += 1
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory or ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=5) as f:
+                f.write(json.dumps(record, ensure_ascii=False).encode('utf-8'))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"写入检查点失败: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+        return self.path
+
+    def load(self):
+        """读取检查点，文件不存在、损坏或与实例内容不符时返回 None"""
+        try:
+            with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+                record = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, ValueError) as e:
+            print(f"检查点文件无法读取: {self.path} ({e})")
+            return None
+        if record.get('content_hash') != self.content_hash:
+            return None
+        return record
+
+    def discard(self):
+        """求解完成后删除检查点"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path) if path else None
+    except OSError:
+        return None
+
+
+def install_signal_handlers(interrupt):
+    """
+    在求解期间把 SIGINT/SIGTERM 转为求解器中断
+
+    第一次收到信号时调用 interrupt() (例如 COPT model.interrupt)，求解器随后正常返回，
+    调用方即可写出最终检查点和报告；再次收到信号时按默认方式立即终止。
+    只能在主线程中安装 (守护进程和 asyncio 接口的工作线程中不做任何事)。
+
+    返回:
+    恢复原处理函数的函数
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return lambda: None
+    signals = [signal.SIGINT] + ([signal.SIGTERM] if hasattr(signal, 'SIGTERM') else [])
+    previous = {sig: signal.getsignal(sig) for sig in signals}
+
+    def restore():
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+
+    def handler(signum, frame):
+        print(f"\n收到信号 {signal.Signals(signum).name}，正在中断求解并保存检查点 (再次发送将立即退出)...")
+        for sig in signals:
+            signal.signal(sig, signal.SIG_DFL if sig != signal.SIGINT else signal.default_int_handler)
+        try:
+            interrupt()
+        except Exception as e:
+            print(f"中断求解器失败: {e}")
+
+    for sig in signals:
+        signal.signal(sig, handler)
+    return restore
+
+
+def from_argv(argv=None):
+    """
+    从命令行参数中取出检查点相关的选项 (原地删除)
+
+    支持的参数:
+    --resume                     使用保存的检查点作为 MIP 初始解
+    --checkpoint-interval 秒     写检查点的最短间隔 (默认 60 秒)
+
+    返回:
+    (resume, interval)
+    """
+    argv = sys.argv if argv is None else argv
+    interval = DEFAULT_INTERVAL
+    if '--checkpoint-interval' in argv:
+        index = argv.index('--checkpoint-interval')
+        interval = float(argv[index + 1])
+        del argv[index:index + 2]
+    resume = '--resume' in argv
+    if resume:
+        argv.remove('--resume')
+    return resume, interval
@@ -0,0 +1,342 @@
+# -*- coding: utf-8 -*-
+"""
+COPT 桩求解后端 (无需许可证)
+
+本模块实现了 coptpy 接口中 qps.py 建模流程所用到的最小子集，用于在没有安装
+COPT 或没有许可证的机器上运行基准测试和流程测试。
+主要内容:
+- Envr / Model: addVar, addConstr, setObjective, setParam, setLogFile, solve
+- Var / LinExpr / QuadExpr: 支持与 coptpy 相同写法的表达式运算 (系数*变量, +=, ==, <=, >=)
+- COPT: 常用常量 (INFINITY, MINIMIZE, OPTIMAL 等)
+
+详细中文注释:
+桩后端不做任何优化。solve() 只按照变量边界给出一个确定的点 (优先取下界)，
+并计算该点的目标值，因此建模和报告代码的运行路径与真实求解完全相同，
+测得的时间只包含本工具自身的开销。表达式以 {变量序号: 系数} 字典保存，
+"+=" 原地合并，避免逐项构造新对象。
+"""
+import sys
+import types
+
+
+class COPT:
+    """与 coptpy.COPT 同名的常量"""
+    INFINITY = 1e30
+    MINIMIZE = 1
+    MAXIMIZE = -1
+    CONTINUOUS = 'C'
+    BINARY = 'B'
+    INTEGER = 'I'
+    LESS_EQUAL = 'L'
+    GREATER_EQUAL = 'G'
+    EQUAL = 'E'
+    UNSTARTED = 0
+    OPTIMAL = 1
+    INFEASIBLE = 2
+    UNBOUNDED = 3
+    INF_OR_UNB = 4
+    NUMERICAL = 5
+    NODELIMIT = 6
+    IMPRECISE = 7
+    TIMEOUT = 8
+    UNFINISHED = 9
+    INTERRUPTED = 10
+    CBCONTEXT_MIPSOL = 1
+    CBCONTEXT_MIPNODE = 4
+
+    class CBInfo:
+        BestObj = "BestObj"
+        BestBnd = "BestBnd"
+
+
+class CallbackBase:
+    """回调基类占位 (桩后端从不调用回调)"""
+
+    def getInfo(self, name):
+        return COPT.INFINITY
+
+
+class Var:
+    """决策变量"""
+    __slots__ = ('index', 'name', 'lb', 'ub', 'vtype', 'x')
+
+    def __init__(self, index, name, lb, ub, vtype):
+        self.index = index
+        self.name = name
+        self.lb = lb
+        self.ub = ub
+        self.vtype = vtype
+        self.x = 0.0
+
+    @property
+    def X(self):
+        return self.x
+
+    def getName(self):
+        return self.name
+
+    def _linear(self):
+        return LinExpr({self.index: 1.0})
+
+    def __mul__(self, other):
+        if isinstance(other, (int, float)):
+            return LinExpr({self.index: float(other)})
+        return self._linear() * other
+
+    __rmul__ = __mul__
+
+    def __add__(self, other):
+        return self._linear() + other
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return self._linear() - other
+
+    def __neg__(self):
+        return LinExpr({self.index: -1.0})
+
+    def __le__(self, other):
+        return self._linear() <= other
+
+    def __ge__(self, other):
+        return self._linear() >= other
+
+    def __eq__(self, other):
+        return self._linear() == other
+
+    __hash__ = object.__hash__
+
+
+class LinExpr:
+    """线性表达式: sum(coeffs[i] * x_i) + constant"""
+    __slots__ = ('coeffs', 'constant')
+
+    def __init__(self, coeffs=None, constant=0.0):
+        self.coeffs = coeffs if coeffs is not None else {}
+        self.constant = constant
+
+    def copy(self):
+        return LinExpr(dict(self.coeffs), self.constant)
+
+    def _iadd_scaled(self, other, scale):
+        coeffs = self.coeffs
+        for index, coeff in other.coeffs.items():
+            coeffs[index] = coeffs.get(index, 0.0) + scale * coeff
+        self.constant += scale * other.constant
+
+    def __iadd__(self, other):
+        if isinstance(other, (int, float)):
+            self.constant += other
+            return self
+        if isinstance(other, Var):
+            self.coeffs[other.index] = self.coeffs.get(other.index, 0.0) + 1.0
+            return self
+        if isinstance(other, QuadExpr):
+            return QuadExpr(linear=self) + other
+        self._iadd_scaled(other, 1.0)
+        return self
+
+    def __add__(self, other):
+        return self.copy().__iadd__(other)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return self + (-1.0) * other
+
+    def __rsub__(self, other):
+        return (-1.0) * self + other
+
+    def __neg__(self):
+        return (-1.0) * self
+
+    def __mul__(self, other):
+        if isinstance(other, (int, float)):
+            return LinExpr({i: c * other for i, c in self.coeffs.items()}, self.constant * other)
+        if isinstance(other, Var):
+            quad = QuadExpr()
+            for index, coeff in self.coeffs.items():
+                key = (index, other.index) if index <= other.index else (other.index, index)
+                quad.terms[key] = quad.terms.get(key, 0.0) + coeff
+            if self.constant:
+                quad.linear.coeffs[other.index] = self.constant
+            return quad
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __le__(self, other):
+        return _Constraint(self - other, 'L')
+
+    def __ge__(self, other):
+        return _Constraint(self - other, 'G')
+
+    def __eq__(self, other):
+        return _Constraint(self - other, 'E')
+
+    __hash__ = None
+
+    def evaluate(self, values):
+        return sum(coeff * values[index] for index, coeff in self.coeffs.items()) + self.constant
+
+
+class QuadExpr:
+    """二次表达式: sum(terms[i,j] * x_i * x_j) + 线性部分"""
+    __slots__ = ('terms', 'linear')
+
+    def __init__(self, terms=None, linear=None):
+        self.terms = terms if terms is not None else {}
+        self.linear = linear.copy() if linear is not None else LinExpr()
+
+    def __iadd__(self, other):
+        if isinstance(other, QuadExpr):
+            terms = self.terms
+            for key, coeff in other.terms.items():
+                terms[key] = terms.get(key, 0.0) + coeff
+            self.linear += other.linear
+        else:
+            self.linear += other
+        return self
+
+    def __add__(self, other):
+        return QuadExpr(dict(self.terms), self.linear).__iadd__(other)
+
+    __radd__ = __add__
+
+    def __mul__(self, other):
+        if isinstance(other, (int, float)):
+            return QuadExpr({k: c * other for k, c in self.terms.items()}, self.linear * other)
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def evaluate(self, values):
+        quad = sum(coeff * values[i] * values[j] for (i, j), coeff in self.terms.items())
+        return quad + self.linear.evaluate(values)
+
+
+class _Constraint:
+    """比较运算的结果: expr (sense) 0"""
+    __slots__ = ('expr', 'sense')
+
+    def __init__(self, expr, sense):
+        self.expr = expr
+        self.sense = sense
+
+
+class Constraint:
+    """模型中的约束"""
+    __slots__ = ('index', 'name', 'expr', 'sense')
+
+    def __init__(self, index, name, expr, sense):
+        self.index = index
+        self.name = name
+        self.expr = expr
+        self.sense = sense
+
+    def getName(self):
+        return self.name
+
+
+class Model:
+    """桩模型: 保存建模结果，solve() 给出满足边界的确定点"""
+
+    def __init__(self, name=""):
+        self.name = name
+        self.vars = []
+        self.constrs = []
+        self.objective = LinExpr()
+        self.objsense = COPT.MINIMIZE
+        self.params = {}
+        self.logfile = None
+        self.Status = COPT.UNSTARTED
+        self.ObjVal = None
+        self.IsMIP = 0
+
+    def setLogFile(self, path):
+        self.logfile = path
+
+    def setParam(self, name, value):
+        self.params[name] = value
+
+    def addVar(self, lb=0.0, ub=COPT.INFINITY, obj=0.0, vtype=COPT.CONTINUOUS, name=""):
+        var = Var(len(self.vars), name or f"C{len(self.vars)}", lb, ub, vtype)
+        self.vars.append(var)
+        if obj:
+            self.objective.coeffs[var.index] = obj
+        if vtype != COPT.CONTINUOUS:
+            self.IsMIP = 1
+        return var
+
+    def addConstr(self, lhs, name=""):
+        # 空行在建模代码中会变成 Python 的 bool (0 == rhs)，此处按空约束保存
+        if isinstance(lhs, _Constraint):
+            expr, sense = lhs.expr, lhs.sense
+        else:
+            expr, sense = LinExpr(), 'E'
+        constr = Constraint(len(self.constrs), name or f"R{len(self.constrs)}", expr, sense)
+        self.constrs.append(constr)
+        return constr
+
+    def setObjective(self, expr, sense=COPT.MINIMIZE):
+        if isinstance(expr, (int, float)):
+            expr = LinExpr(constant=float(expr))
+        elif isinstance(expr, Var):
+            expr = expr._linear()
+        self.objective = expr
+        self.objsense = sense
+
+    def getVars(self):
+        return list(self.vars)
+
+    def getConstrs(self):
+        return list(self.constrs)
+
+    def solve(self):
+        """取每个变量最接近 0 的可行边界值作为"解"，并计算目标值"""
+        values = []
+        for var in self.vars:
+            lb = var.lb if var.lb > -COPT.INFINITY else -float('inf')
+            ub = var.ub if var.ub < COPT.INFINITY else float('inf')
+            var.x = min(max(0.0, lb), ub)
+            values.append(var.x)
+        self.ObjVal = self.objective.evaluate(values)
+        self.Status = COPT.OPTIMAL
+
+    def write(self, path):
+        pass
+
+
+class Envr:
+    """桩环境"""
+
+    def createModel(self, name=""):
+        return Model(name)
+
+    def close(self):
+        pass
+
+
+def install(force=False):
+    """
+    将桩后端注册为 coptpy 模块
+
+    参数:
+    force - 即使已经安装了真实的 coptpy 也替换它
+
+    返回:
+    True 表示当前使用的是桩后端
+    """
+    if not force:
+        try:
+            import coptpy  # noqa: F401
+            return False
+        except ImportError:
+            pass
+    module = types.ModuleType("coptpy")
+    for name in ("COPT", "CallbackBase", "Envr", "Model", "Var", "LinExpr", "QuadExpr", "Constraint"):
+        setattr(module, name, globals()[name])
+    module.STUB = True
+    sys.modules["coptpy"] = module
+    return True
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合成测试实例生成器
+
+本脚本生成指定族、规模和密度的MPS/QPS文件，用于解析器和报告生成器的规模测试。
+支持的实例族:
+- fctp:    固定费用运输问题 (与 ran{m}x{n} / bal* / gr* 同类的MIP)
+- lp:      随机稀疏线性规划
+- mip:     随机稀疏混合整数规划 (前半部分变量为整数)
+- qp-band: 带状二次规划 (QPS, 带宽由 --width 指定)
+- qp-block: 块对角二次规划 (QPS, 块大小由 --width 指定)
+
+详细中文注释:
+所有内容都以流式方式写出: MPS 的 COLUMNS 段按列生成，每一列的非零元
+由以 (种子, 列号) 初始化的随机数发生器即时产生，写出后立即丢弃，因此
+生成 1000 万非零元的文件也只需要 O(行数) 的内存 (用于累计右端项)。
+相同的参数和种子总是得到完全相同的文件，可用于可重复的规模曲线测试。
+"""
+import array
+import itertools
+import os
+import random
+import sys
+
+FAMILIES = ("fctp", "lp", "mip", "qp-band", "qp-block")
+
+
+def _fmt(value):
+    """MPS 数值格式，保持短小且可被解析器精确读回"""
+    return f"{value:.10g}"
+
+
+class MPSWriter:
+    """
+    流式MPS写出器
+
+    按照 MPS 标准的段顺序 (NAME, ROWS, COLUMNS, RHS, BOUNDS, QUADOBJ, ENDATA) 写出，
+    调用方需要按相同顺序调用各方法。整数变量通过 MARKER 行包围。
+    """
+
+    def __init__(self, f, name):
+        self.f = f
+        self.f.write(f"NAME          {name}\n")
+        self._integer_block = False
+        self.nonzeros = 0
+
+    def rows(self, rows):
+        """rows 为 (类型, 行名) 的可迭代对象，类型为 N/E/L/G"""
+        self.f.write("ROWS\n")
+        for sense, name in rows:
+            self.f.write(f" {sense}  {name}\n")
+        self.f.write("COLUMNS\n")
+
+    def column(self, name, entries, integer=False):
+        """写出一列的全部非零元，entries 为 (行名, 系数) 的可迭代对象"""
+        if integer != self._integer_block:
+            marker = "INTORG" if integer else "INTEND"
+            self.f.write(f"    MARKER                 'MARKER'                 '{marker}'\n")
+            self._integer_block = integer
+        write = self.f.write
+        for row, coeff in entries:
+            write(f"    {name:<10} {row:<10} {_fmt(coeff)}\n")
+            self.nonzeros += 1
+
+    def _end_integer_block(self):
+        if self._integer_block:
+            self.f.write("    MARKER                 'MARKER'                 'INTEND'\n")
+            self._integer_block = False
+
+    def rhs(self, entries):
+        self._end_integer_block()
+        self.f.write("RHS\n")
+        for row, value in entries:
+            self.f.write(f"    RHS        {row:<10} {_fmt(value)}\n")
+
+    def bounds(self, entries):
+        """entries 为 (类型, 列名, 数值) 的可迭代对象"""
+        self.f.write("BOUNDS\n")
+        for bound_type, name, value in entries:
+            if value is None:
+                self.f.write(f" {bound_type} BND        {name}\n")
+            else:
+                self.f.write(f" {bound_type} BND        {name:<10} {_fmt(value)}\n")
+
+    def quadobj(self, entries):
+        """entries 为 (变量1, 变量2, 系数) 的下三角元素"""
+        self.f.write("QUADOBJ\n")
+        for var1, var2, coeff in entries:
+            self.f.write(f"    {var1:<10} {var2:<10} {_fmt(coeff)}\n")
+            self.nonzeros += 1
+
+    def close(self):
+        self.f.write("ENDATA\n")
+
+
+def _column_rng(seed, j):
+    """每一列使用独立的随机数发生器，保证流式生成可重复"""
+    return random.Random(seed * 1000003 + j)
+
+
+def write_fctp(f, name, m, n, seed=0):
+    """
+    固定费用运输问题
+
+    变量: X{i}_{j} (运输量, 连续), Y{i}_{j} (是否启用路线, 二元)
+    约束: 供应 S{i}: sum_j X{i}_{j} <= s_i
+          需求 D{j}: sum_i X{i}_{j} = d_j
+          关联 L{i}_{j}: X{i}_{j} - u_{ij} Y{i}_{j} <= 0
+    """
+    rng = random.Random(seed)
+    demand = [rng.randint(10, 100) for _ in range(n)]
+    total = sum(demand)
+    weights = [rng.random() + 0.5 for _ in range(m)]
+    scale = total / sum(weights)
+    supply = [int(w * scale) + 1 for w in weights]
+
+    writer = MPSWriter(f, name)
+    writer.rows(itertools.chain(
+        [("N", "COST")],
+        (("L", f"S{i}") for i in range(m)),
+        (("E", f"D{j}") for j in range(n)),
+        (("L", f"L{i}_{j}") for i in range(m) for j in range(n))))
+
+    for i in range(m):
+        for j in range(n):
+            crng = _column_rng(seed, i * n + j)
+            var_cost = crng.randint(1, 20)
+            writer.column(f"X{i}_{j}", (("COST", var_cost), (f"S{i}", 1.0), (f"D{j}", 1.0), (f"L{i}_{j}", 1.0)))
+    for i in range(m):
+        for j in range(n):
+            crng = _column_rng(seed + 1, i * n + j)
+            fixed_cost = crng.randint(50, 500)
+            capacity = min(supply[i], demand[j])
+            writer.column(f"Y{i}_{j}", (("COST", fixed_cost), (f"L{i}_{j}", -capacity)), integer=True)
+
+    writer.rhs([(f"S{i}", supply[i]) for i in range(m)] + [(f"D{j}", demand[j]) for j in range(n)])
+    writer.bounds((("UP", f"Y{i}_{j}", 1) for i in range(m) for j in range(n)))
+    writer.close()
+    return writer.nonzeros
+
+
+def write_random_sparse(f, name, rows, cols, density, seed=0, integer_fraction=0.0):
+    """
+    随机稀疏 LP/MIP
+
+    每列在随机选择的行中产生非零元，约束为 A x <= b，其中 b 由
+    x = 1 处的行活动值加上随机松弛得到，保证问题可行且有界 (0 <= x <= 10)。
+    右端项的累计只需要长度为 rows 的数组。
+    """
+    per_col = max(1, int(round(density * rows)))
+    activity = array.array('d', bytes(8 * rows))
+    num_integer = int(cols * integer_fraction)
+
+    writer = MPSWriter(f, name)
+    writer.rows(itertools.chain([("N", "OBJ")], (("L", f"R{r}") for r in range(rows))))
+    for j in range(cols):
+        crng = _column_rng(seed, j)
+        picked = crng.sample(range(rows), per_col) if per_col < rows else range(rows)
+        entries = [("OBJ", -crng.randint(1, 10))]
+        for r in sorted(picked):
+            coeff = crng.randint(1, 9)
+            activity[r] += coeff
+            entries.append((f"R{r}", coeff))
+        writer.column(f"X{j}", entries, integer=j < num_integer)
+
+    rng = random.Random(seed)
+    writer.rhs((f"R{r}", activity[r] + rng.randint(0, 10)) for r in range(rows))
+    writer.bounds((("UP", f"X{j}", 10) for j in range(cols)))
+    writer.close()
+    return writer.nonzeros
+
+
+def write_qp(f, name, n, structure, width, seed=0):
+    """
+    带状或块对角凸二次规划 (QPS)
+
+    二次矩阵 Q 的非对角元取 [-1, 1] 中的随机数，对角元取该行非对角元绝对值之和
+    加上正数，使 Q 严格对角占优从而正定。约束为单个资源约束 sum x <= n/2。
+    QUADOBJ 只写出下三角元素，按列流式生成。
+    """
+    writer = MPSWriter(f, name)
+    writer.rows([("N", "OBJ"), ("L", "CAP")])
+    for j in range(n):
+        crng = _column_rng(seed, j)
+        writer.column(f"X{j}", (("OBJ", -crng.randint(1, 10)), ("CAP", 1.0)))
+    writer.rhs([("CAP", n / 2)])
+    writer.bounds((("UP", f"X{j}", 10) for j in range(n)))
+
+    def neighbours(j):
+        """与第 j 个变量耦合的 (下标小于 j 的下三角, 下标大于 j 的上三角) 变量范围"""
+        if structure == "band":
+            return range(max(0, j - width), j), range(j + 1, min(n, j + width + 1))
+        block_start = (j // width) * width
+        return range(block_start, j), range(j + 1, min(n, block_start + width))
+
+    def off_diagonal(i, j):
+        # 对称元素由 (min, max) 决定，写出时与计算对角元时得到相同的值
+        return random.Random(seed * 7919 + i * 1000003 + j).uniform(-1.0, 1.0)
+
+    def entries():
+        for j in range(n):
+            lower, upper = neighbours(j)
+            row_sum = sum(abs(off_diagonal(i, j)) for i in lower) + sum(abs(off_diagonal(j, k)) for k in upper)
+            yield f"X{j}", f"X{j}", row_sum + 1.0
+            for k in upper:
+                yield f"X{k}", f"X{j}", off_diagonal(j, k)
+
+    writer.quadobj(entries())
+    writer.close()
+    return writer.nonzeros
+
+
+def generate(family, output_path, size, density=0.01, seed=0, width=5):
+    """
+    生成一个实例文件
+
+    参数:
+    family - 实例族 (见 FAMILIES)
+    output_path - 输出文件路径
+    size - 规模: fctp 为 (m, n)；lp/mip 为 (行数, 列数)；QP 为 (变量数,)
+    density - lp/mip 每列非零元占行数的比例
+    seed - 随机种子
+    width - qp-band 的带宽 / qp-block 的块大小
+
+    返回:
+    写出的非零元数量 (含二次项)
+    """
+    if family not in FAMILIES:
+        raise ValueError(f"未知的实例族: {family} (可选: {', '.join(FAMILIES)})")
+    name = os.path.splitext(os.path.basename(output_path))[0]
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    with open(output_path, 'w', encoding='utf-8', buffering=1 << 20) as f:
+        if family == "fctp":
+            m, n = size
+            return write_fctp(f, name, m, n, seed)
+        if family in ("lp", "mip"):
+            rows, cols = size
+            return write_random_sparse(f, name, rows, cols, density, seed,
+                                       integer_fraction=0.5 if family == "mip" else 0.0)
+        structure = "band" if family == "qp-band" else "block"
+        return write_qp(f, name, size[0], structure, width, seed)
+
+
+def default_filename(family, size, seed):
+    """按实例族和规模生成与现有实例命名风格一致的文件名，如 ran10x10 -> syn_fctp_10x10_s0.mps"""
+    extension = "qps" if family.startswith("qp") else "mps"
+    return f"syn_{family.replace('-', '_')}_{'x'.join(str(s) for s in size)}_s{seed}.{extension}"
+
+
+def main():
+    """
+    主函数
+
+    用法:
+    python instance_gen.py fctp 10 10
+    python instance_gen.py lp 1000 5000 --density 0.005
+    python instance_gen.py qp-band 100000 --width 3 --out qps/
+    """
+    args = sys.argv[1:]
+    if not args or args[0] in ('-h', '--help') or args[0] not in FAMILIES:
+        print(main.__doc__)
+        print(f"可选实例族: {', '.join(FAMILIES)}")
+        return
+
+    options = {'--density': 0.01, '--seed': 0, '--width': 5, '--out': None}
+    for flag in list(options):
+        if flag in args:
+            index = args.index(flag)
+            options[flag] = args[index + 1]
+            del args[index:index + 2]
+
+    family = args[0]
+    size = tuple(int(v) for v in args[1:])
+    expected = 1 if family.startswith("qp") else 2
+    if len(size) != expected:
+        print(f"实例族 {family} 需要 {expected} 个规模参数")
+        return
+
+    seed = int(options['--seed'])
+    out = options['--out']
+    filename = default_filename(family, size, seed)
+    if out is None:
+        output_path = os.path.join("qps" if family.startswith("qp") else "mps", filename)
+    elif out.endswith(os.sep) or os.path.isdir(out):
+        output_path = os.path.join(out, filename)
+    else:
+        output_path = out
+
+    import time
+    start = time.time()
+    nonzeros = generate(family, output_path, size, float(options['--density']), seed, int(options['--width']))
+    elapsed = time.time() - start
+    print(f"已生成: {output_path} ({nonzeros} 个非零元, {os.path.getsize(output_path)} 字节, 耗时 {elapsed:.2f} 秒)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,530 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+求解日志增量摄取器
+
+本脚本扫描 copt_logs/ 和 gurobi_logs/ 中由 setLogFile / LogFile 参数产生的
+*_log_<timestamp>.log 日志文件 (包括轮转后的 .log.1 以及 .gz/.bz2/.xz 压缩文件)，
+使用预编译的正则表达式提取统计信息并写入结果数据库 (results/results.db)。
+主要功能:
+- 批量扫描: 一次性摄取所有历史日志
+- 跟踪模式 (--follow): 类似 tail -f，持续摄取正在写入的日志
+- 增量摄取: 按文件偏移量记录读取位置，重复扫描只读取新增字节
+- 提取预处理缩减、根节点LP时间、节点吞吐量、割平面数和最终统计
+
+详细中文注释:
+每个日志文件在 log_files 表中保存已读取的字节偏移量和解析器状态(JSON)。
+再次扫描时若文件大小和修改时间未变化则直接跳过；若文件变大则从偏移量处
+继续读取；若文件变小(被截断或轮转)则从头重新解析。只有完整的行才会被
+消费，未写完的最后一行留到下次读取，保证增量解析的结果与一次性解析一致。
+压缩文件无法就地追加，只在其大小或修改时间变化时整体重新解析。
+日志不按路径识别，而是按 设备号+inode 和开头 FINGERPRINT_BYTES 字节 (压缩文件为解压后的内容)
+的指纹识别: 改名轮转得到的 .log.1 仍是同一条记录；复制或压缩得到的副本 (指纹和实例名+时间戳相同)
+在原文件已不在原路径时接管原记录，原文件还在时压缩副本被跳过，因此同一次运行不会被重复统计。
+"""
+import bz2
+import datetime
+import gzip
+import hashlib
+import json
+import lzma
+import os
+import re
+import sys
+import time
+
+import results_store
+
+DEFAULT_LOG_DIRS = ["copt_logs", "gurobi_logs"]
+LOG_NAME_PATTERN = re.compile(r"^(?P<instance>.+?)(?:_qps)?_log_(?P<timestamp>\d{8}_\d{6})\.log(?:\.\d+)?(?:\.(?:gz|bz2|xz))?$")
+COMPRESSED_OPENERS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+FINGERPRINT_BYTES = 512  # 内容指纹覆盖的日志开头字节数
+
+_NUM = r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+
+
+class LogParser:
+    """
+    单个求解器日志格式的逐行解析器
+
+    每个解析器持有一组预编译的 (正则表达式, 处理函数) 规则。feed() 逐行匹配规则，
+    更新统计字典 stats。解析器的全部状态都保存在 stats 中 (以下划线开头的键为内部状态)，
+    因此可以序列化到数据库并在下次增量摄取时恢复。
+    """
+    solver = None
+    rules = []
+
+    def feed(self, line, stats):
+        """解析一行日志并更新统计信息"""
+        for pattern, handler in self.rules:
+            match = pattern.match(line)
+            if match:
+                handler(match, stats)
+                return True
+        return False
+
+    @staticmethod
+    def finalize(stats):
+        """根据已提取的信息计算派生统计量 (预处理缩减量、节点吞吐量)"""
+        if 'orig_rows' in stats and 'presolved_rows' in stats:
+            stats['presolve_rows_removed'] = stats['orig_rows'] - stats['presolved_rows']
+            stats['presolve_cols_removed'] = stats['orig_cols'] - stats['presolved_cols']
+        nodes = stats.get('nodes')
+        solve_time = stats.get('solve_time') or stats.get('_last_time')
+        if nodes and solve_time:
+            tree_time = solve_time - (stats.get('root_lp_time') or 0.0)
+            if tree_time > 0:
+                stats['node_throughput'] = nodes / tree_time
+        return stats
+
+
+def _set(key, group=1, cast=float):
+    """生成一个将匹配组转换后写入 stats[key] 的处理函数"""
+    def handler(match, stats):
+        try:
+            stats[key] = cast(match.group(group))
+        except (TypeError, ValueError):
+            pass
+    return handler
+
+
+def _dims(prefix):
+    """生成处理 "X rows, Y columns and Z nonzeros" 类行的处理函数"""
+    def handler(match, stats):
+        stats[f'{prefix}_rows'] = int(match.group(1))
+        stats[f'{prefix}_cols'] = int(match.group(2))
+        stats[f'{prefix}_nonzeros'] = int(match.group(3))
+    return handler
+
+
+def _enter_section(name):
+    """生成一个记录当前日志段落的处理函数"""
+    def handler(match, stats):
+        stats['_section'] = name
+    return handler
+
+
+def _set_gap(group):
+    """生成解析 "12.3%" 形式间隙的处理函数"""
+    def handler(match, stats):
+        try:
+            stats['gap'] = float(match.group(group).rstrip('%')) / 100.0
+        except (TypeError, ValueError):
+            pass
+    return handler
+
+
+def _float_or_none(text, missing):
+    """日志中的缺失值 (如 "--"、"-"、"Inf") 转换为 None"""
+    if text in missing:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _copt_problem_dims(match, stats):
+    """COPT在原问题和预处理后问题中使用同一格式的规模行，按所在段落区分"""
+    prefix = 'presolved' if stats.get('_section') == 'presolved' else 'orig'
+    _dims(prefix)(match, stats)
+
+
+def _copt_node_line(match, stats):
+    """COPT节点表: Nodes Active LPit/n IntInf BestBound BestSolution Gap Time"""
+    stats['nodes'] = int(match.group(1))
+    node_time = float(match.group(5))
+    stats['_last_time'] = node_time
+    stats.setdefault('root_lp_time', node_time)
+    for key, group in (('best_bound', 2), ('objective', 3)):
+        value = _float_or_none(match.group(group), ('--', 'Inf', '-Inf'))
+        if value is not None:
+            stats[key] = value
+    if match.group(4) not in ('--', 'Inf'):
+        _set_gap(4)(match, stats)
+
+
+def _gurobi_node_line(match, stats):
+    """Gurobi节点表: Expl Unexpl | Obj Depth IntInf | Incumbent BestBd Gap | It/Node Time"""
+    stats['nodes'] = int(match.group(1))
+    stats['_last_time'] = float(match.group(5))
+    for key, group in (('objective', 2), ('best_bound', 3)):
+        value = _float_or_none(match.group(group), ('-',))
+        if value is not None:
+            stats[key] = value
+    if match.group(4) != '-':
+        _set_gap(4)(match, stats)
+
+
+def _gurobi_cut_line(match, stats):
+    """Cutting planes 段中的 "  Gomory: 5" 行"""
+    if stats.get('_section') == 'cuts':
+        stats['cuts'] = stats.get('cuts', 0) + int(match.group(1))
+
+
+def _gurobi_presolve_removed(match, stats):
+    stats['presolve_rows_removed'] = int(match.group(1))
+    stats['presolve_cols_removed'] = int(match.group(2))
+
+
+def _gurobi_root_relaxation(match, stats):
+    stats['root_lp_objective'] = float(match.group(1))
+    stats['root_lp_time'] = float(match.group(2))
+
+
+def _gurobi_explored(match, stats):
+    stats['nodes'] = int(float(match.group(1)))
+    stats['solve_time'] = float(match.group(2))
+    stats['_section'] = None
+
+
+def _gurobi_final(match, stats):
+    stats['objective'] = float(match.group(1))
+    stats['best_bound'] = float(match.group(2))
+    _set_gap(3)(match, stats)
+
+
+class COPTLogParser(LogParser):
+    """COPT 日志解析器"""
+    solver = "copt"
+    rules = [
+        (re.compile(r"^\s*(?:Using )?Cardinal Optimizer v(\d[\w.]*\d)"), _set('solver_version', cast=str)),
+        (re.compile(r"^\s*The original problem has:"), _enter_section('original')),
+        (re.compile(r"^\s*The presolved problem has:"), _enter_section('presolved')),
+        (re.compile(r"^\s*(\d+) rows, (\d+) columns and (\d+) non-zero elements"), _copt_problem_dims),
+        (re.compile(r"^\s*Presolve(?:d)? (?:time|finished in)\s*:?\s*(" + _NUM + r")s?"), _set('presolve_time')),
+        (re.compile(r"^\s*Starting the MIP solver with (\d+) threads"), _set('threads', cast=int)),
+        (re.compile(r"^\s*(\d+)\s+\d+\s+\S+\s+\d+\s+(\S+)\s+(\S+)\s+(\S+)\s+(" + _NUM + r")s\s*$"), _copt_node_line),
+        (re.compile(r"^\s*(?:Total )?[Cc]uts?(?: generated)?\s*:\s*(\d+)"), _set('cuts', cast=int)),
+        (re.compile(r"^\s*Best solution\s*:\s*(" + _NUM + r")"), _set('objective')),
+        (re.compile(r"^\s*Best bound\s*:\s*(" + _NUM + r")"), _set('best_bound')),
+        (re.compile(r"^\s*Best gap\s*:\s*(" + _NUM + r"%)"), _set_gap(1)),
+        (re.compile(r"^\s*Solve time\s*:\s*(" + _NUM + r")"), _set('solve_time')),
+        (re.compile(r"^\s*Solve node\s*:\s*(\d+)"), _set('nodes', cast=int)),
+        (re.compile(r"^\s*(?:MIP|LP) status\s*:\s*(.+?)\s*$"), _set('status', cast=str)),
+        (re.compile(r"^\s*Objective value\s*:\s*(" + _NUM + r")"), _set('objective')),
+    ]
+
+
+class GurobiLogParser(LogParser):
+    """Gurobi 日志解析器"""
+    solver = "gurobi"
+    rules = [
+        (re.compile(r"^Gurobi Optimizer version (\S+)"), _set('solver_version', cast=str)),
+        (re.compile(r"^Optimize a model with (\d+) rows, (\d+) columns and (\d+) nonzeros"), _dims('orig')),
+        (re.compile(r"^Presolved: (\d+) rows, (\d+) columns, (\d+) nonzeros"), _dims('presolved')),
+        (re.compile(r"^Presolve removed (\d+) rows and (\d+) columns"), _gurobi_presolve_removed),
+        (re.compile(r"^Presolve time: (" + _NUM + r")s"), _set('presolve_time')),
+        (re.compile(r"^Root relaxation: objective (" + _NUM + r"), \d+ iterations, (" + _NUM + r") seconds"),
+         _gurobi_root_relaxation),
+        (re.compile(r"^Cutting planes:"), _enter_section('cuts')),
+        (re.compile(r"^\s+[A-Za-z][A-Za-z -]*: (\d+)\s*$"), _gurobi_cut_line),
+        (re.compile(r"^\s*[H*]?\s*(\d+)\s+\d+\s.*?\s(-|" + _NUM + r")\s+(-|" + _NUM + r")\s+(-|" + _NUM + r"%)\s+\S+\s+(\d+)s\s*$"),
+         _gurobi_node_line),
+        (re.compile(r"^Explored (" + _NUM + r") nodes \(.*?\) in (" + _NUM + r") seconds"), _gurobi_explored),
+        (re.compile(r"^Thread count was (\d+)"), _set('threads', cast=int)),
+        (re.compile(r"^(Optimal solution found|Time limit reached|Solution limit reached|Node limit reached|"
+                    r"Model is infeasible or unbounded|Model is infeasible|Model is unbounded|Solve interrupted)"),
+         _set('status', cast=str)),
+        (re.compile(r"^Best objective (" + _NUM + r"), best bound (" + _NUM + r"), gap (" + _NUM + r"%)"), _gurobi_final),
+    ]
+
+
+PARSERS = {parser.solver: parser() for parser in (COPTLogParser, GurobiLogParser)}
+
+
+def detect_solver(filepath, head_text=""):
+    """根据所在目录或日志开头的版本信息判断日志来自哪个求解器"""
+    parts = os.path.normpath(filepath).split(os.sep)
+    if "copt_logs" in parts:
+        return "copt"
+    if "gurobi_logs" in parts:
+        return "gurobi"
+    if "Cardinal Optimizer" in head_text:
+        return "copt"
+    if "Gurobi" in head_text:
+        return "gurobi"
+    return None
+
+
+def _open_log(filepath):
+    """以二进制方式打开日志文件，自动处理压缩格式"""
+    opener = COMPRESSED_OPENERS.get(os.path.splitext(filepath)[1])
+    return opener(filepath, 'rb') if opener else open(filepath, 'rb')
+
+
+def _fingerprint(filepath):
+    """日志开头 FINGERPRINT_BYTES 字节 (压缩文件为解压后的内容) 的 SHA-256，不足这么长或无法读取时返回 None"""
+    try:
+        with _open_log(filepath) as f:
+            head = f.read(FINGERPRINT_BYTES)
+    except (OSError, EOFError, lzma.LZMAError):
+        return None
+    return hashlib.sha256(head).hexdigest() if len(head) == FINGERPRINT_BYTES else None
+
+
+def _run_name(filepath):
+    """日志对应的运行 (实例名, 时间戳)，轮转和压缩后保持不变"""
+    match = LOG_NAME_PATTERN.match(os.path.basename(filepath))
+    return (match.group('instance'), match.group('timestamp')) if match else os.path.basename(filepath)
+
+
+class LogTailer:
+    """
+    按字节偏移量增量读取(未压缩)文件的完整行
+
+    只返回以换行符结尾的完整行，未完成的最后一行保留到下一次读取。
+    读取前先通过 os.stat 比较文件大小，文件没有增长时不进行任何读取。
+    """
+
+    def __init__(self, filepath, offset=0):
+        self.filepath = filepath
+        self.offset = offset
+
+    def has_new_data(self):
+        """文件自上次读取后是否有新数据"""
+        try:
+            return os.stat(self.filepath).st_size > self.offset
+        except OSError:
+            return False
+
+    def read_lines(self):
+        """读取自上次偏移量以来新增的完整行"""
+        try:
+            size = os.stat(self.filepath).st_size
+        except OSError:
+            return []
+        if size < self.offset:
+            # 文件被截断或轮转，从头开始
+            self.offset = 0
+        if size == self.offset:
+            return []
+
+        with open(self.filepath, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+        end = data.rfind(b"\n")
+        if end < 0:
+            return []
+        self.offset += end + 1
+        return data[:end].decode('utf-8', errors='replace').split("\n")
+
+
+class LogIngester:
+    """
+    将求解日志增量摄取到结果数据库
+
+    使用方法:
+    ingester = LogIngester()
+    ingester.scan(["copt_logs", "gurobi_logs"])
+    """
+
+    def __init__(self, db_path=results_store.DEFAULT_DB_PATH):
+        self.conn = results_store.connect(db_path)
+        self._backfill_identity()
+
+    def _backfill_identity(self):
+        """为从旧版本数据库迁移来的记录补齐设备号、inode 和内容指纹 (文件已不在原路径的记录保持为空)"""
+        updates = []
+        for row in self.conn.execute("SELECT id, path FROM log_files WHERE device IS NULL").fetchall():
+            try:
+                st = os.stat(row['path'])
+            except OSError:
+                continue
+            updates.append((st.st_dev, st.st_ino, _fingerprint(row['path']), row['id']))
+        if updates:
+            with self.conn:
+                self.conn.executemany("UPDATE log_files SET device = ?, inode = ?, fingerprint = ? WHERE id = ?",
+                                      updates)
+
+    @staticmethod
+    def _holds(record):
+        """记录对应的文件是否仍在原路径且开头未变 (没有被轮转走、删除或截断)"""
+        try:
+            st = os.stat(record['path'])
+        except OSError:
+            return False
+        return ((st.st_dev, st.st_ino) == (record['device'], record['inode'])
+                and _fingerprint(record['path']) == record['fingerprint'])
+
+    def _find_record(self, filepath, st, fingerprint):
+        """
+        查找与该文件对应的已摄取记录
+
+        返回:
+        (记录, 类型)，类型为 'same' (同一个文件，可能已改名)、'copy' (需要整体重新解析并接管记录:
+        原文件轮转走后留下的副本，或者先于原日志摄取的压缩副本)、'duplicate' (原文件仍在时的压缩副本，跳过)；
+        新日志返回 (None, None)。压缩副本和原日志无论哪个先被扫描，最终都由原日志持有记录。
+        """
+        rows = self.conn.execute("SELECT * FROM log_files WHERE device = ? AND inode = ?", (st.st_dev, st.st_ino))
+        for row in rows.fetchall():
+            if row['fingerprint'] is None or row['fingerprint'] == fingerprint:
+                return dict(row), 'same'
+        if fingerprint is None:
+            return None, None
+        run = _run_name(filepath)
+        compressed = os.path.splitext(filepath)[1] in COMPRESSED_OPENERS
+        for row in self.conn.execute("SELECT * FROM log_files WHERE fingerprint = ?", (fingerprint,)).fetchall():
+            if _run_name(row['path']) != run or (row['device'], row['inode']) == (st.st_dev, st.st_ino):
+                continue
+            if not self._holds(row) or (not compressed and os.path.splitext(row['path'])[1] in COMPRESSED_OPENERS):
+                return dict(row), 'copy'
+            if compressed:
+                return dict(row), 'duplicate'
+        return None, None
+
+    def ingest_file(self, filepath):
+        """
+        增量摄取单个日志文件
+
+        返回:
+        本次读取的新字节数
+        """
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            return 0
+
+        unchanged = self.conn.execute(
+            "SELECT 1 FROM log_files WHERE device = ? AND inode = ? AND path = ? AND size = ? AND mtime = ?",
+            (st.st_dev, st.st_ino, filepath, st.st_size, st.st_mtime)).fetchone()
+        if unchanged:
+            return 0
+
+        fingerprint = _fingerprint(filepath)
+        record, kind = self._find_record(filepath, st, fingerprint)
+        if kind == 'duplicate':
+            return 0
+        compressed = os.path.splitext(filepath)[1] in COMPRESSED_OPENERS
+        # 改名轮转 (如 .log -> .log.1) 的文件从原偏移量继续读取，只更新路径
+        if record is None or kind == 'copy' or compressed or st.st_size < (record['offset'] or 0):
+            offset, stats, solver = 0, {}, None
+        else:
+            offset = record['offset']
+            stats = json.loads(record['state'] or "{}")
+            solver = record['solver']
+
+        if solver is None:
+            with _open_log(filepath) as f:
+                head = f.read(4096).decode('utf-8', errors='replace')
+            solver = detect_solver(filepath, head)
+        parser = PARSERS.get(solver)
+        if parser is None:
+            return 0
+
+        name_match = LOG_NAME_PATTERN.match(os.path.basename(filepath))
+        if name_match:
+            stats.setdefault('instance', name_match.group('instance'))
+            stats.setdefault('run_timestamp', name_match.group('timestamp'))
+        stats['solver'] = solver
+
+        if compressed:
+            with _open_log(filepath) as f:
+                data = f.read()
+            lines = data.decode('utf-8', errors='replace').splitlines()
+            new_offset = len(data)
+        else:
+            tailer = LogTailer(filepath, offset)
+            lines = tailer.read_lines()
+            new_offset = tailer.offset
+
+        for line in lines:
+            parser.feed(line, stats)
+        parser.finalize(stats)
+
+        values = (filepath, st.st_dev, st.st_ino, fingerprint, solver, st.st_size, st.st_mtime, new_offset,
+                  json.dumps(stats), datetime.datetime.now().isoformat(timespec='seconds'))
+        with self.conn:
+            if record is None:
+                log_id = self.conn.execute(
+                    "INSERT INTO log_files (path, device, inode, fingerprint, solver, size, mtime, offset, state, "
+                    "ingested_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", values).lastrowid
+            else:
+                log_id = record['id']
+                self.conn.execute(
+                    "UPDATE log_files SET path = ?, device = ?, inode = ?, fingerprint = ?, solver = ?, size = ?, "
+                    "mtime = ?, offset = ?, state = ?, ingested_at = ? WHERE id = ?", values + (log_id,))
+            results_store.save_stats(self.conn, log_id, filepath, stats)
+        return new_offset - offset
+
+    def iter_log_files(self, directories):
+        """列出目录中所有符合命名规则的日志文件"""
+        for directory in directories:
+            if not os.path.isdir(directory):
+                continue
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_file() and LOG_NAME_PATTERN.match(entry.name):
+                        yield entry.path
+
+    def scan(self, directories=DEFAULT_LOG_DIRS):
+        """
+        批量扫描目录并摄取所有日志
+
+        返回:
+        (扫描文件数, 有新数据的文件数, 新读取字节数)
+        """
+        files = changed = total_bytes = 0
+        for filepath in self.iter_log_files(directories):
+            files += 1
+            new_bytes = self.ingest_file(filepath)
+            if new_bytes:
+                changed += 1
+                total_bytes += new_bytes
+        return files, changed, total_bytes
+
+    def follow(self, directories=DEFAULT_LOG_DIRS, interval=2.0):
+        """持续跟踪目录中的日志文件 (Ctrl+C 退出)"""
+        print(f"跟踪日志目录: {', '.join(directories)} (每 {interval} 秒轮询一次，Ctrl+C 退出)")
+        try:
+            while True:
+                files, changed, total_bytes = self.scan(directories)
+                if changed:
+                    print(f"[{datetime.datetime.now().strftime('%H:%M:%S')}] "
+                          f"{changed}/{files} 个日志有新内容，读取 {total_bytes} 字节")
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            print("停止跟踪。")
+
+    def print_summary(self, limit=20):
+        """打印最近摄取的求解统计"""
+        rows = self.conn.execute(
+            "SELECT instance, solver, status, objective, best_bound, gap, nodes, node_throughput, solve_time "
+            "FROM solve_stats ORDER BY run_timestamp DESC LIMIT ?", (limit,)).fetchall()
+        print(f"{'实例':<24}{'求解器':<8}{'状态':<28}{'目标值':>16}{'间隙':>10}{'节点':>10}{'节点/秒':>10}{'时间(秒)':>10}")
+        for row in rows:
+            gap = f"{row['gap'] * 100:.2f}%" if row['gap'] is not None else "-"
+            objective = f"{row['objective']:.8g}" if row['objective'] is not None else "-"
+            throughput = f"{row['node_throughput']:.1f}" if row['node_throughput'] is not None else "-"
+            solve_time = f"{row['solve_time']:.2f}" if row['solve_time'] is not None else "-"
+            print(f"{str(row['instance']):<24}{str(row['solver']):<8}{str(row['status'] or '-')[:26]:<28}"
+                  f"{objective:>16}{gap:>10}{str(row['nodes'] or '-'):>10}{throughput:>10}{solve_time:>10}")
+
+
+def main():
+    """主函数"""
+    args = sys.argv[1:]
+    follow = '--follow' in args
+    summary = '--summary' in args
+    interval = 2.0
+    if '--interval' in args:
+        index = args.index('--interval')
+        interval = float(args[index + 1])
+        del args[index:index + 2]
+    directories = [arg for arg in args if not arg.startswith('--')] or DEFAULT_LOG_DIRS
+
+    ingester = LogIngester()
+    if follow:
+        ingester.follow(directories, interval)
+        return
+
+    start = time.time()
+    files, changed, total_bytes = ingester.scan(directories)
+    print(f"扫描 {files} 个日志文件，其中 {changed} 个有新内容，读取 {total_bytes} 字节，"
+          f"耗时 {time.time() - start:.2f} 秒")
+    if summary:
+        ingester.print_summary()
+
+
+if __name__ == "__main__":
+    main()
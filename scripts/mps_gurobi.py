@@ -18,12 +18,29 @@ Gurobi优化求解器作为后端。MPS是一种通用的数学规划问题文
 还能生成格式精美的LaTeX报告，详细展示模型结构和求解结果。
 通过智能变量格式化和排序功能，报告的可读性得到了显著提升。
 """
-from gurobipy import *
 import os
 import re
 import datetime
 import sys
+import time
 from collections import defaultdict
+from trajectory import SolveTrajectory
+import profiling
+import solver_log
+import solver_params
+
+# gurobipy 在第一次创建求解器时才导入 (见 _load_gurobi)，列出文件等操作无需加载求解器库
+gp = None
+GRB = None
+
+def _load_gurobi():
+    """导入 gurobipy 并设置模块级的 gp / GRB"""
+    global gp, GRB
+    if gp is None:
+        import gurobipy
+        gp = gurobipy
+        GRB = gurobipy.GRB
+    return gp
 
 class MPSSolver:
     """
@@ -41,19 +58,104 @@ class MPSSolver:
     - 自动换行处理长表达式，避免PDF排版问题
     - 详细的解决方案分析和可视化
     """
-    def __init__(self, mps_filepath):
+    def __init__(self, mps_filepath, profiler=None, force_solve=False, env=None, params=None,
+                 resume=False, checkpoint_interval=None, use_warm_start=True, output_dir=None, record=True):
         if not os.path.exists(mps_filepath):
             raise FileNotFoundError(f"错误: 文件 '{mps_filepath}' 不存在。")
         self.mps_filepath = mps_filepath
+        self.profiler = profiler or profiling.NULL_PROFILER  # 性能剖析器 (--profile 模式)
         # 创建环境
-        self.env = Env()
+        with self.profiler.span("env"):
+            _load_gurobi()
+            # 求解守护进程传入预热好的环境时复用它，销毁时不释放
+            self._owns_env = env is None
+            self.env = env if env is not None else gp.Env()
         self.model = None  # Will be created when reading MPS file
         self.solve_status = None
         self.objective_value = None
         self.solution = {}
         self.all_vars_cache = None  # 缓存变量列表
         self.log_filepath = None    # 用于存储日志文件路径
+        self.log = solver_log.NULL_LOG  # 脚本事件日志 (后台线程成批写入)
         self.var_prefix_counts = {}  # 存储每个变量前缀的计数信息
+        self.solve_time = 0
+        self.trajectory = None  # MIP求解进度轨迹
+        self.force_solve = force_solve  # 忽略求解结果缓存，重新求解
+        self.solver_params = dict(params or {})  # 生效的求解参数 (Gurobi参数名 -> 值，参与缓存键计算)
+        self.progress_listeners = []  # 求解进度回调 (time, incumbent, bound, nodes)，见 SolveTrajectory
+        self.resume = resume  # 使用检查点中保存的解作为MIP初始解
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpointer = None  # MIP当前最优解检查点
+        self.use_warm_start = use_warm_start  # 自动使用解库中的历史解作为初始解
+        self.warm_start_info = None
+        self.output_dir = output_dir or ""  # 日志和轨迹的输出目录 ("" 表示当前目录)
+        self.record = record  # 为 False 时不使用检查点和解库 (参数调优的试验)
+        self.content_hash = None  # 实例文件内容的哈希
+        self.cache_key = None
+        self.from_cache = False
+
+    def _instance_hash(self):
+        """实例文件内容的哈希 (每个求解器对象只计算一次，结果缓存、检查点和解库共用)"""
+        if self.content_hash is None:
+            import result_cache
+            self.content_hash = result_cache.file_hash(self.mps_filepath)
+        return self.content_hash
+
+    def _load_cached_result(self):
+        """
+        查询求解结果缓存，命中时恢复求解状态、目标值和解，返回是否命中
+
+        --force-solve 和 --resume 时只计算缓存键 (求解结束后仍写入缓存)，不读取缓存结果。
+        """
+        import result_cache
+        try:
+            with self.profiler.span("cache_lookup"):
+                self.cache_key = result_cache.lookup_key(self.mps_filepath, "gurobi", "gurobipy", self.solver_params,
+                                                      self._instance_hash())
+                cached = None if self.force_solve or self.resume else result_cache.ResultCache().get(self.cache_key)
+        except OSError as e:
+            print(f"读取求解结果缓存失败: {e}")
+            return False
+        if cached is None:
+            return False
+        self.solve_status = cached['status']
+        self.objective_value = cached['objective']
+        self.solution = cached['solution']
+        self.solve_time = cached['stats'].get('solve_time', 0)
+        self.from_cache = True
+        print(f"使用缓存的求解结果 (缓存时间 {cached['created']}, 原求解耗时 {self.solve_time:.2f} 秒)，"
+              f"如需重新求解请加 --force-solve")
+        if self.objective_value is not None:
+            print(f"目标值: {self.objective_value:.8g}")
+        return True
+
+    def _store_result(self):
+        """
+        将求解结果写入缓存
+
+        只缓存确定的结论 (最优、不可行、无界)；达到时间/节点限制或被中断的结果不缓存，
+        否则之后的 --resume 或重新求解会直接得到缓存中的未完成结果。
+        """
+        import result_cache
+        if self.cache_key is None or self.solve_status not in (GRB.OPTIMAL, GRB.INFEASIBLE, GRB.UNBOUNDED,
+                                                                GRB.INF_OR_UNBD):
+            return
+        stats = result_cache.collect_attrs(self.model, ("NodeCount", "IterCount", "BarIterCount", "Runtime"))
+        stats['solve_time'] = self.solve_time
+        bound = result_cache.collect_attrs(self.model, ("ObjBound",)).get("ObjBound") if self.model.IsMIP else None
+        try:
+            result_cache.ResultCache().put(self.cache_key, {
+                'instance': self.mps_filepath,
+                'solver': "gurobi",
+                'params': self.solver_params,
+                'status': self.solve_status,
+                'objective': self.objective_value,
+                'bound': bound,
+                'solution': self.solution,
+                'stats': stats,
+            })
+        except OSError as e:
+            print(f"写入求解结果缓存失败: {e}")
 
     def _analyze_variable_patterns(self):
         """分析变量模式，确定每个前缀的变量数量和所需的零填充位数"""
@@ -312,6 +414,8 @@ class MPSSolver:
         }
         status_text = status_mapping.get(self.solve_status, f"未知状态码 ({self.solve_status})")
         latex_solution += f"\\subsection{{求解状态}}\n\n求解状态: \\textbf{{{status_text}}}\n\n"
+        if self.from_cache:
+            latex_solution += f"本结果取自求解结果缓存 (原求解耗时 {self.solve_time:.2f} 秒)。\n\n"
 
         latex_solution += "\\subsection{目标函数值}\n\n"
         if self.objective_value is not None:
@@ -344,6 +448,74 @@ class MPSSolver:
         
         return latex_solution
 
+    def _trajectory_callback(self, model, where):
+        """Gurobi MIP回调，将当前最优解、最优界和节点数记录到求解轨迹中"""
+        try:
+            if where == GRB.Callback.MIP:
+                self.trajectory.record(model.cbGet(GRB.Callback.MIP_OBJBST),
+                                       model.cbGet(GRB.Callback.MIP_OBJBND),
+                                       model.cbGet(GRB.Callback.MIP_NODCNT),
+                                       model.cbGet(GRB.Callback.RUNTIME))
+            elif where == GRB.Callback.MIPSOL:
+                self.trajectory.record(model.cbGet(GRB.Callback.MIPSOL_OBJBST),
+                                       model.cbGet(GRB.Callback.MIPSOL_OBJBND),
+                                       model.cbGet(GRB.Callback.MIPSOL_NODCNT),
+                                       model.cbGet(GRB.Callback.RUNTIME))
+                # 新的可行解写入检查点
+                if self.checkpointer is not None:
+                    self.checkpointer.update(model.cbGet(GRB.Callback.MIPSOL_OBJ),
+                                             model.cbGet(GRB.Callback.MIPSOL_OBJBND),
+                                             model.cbGetSolution(self.all_vars_cache))
+        except Exception:
+            pass
+
+    def _apply_mip_start(self, record):
+        """把检查点中保存的解设置为MIP初始解"""
+        if record is None:
+            print(f"未找到可用的检查点 ({self.checkpointer.path})，从头开始求解")
+            return
+        self._set_mip_start(record['solution'])
+        print(f"已从检查点恢复初始解: 目标值 {record['objective']:.8g} "
+              f"(保存于 {record['saved']}, 已求解 {record['elapsed']:.0f} 秒)")
+
+    def _set_mip_start(self, values):
+        """设置MIP初始解，values 为 变量名 -> 取值 (可以只包含部分变量)"""
+        for var in self.all_vars_cache:
+            if var.VarName in values:
+                var.Start = values[var.VarName]
+
+    def _apply_warm_start(self):
+        """从解库中查找历史解并设置为MIP初始解"""
+        import warm_start
+        values, info = warm_start.find_warm_start(self.mps_filepath, [var.VarName for var in self.all_vars_cache],
+                                                  self.model.ModelSense, content_hash=self._instance_hash())
+        if values is None:
+            return
+        self._set_mip_start(values)
+        self.warm_start_info = info
+        print(info.describe())
+
+    def _save_warm_start(self):
+        """把本次求解得到的解保存到解库，供以后的求解热启动"""
+        import warm_start
+        first = self.trajectory.time_to_first_incumbent() if self.trajectory is not None else None
+        warm_start.save_solution(self.mps_filepath, "gurobi", self.model.ModelSense, self.objective_value,
+                                 self.solve_status, self.solve_time, first,
+                                 self.warm_start_info is not None or self.resume, self.solution,
+                                 content_hash=self._instance_hash())
+
+    def _finish_checkpoint(self):
+        """求解结束后: 已得最优解或不可行时删除检查点，否则保存最终的最优解"""
+        if self.solve_status in (GRB.OPTIMAL, GRB.INFEASIBLE):
+            self.checkpointer.discard()
+            return
+        if self.solution:
+            self.checkpointer.update(self.objective_value, self.checkpointer.bound,
+                                     [self.solution[name] for name in self.checkpointer.names])
+        path = self.checkpointer.save(status=str(self.solve_status))
+        if path:
+            print(f"检查点已保存: {path} (使用 --resume 从该解继续求解)")
+
     def solve_model(self):
         """求解模型，并以更稳健的方式提取结果"""
         try:
@@ -376,40 +548,41 @@ class MPSSolver:
                 except Exception as e:
                     print(f"无法读取文件内容: {e}")
             
-            # Try to read the MPS file using different methods
-            success = False
+            with self.profiler.span("read"):
+                # Try to read the MPS file using different methods
+                success = False
             
-            # Method 1: Use global read function
-            try:
-                print("尝试方法1: 使用read()函数...")
-                self.model = read(self.mps_filepath, env=self.env)
-                print("方法1成功")
-                success = True
-            except Exception as read_error:
-                print(f"方法1失败: {read_error}")
-            
-            # Method 2: Use model.read() method
-            if not success:
+                # Method 1: Use global read function
                 try:
-                    print("尝试方法2: 使用model.read()方法...")
-                    self.model = Model("MPS_Solver", env=self.env)
-                    self.model.read(self.mps_filepath)
-                    print("方法2成功")
+                    print("尝试方法1: 使用read()函数...")
+                    self.model = gp.read(self.mps_filepath, env=self.env)
+                    print("方法1成功")
                     success = True
                 except Exception as read_error:
-                    print(f"方法2失败: {read_error}")
+                    print(f"方法1失败: {read_error}")
             
-            # Method 3: Try with different parameters
-            if not success:
-                try:
-                    print("尝试方法3: 设置特殊参数...")
-                    self.model = Model("MPS_Solver", env=self.env)
-                    self.model.setParam('MIPFocus', 0)  # Try default settings
-                    self.model.read(self.mps_filepath)
-                    print("方法3成功")
-                    success = True
-                except Exception as read_error:
-                    print(f"方法3失败: {read_error}")
+                # Method 2: Use model.read() method
+                if not success:
+                    try:
+                        print("尝试方法2: 使用model.read()方法...")
+                        self.model = gp.Model("MPS_Solver", env=self.env)
+                        self.model.read(self.mps_filepath)
+                        print("方法2成功")
+                        success = True
+                    except Exception as read_error:
+                        print(f"方法2失败: {read_error}")
+            
+                # Method 3: Try with different parameters
+                if not success:
+                    try:
+                        print("尝试方法3: 设置特殊参数...")
+                        self.model = gp.Model("MPS_Solver", env=self.env)
+                        self.model.setParam('MIPFocus', 0)  # Try default settings
+                        self.model.read(self.mps_filepath)
+                        print("方法3成功")
+                        success = True
+                    except Exception as read_error:
+                        print(f"方法3失败: {read_error}")
             
             if not success:
                 raise Exception("所有读取方法都失败了")
@@ -423,31 +596,77 @@ class MPSSolver:
             
             # 分析变量模式，为智能格式化做准备
             print("分析变量命名模式...")
-            self._analyze_variable_patterns()
+            with self.profiler.span("analyze_patterns"):
+                self._analyze_variable_patterns()
+            
+            # 相同实例、求解器版本和参数已经求解过时直接使用缓存结果
+            if self._load_cached_result():
+                return
             
             # 设置日志文件
-            log_dir = "gurobi_logs"
+            log_dir = os.path.join(self.output_dir, "gurobi_logs")
             os.makedirs(log_dir, exist_ok=True)
             base_name = os.path.splitext(os.path.basename(self.mps_filepath))[0]
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
             self.log_filepath = os.path.join(log_dir, f"{base_name}_log_{timestamp}.log")
+            # 脚本自身的事件 (参数、状态、错误) 写入单独的文件，求解器日志由求解器写入 log_filepath
+            self.log.close()
+            self.log = solver_log.open_log(os.path.join(log_dir, f"{base_name}_events_{timestamp}.log"))
+            self.log.info("实例: %s, 求解参数: %s", self.mps_filepath, self.solver_params)
             
             # 将求解过程的日志输出到指定文件
             self.model.setParam('LogFile', self.log_filepath)
             print(f"求解日志将被记录到: {self.log_filepath}")
+            solver_params.apply(self.model, self.solver_params)
+            import checkpoint
+
+            # MIP模型定期把当前最优解写入检查点
+            if self.model.IsMIP and self.record:
+                interval = (checkpoint.DEFAULT_INTERVAL if self.checkpoint_interval is None
+                            else self.checkpoint_interval)
+                self.checkpointer = checkpoint.Checkpointer(self.mps_filepath, "gurobi", interval,
+                                                            minimize=self.model.ModelSense == GRB.MINIMIZE,
+                                                            content_hash=self._instance_hash())
+                self.checkpointer.log_filepath = self.log_filepath
+                self.checkpointer.set_variables(var.VarName for var in self.all_vars_cache)
+                if self.resume:
+                    self._apply_mip_start(self.checkpointer.load())
+                elif self.use_warm_start:
+                    self._apply_warm_start()
 
             print("开始求解模型...")
-            self.model.optimize()
+            start_time = time.time()
+            # Ctrl+C / SIGTERM 中断求解器，之后照常提取当前最优解、保存检查点并生成报告
+            restore_signals = checkpoint.install_signal_handlers(self.model.terminate)
+            try:
+                with self.profiler.span("solve"):
+                    if self.model.IsMIP:
+                        # MIP模型通过回调记录求解进度轨迹
+                        self.trajectory = SolveTrajectory(base_name,
+                                                          output_dir=os.path.join(self.output_dir, "trajectories"))
+                        self.trajectory.listeners.extend(self.progress_listeners)
+                        print(f"求解进度轨迹将被记录到: {self.trajectory.filepath}")
+                        self.model.optimize(self._trajectory_callback)
+                    else:
+                        self.model.optimize()
+            finally:
+                restore_signals()
+            self.solve_time = time.time() - start_time
             
             self.solve_status = self.model.Status
             
-            if self.solve_status in [GRB.OPTIMAL, GRB.SUBOPTIMAL]:
-                status_str = "已得最优解" if self.solve_status == GRB.OPTIMAL else "找到次优解"
+            # 被中断或达到限制时只要有可行解也提取，用于部分结果报告
+            if self.solve_status in [GRB.OPTIMAL, GRB.SUBOPTIMAL] or self.model.SolCount > 0:
+                status_str = "已得最优解" if self.solve_status == GRB.OPTIMAL else "找到可行解"
                 print(f"模型求解完成: {status_str} (状态码: {self.solve_status})")
 
                 self.objective_value = self.model.ObjVal
-                for var in self.all_vars_cache:
-                    self.solution[var.VarName] = var.X
+                with self.profiler.span("extract_solution"):
+                    for var in self.all_vars_cache:
+                        self.solution[var.VarName] = var.X
+                    if self.log.debug_enabled:
+                        for name, value in self.solution.items():
+                            self.log.debug("%s = %.12g", name, value)
                 print(f"目标值: {self.objective_value:.8g}")
             else:
                 status_map = {
@@ -459,10 +678,27 @@ class MPSSolver:
                 print(f"模型求解失败或无解。状态: {status_str}")
                 self.objective_value = None
                 self.solution = {}
+
+            if self.trajectory is not None:
+                self.trajectory.finish(self.model.Runtime, reference=self.objective_value)
+                print(f"原始积分: {self.trajectory.primal_integral():.6g}, "
+                      f"原始-对偶积分: {self.trajectory.primal_dual_integral():.6g}")
+
+            if self.checkpointer is not None:
+                self._finish_checkpoint()
+                if self.solution:
+                    self._save_warm_start()
+
+            self.log.info("求解结束: 状态码 %s, 目标值 %s, 耗时 %.3f 秒", self.solve_status, self.objective_value,
+                          self.solve_time)
+            self._store_result()
                 
         except Exception as e:
             print(f"求解过程中发生严重错误: {e}")
+            self.log.error("求解过程中发生严重错误: %s", e)
             self.solve_status = None
+        finally:
+            self.log.flush()
 
     def extract_to_latex(self, output_filepath=None):
         """提取模型信息并生成完整的LaTeX格式报告"""
@@ -507,6 +743,8 @@ class MPSSolver:
 \\documentclass[a4paper,10pt]{{article}}
 \\usepackage[UTF8]{{ctex}}
 \\usepackage{{amsmath, amssymb, longtable, booktabs, geometry, fancyhdr}}
+\\usepackage{{pgfplots}}
+\\pgfplotsset{{compat=1.16}}
 \\geometry{{a4paper, left=1.5cm, right=1.5cm, top=2cm, bottom=2cm}}
 \\pagestyle{{fancy}}
 \\fancyhf{{}}
@@ -540,25 +778,60 @@ class MPSSolver:
 \\end{{itemize}}
 """
         
-        latex_content += self._format_objective_function_from_api()
-        latex_content += self._format_constraints_from_api()
-        latex_content += self._format_variables_from_api()
-        latex_content += self._format_solution_table()
+        with self.profiler.span("report.objective"):
+            latex_content += self._format_objective_function_from_api()
+        with self.profiler.span("report.constraints"):
+            latex_content += self._format_constraints_from_api()
+        with self.profiler.span("report.variables"):
+            latex_content += self._format_variables_from_api()
+        with self.profiler.span("report.solution"):
+            latex_content += self._format_solution_table()
+        if self.trajectory is not None:
+            with self.profiler.span("report.trajectory"):
+                latex_content += self.trajectory.to_latex()
+        if self.warm_start_info is not None:
+            first = self.trajectory.time_to_first_incumbent() if self.trajectory is not None else None
+            latex_content += self.warm_start_info.to_latex(first, self.solve_time)
+        latex_content += solver_params.to_latex(self.solver_params)
+        latex_content += self.profiler.to_latex()
         
         latex_content += "\\end{document}"
         
-        with open(output_filepath, 'w', encoding='utf-8') as f:
-            f.write(latex_content)
+        with self.profiler.span("write"):
+            with open(output_filepath, 'w', encoding='utf-8') as f:
+                f.write(latex_content)
         
         print(f"已生成求解报告: {output_filepath}")
         return output_filepath
 
+    def export_solution(self, formats=None, output_dir=None):
+        """
+        把解导出为机器可读格式 (.sol、非零取值 CSV、.solbin，见 solution_export.py)
+
+        参数:
+        formats - 格式列表，默认全部格式
+        output_dir - 输出目录，默认 solution_exports/
+
+        返回:
+        写出的文件路径列表，没有解时为空列表
+        """
+        if not self.solution:
+            print("没有可导出的解。")
+            return []
+        import solution_export
+        formats = solution_export.FORMATS if formats is None else formats
+        output_dir = solution_export.DEFAULT_DIR if output_dir is None else output_dir
+        base_name = os.path.splitext(os.path.basename(self.mps_filepath))[0]
+        return solution_export.export(self.solution, os.path.join(output_dir, f"{base_name}_GUROBI"), formats,
+                                      objective=self.objective_value)
+
     def __del__(self):
         """清理环境资源"""
         try:
+            self.log.close()
             if hasattr(self, 'model') and self.model is not None:
                 self.model.dispose()
-            if hasattr(self, 'env'):
+            if hasattr(self, 'env') and self._owns_env:
                 self.env.dispose()
         except Exception:
             pass
@@ -578,16 +851,30 @@ def find_mps_file(filename_input):
     ]
     
     print(f"查找文件: {filename_input}")
+    if os.path.isfile(filename_input):
+        return filename_input
+    # 优先查询实例目录 (cache/instance_catalog.db)，不可用时回退到逐个路径探测
+    import catalog
+    path = catalog.find_instance(filename_input, ("mps",))
+    if path is not None:
+        return path
     for path in possible_paths:
-        if os.path.exists(path):
-            print(f"  找到: {path}")
+        if os.path.isfile(path):
             return path
-        else:
-            print(f"  未找到: {path}")
     return None
 
-def list_mps_files():
-    """列出可用的MPS文件"""
+def list_mps_files(use_catalog=True):
+    """
+    列出可用的MPS文件
+
+    use_catalog 为 False 时不查询实例目录，直接扫描各目录 (--list 快速路径)
+    """
+    if use_catalog:
+        import catalog
+        mps_files = catalog.list_instances(("mps",))
+        if mps_files is not None:
+            return mps_files
+    
     mps_files = []
     search_dirs = [".", "mps", "milp", "data", "instances"]
     
@@ -609,9 +896,35 @@ def main():
     print("支持智能变量格式化和排序")
     print("=" * 60)
     
+    # 快速路径: 只列出文件，不加载求解器，也不打开实例目录
+    if '--list' in sys.argv:
+        for file in list_mps_files(use_catalog=False):
+            print(f"  {file} ({os.path.getsize(file)} 字节)")
+        return
+
+    import result_cache
+    import checkpoint
+    import warm_start
+    import solution_export
+    profiler = profiling.from_argv()
+    force_solve = result_cache.from_argv()
+    resume, checkpoint_interval = checkpoint.from_argv()
+    use_warm_start = warm_start.from_argv()
+    try:
+        solver_log.from_argv()
+        export_formats = solution_export.from_argv()
+    except ValueError as e:
+        print(f"错误: {e}")
+        return
+    try:
+        param_profile, param_overrides = solver_params.from_argv()
+    except ValueError as e:
+        print(f"求解参数错误: {e}")
+        return
     try:
         # 显示可用文件
-        available_files = list_mps_files()
+        with profiler.span("discover"):
+            available_files = list_mps_files()
         if available_files:
             print("\n可用的MPS文件:")
             for i, file in enumerate(available_files[:10], 1):  # 只显示前10个
@@ -636,20 +949,43 @@ def main():
                 print("输入被中断，程序退出。")
                 return
         
-        actual_filepath = find_mps_file(filename_input)
+        with profiler.span("discover"):
+            actual_filepath = find_mps_file(filename_input)
         
         if actual_filepath is None:
             print(f"\n文件 '{filename_input}' 未找到。")
+            import catalog
+            suggestions = catalog.suggest_instances(filename_input, ("mps",))
+            if suggestions:
+                print("您是否要找:")
+                for path in suggestions:
+                    print(f"  {path}")
             print("请检查文件名和路径，或者查看上面列出的可用文件。")
             return
         
         print(f"\n找到文件: {actual_filepath}")
         
-        solver = MPSSolver(actual_filepath)
+        try:
+            params = solver_params.resolve("gurobi", param_profile, param_overrides, instance=actual_filepath)
+        except (ValueError, OSError) as e:
+            print(f"求解参数错误: {e}")
+            return
+        
+        profiler.name = os.path.splitext(os.path.basename(actual_filepath))[0]
+        solver = MPSSolver(actual_filepath, profiler=profiler, force_solve=force_solve,
+                           resume=resume, checkpoint_interval=checkpoint_interval,
+                           use_warm_start=use_warm_start, params=params)
         solver.solve_model()
         
         print("\n正在生成LaTeX报告...")
-        report_path = solver.extract_to_latex()
+        with profiler.span("report"):
+            report_path = solver.extract_to_latex()
+
+        if export_formats:
+            with profiler.span("export"):
+                export_paths = solver.export_solution(export_formats)
+            for path in export_paths:
+                print(f"解文件: {os.path.abspath(path)}")
         
         if report_path:
             print("\n任务完成!")
@@ -671,6 +1007,7 @@ def main():
         traceback.print_exc()
     
     finally:
+        profiler.finish()
         print("\n" + "=" * 60)
 
 if __name__ == "__main__":
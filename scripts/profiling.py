@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+分阶段性能剖析
+
+本模块为 mps.py / mps_gurobi.py / qps.py / ampl.py 提供 --profile 模式。
+主要功能:
+- 用 span(名称) 包裹每个处理阶段 (文件查找、读取/解析、模式分析、建模、求解、解提取、各报告章节、写文件)
+- 对选定阶段可选地运行 cProfile 和 tracemalloc
+- 输出 Chrome trace-event 格式的JSON (可在 chrome://tracing 或 Perfetto 中打开)
+- 生成附加到LaTeX报告末尾的阶段耗时汇总表
+
+详细中文注释:
+未启用 --profile 时各脚本使用 NULL_PROFILER，其 span() 只返回一个空的上下文管理器，
+几乎没有额外开销。启用后每个阶段记录为一个 "X" (complete) 事件，嵌套关系由
+时间区间自然体现。--profile-phases 指定的阶段 (按名称前缀匹配，如 report 匹配
+report.objective) 会额外记录 cProfile 统计 (前10个最耗时函数写入事件参数，完整
+统计另存为 .prof 文件) 和 tracemalloc 内存峰值。
+"""
+import contextlib
+import datetime
+import json
+import os
+import sys
+import threading
+import time
+
+DEFAULT_TRACE_DIR = "profile_traces"
+
+
+class Profiler:
+    """
+    阶段计时器
+
+    参数:
+    name - 剖析对象名称 (通常为实例文件名)，用于输出文件命名
+    detail_phases - 需要运行 cProfile/tracemalloc 的阶段名称前缀
+    output_dir - trace 文件输出目录
+    """
+
+    enabled = True
+
+    def __init__(self, name=None, detail_phases=(), output_dir=DEFAULT_TRACE_DIR):
+        self.name = name
+        self.detail_phases = tuple(detail_phases)
+        self.output_dir = output_dir
+        self.events = []
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        self._detail_active = False
+
+    def _wants_detail(self, name):
+        return any(name == p or name.startswith(p + ".") for p in self.detail_phases)
+
+    @contextlib.contextmanager
+    def span(self, name, **args):
+        """记录一个阶段；嵌套的阶段中只有最外层的选定阶段运行 cProfile"""
+        token = self.begin(name, **args)
+        try:
+            yield
+        finally:
+            self.end(token)
+
+    def begin(self, name, **args):
+        """
+        开始一个阶段，返回传给 end() 的标记
+
+        用于无法方便地用 with 包裹的长代码段；begin/end 之间抛出异常时该阶段不会被记录。
+        """
+        token = {'name': name, 'args': dict(args), 'profile': None}
+        if not self._detail_active and self._wants_detail(name):
+            # cProfile/tracemalloc 仅在需要时导入，避免拖慢脚本启动
+            import cProfile
+            import tracemalloc
+            self._detail_active = True
+            token['started_tracing'] = not tracemalloc.is_tracing()
+            if token['started_tracing']:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            token['memory_base'] = tracemalloc.get_traced_memory()[0]
+            token['profile'] = cProfile.Profile()
+            token['profile'].enable()
+        token['start'] = time.perf_counter()
+        return token
+
+    def end(self, token):
+        """结束 begin() 开始的阶段并记录事件"""
+        end = time.perf_counter()
+        name = token['name']
+        event_args = token['args']
+        profile = token['profile']
+        if profile is not None:
+            import tracemalloc
+            profile.disable()
+            event_args['peak_kb'] = round((tracemalloc.get_traced_memory()[1] - token['memory_base']) / 1024.0, 1)
+            if token['started_tracing']:
+                tracemalloc.stop()
+            event_args['top_functions'] = self._top_functions(profile)
+            event_args['pstats_file'] = self._dump_pstats(profile, name)
+            self._detail_active = False
+        self.events.append({
+            'name': name,
+            'cat': name.split(".")[0],
+            'ph': 'X',
+            'ts': round((token['start'] - self.origin) * 1e6, 1),
+            'dur': round((end - token['start']) * 1e6, 1),
+            'pid': self.pid,
+            'tid': threading.get_ident(),
+            'args': event_args,
+        })
+
+    def _top_functions(self, profile, limit=10):
+        import pstats
+        stats = pstats.Stats(profile)
+        entries = []
+        for (filename, line, func), (_, ncalls, _, cumtime, _) in stats.stats.items():
+            entries.append((cumtime, f"{os.path.basename(filename)}:{line}({func})", ncalls))
+        entries.sort(reverse=True)
+        return [{'function': label, 'calls': ncalls, 'cumtime': round(cumtime, 6)}
+                for cumtime, label, ncalls in entries[:limit]]
+
+    def _dump_pstats(self, profile, phase):
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"{self.name or 'run'}_{phase}_{self.pid}.prof")
+        try:
+            profile.dump_stats(path)
+        except OSError:
+            return None
+        return path
+
+    def summary(self):
+        """按阶段名汇总: [(名称, 次数, 总耗时秒)]，按首次出现的顺序"""
+        totals = {}
+        for event in sorted(self.events, key=lambda e: e['ts']):
+            count, total = totals.get(event['name'], (0, 0.0))
+            totals[event['name']] = (count + 1, total + event['dur'] / 1e6)
+        return [(name, count, total) for name, (count, total) in totals.items()]
+
+    def to_latex(self):
+        """生成阶段耗时汇总表 (只包含调用时已经结束的阶段)"""
+        rows = self.summary()
+        if not rows:
+            return ""
+        wall = max(e['ts'] + e['dur'] for e in self.events) / 1e6
+        latex = "\\section{性能剖析}\n\n"
+        latex += "各处理阶段的耗时如下 (嵌套阶段的时间包含在上级阶段中)。\n\n"
+        latex += "\\begin{longtable}{lrrr}\n\\toprule\n"
+        latex += "\\textbf{阶段} & \\textbf{次数} & \\textbf{耗时 (秒)} & \\textbf{占比} \\\\\n\\midrule\n\\endhead\n"
+        for name, count, total in rows:
+            share = total / wall if wall > 0 else 0.0
+            indent = "\\quad " * name.count(".")
+            label = name.replace("_", "\\_")
+            latex += f"{indent}\\texttt{{{label}}} & {count} & {total:.4f} & {share * 100:.1f}\\% \\\\\n"
+        latex += "\\bottomrule\n\\caption{处理阶段耗时}\n\\end{longtable}\n\n"
+        return latex
+
+    def write_trace(self):
+        """写出 Chrome trace-event 格式的JSON，返回文件路径"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(self.output_dir, f"{self.name or 'run'}_profile_{timestamp}.json")
+        payload = {
+            'traceEvents': sorted(self.events, key=lambda e: e['ts']),
+            'displayTimeUnit': 'ms',
+            'otherData': {'instance': self.name, 'argv': sys.argv},
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False)
+        return path
+
+    def print_summary(self):
+        """在终端打印阶段耗时表"""
+        print(f"\n{'阶段':<32}{'次数':>6}{'耗时(秒)':>12}")
+        for name, count, total in self.summary():
+            print(f"{'  ' * name.count('.') + name:<32}{count:>6}{total:>12.4f}")
+
+    def finish(self):
+        """打印汇总并写出 trace 文件"""
+        if not self.events:
+            return None
+        self.print_summary()
+        path = self.write_trace()
+        print(f"性能剖析 trace 已保存: {path}")
+        return path
+
+
+class _NullProfiler:
+    """未启用剖析时使用的空实现 (各脚本共享同一个实例，因此忽略对 name 的赋值)"""
+
+    enabled = False
+
+    @property
+    def name(self):
+        return None
+
+    @name.setter
+    def name(self, value):
+        pass
+
+    def span(self, name, **args):
+        return contextlib.nullcontext()
+
+    def begin(self, name, **args):
+        return None
+
+    def end(self, token):
+        pass
+
+    def to_latex(self):
+        return ""
+
+    def finish(self):
+        return None
+
+
+NULL_PROFILER = _NullProfiler()
+
+
+def from_argv(argv=None):
+    """
+    从命令行参数中取出剖析相关的选项 (原地删除)，返回 Profiler 或 NULL_PROFILER
+
+    支持的参数:
+    --profile                       启用阶段计时
+    --profile-phases read,solve     对这些阶段额外运行 cProfile 和 tracemalloc (隐含 --profile)
+    """
+    argv = sys.argv if argv is None else argv
+    enabled = False
+    detail = ()
+    if '--profile-phases' in argv:
+        index = argv.index('--profile-phases')
+        detail = tuple(p for p in argv[index + 1].split(",") if p)
+        del argv[index:index + 2]
+        enabled = True
+    if '--profile' in argv:
+        argv.remove('--profile')
+        enabled = True
+    return Profiler(detail_phases=detail) if enabled else NULL_PROFILER
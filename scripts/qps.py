@@ -17,11 +17,24 @@ import os
 import datetime
 import sys
 from pathlib import Path
-import coptpy as cp
-from coptpy import COPT
-import numpy as np
 from collections import defaultdict
 import re
+import profiling
+import solver_log
+import solver_params
+
+# coptpy 在第一次创建求解器时才导入 (见 _load_copt)，仅解析QPS文件时无需加载求解器库
+cp = None
+COPT = None
+
+def _load_copt():
+    """导入 coptpy 并设置模块级的 cp / COPT"""
+    global cp, COPT
+    if cp is None:
+        import coptpy
+        cp = coptpy
+        COPT = coptpy.COPT
+    return cp
 
 class QPSParser:
     """
@@ -215,29 +228,91 @@ class QPSParser:
 class QPSSolver:
     """QPS文件COPT求解器与LaTeX报告生成器"""
     
-    def __init__(self, qps_filepath):
+    def __init__(self, qps_filepath, profiler=None, force_solve=False, env=None, params=None):
+        _load_copt()
         self.qps_filepath = qps_filepath
         self.parser = QPSParser(qps_filepath)
-        self.env = None
+        self.profiler = profiler or profiling.NULL_PROFILER  # 性能剖析器 (--profile 模式)
+        self.env = env  # 求解守护进程传入预热好的环境时复用它，销毁时不关闭
+        self._owns_env = env is None
         self.model = None
         self.variables = {}
+        self.var_names = {}  # 所有变量名 (解析后收集，缓存命中时不构建模型也能生成报告)
         self.solve_status = None
         self.objective_value = None
         self.solution = {}
         self.solve_time = 0
         self.log_filepath = None
+        self.log = solver_log.NULL_LOG  # 脚本事件日志 (后台线程成批写入)
         self.var_prefix_counts = {}  # 存储每个变量前缀的计数信息
+        self.force_solve = force_solve  # 忽略求解结果缓存，重新求解
+        # 求解参数 (同时参与求解结果缓存键的计算)
+        self.solver_params = {"LpMethod": 2, "FeasTol": 1e-9, "OptTol": 1e-9}
+        self.solver_params.update(params or {})
+        self.cache_key = None
+        self.from_cache = False
         
+    def _load_cached_result(self):
+        """查询求解结果缓存，命中时恢复求解状态、目标值和解，返回是否命中"""
+        import result_cache
+        try:
+            with self.profiler.span("cache_lookup"):
+                self.cache_key = result_cache.lookup_key(self.qps_filepath, "copt", "coptpy", self.solver_params)
+                cached = None if self.force_solve else result_cache.ResultCache().get(self.cache_key)
+        except OSError as e:
+            print(f"读取求解结果缓存失败: {e}")
+            return False
+        if cached is None:
+            return False
+        self.solve_status = cached['status']
+        self.objective_value = cached['objective']
+        self.solution = cached['solution']
+        self.solve_time = cached['stats'].get('solve_time', 0)
+        self.from_cache = True
+        self.log_filepath = None  # 未调用求解器，不产生求解日志
+        print(f"使用缓存的求解结果 (缓存时间 {cached['created']}, 原求解耗时 {self.solve_time:.3f} 秒)，"
+              f"如需重新求解请加 --force-solve")
+        return True
+
+    def _store_result(self):
+        """
+        将求解结果写入缓存
+
+        只缓存确定的结论 (最优、不可行、无界)；达到时间限制、数值问题或被中断的结果不缓存，
+        否则以后同样参数的求解会一直得到缓存中的未完成结果。
+        """
+        import result_cache
+        if self.cache_key is None or self.solve_status not in (COPT.OPTIMAL, COPT.INFEASIBLE, COPT.UNBOUNDED,
+                                                                COPT.INF_OR_UNB):
+            return
+        stats = result_cache.collect_attrs(self.model, ("SimplexIter", "BarrierIter"))
+        stats['solve_time'] = self.solve_time
+        try:
+            result_cache.ResultCache().put(self.cache_key, {
+                'instance': self.qps_filepath,
+                'solver': "copt",
+                'params': self.solver_params,
+                'status': self.solve_status,
+                'objective': self.objective_value,
+                'bound': None,
+                'solution': self.solution,
+                'stats': stats,
+            })
+        except OSError as e:
+            print(f"写入求解结果缓存失败: {e}")
+
+    def _collect_variable_names(self):
+        """收集所有变量名 (列和二次项中出现的变量，按首次出现的顺序)，保存到 self.var_names"""
+        all_vars = dict.fromkeys(self.parser.cols)
+        for var1, var2 in self.parser.quadobj.keys():
+            all_vars[var1] = None
+            all_vars[var2] = None
+        self.var_names = all_vars
+        return all_vars
+
     def _analyze_variable_patterns(self):
         """分析变量模式，确定每个前缀的变量数量和所需的零填充位数"""
-        all_vars = set()
-        
-        # 收集所有变量
-        for col_name in self.parser.cols.keys():
-            all_vars.add(col_name)
-        for var1, var2 in self.parser.quadobj.keys():
-            all_vars.add(var1)
-            all_vars.add(var2)
+        all_vars = self._collect_variable_names()
         
         prefix_max_numbers = defaultdict(int)
         
@@ -369,11 +444,17 @@ class QPSSolver:
         """一键求解：解析 -> 构建 -> 求解"""
         try:
             # 解析QPS文件
-            self.parser.parse()
+            with self.profiler.span("parse"):
+                self.parser.parse()
             
             # 分析变量模式，为智能格式化做准备
             print("分析变量命名模式...")
-            self._analyze_variable_patterns()
+            with self.profiler.span("analyze_patterns"):
+                self._analyze_variable_patterns()
+            
+            # 相同实例、求解器版本和参数已经求解过时直接使用缓存结果，命中时不创建环境、不构建模型
+            if self._load_cached_result():
+                return self.solve_status == COPT.OPTIMAL
             
             # 设置日志文件
             log_dir = "copt_logs"
@@ -381,45 +462,56 @@ class QPSSolver:
             base_name = os.path.splitext(os.path.basename(self.qps_filepath))[0]
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
             self.log_filepath = os.path.join(log_dir, f"{base_name}_qps_log_{timestamp}.log")
+            # 脚本自身的事件 (参数、状态、错误) 写入单独的文件，求解器日志由求解器写入 log_filepath
+            self.log.close()
+            self.log = solver_log.open_log(os.path.join(log_dir, f"{base_name}_events_{timestamp}.log"))
+            self.log.info("实例: %s, 求解参数: %s", self.qps_filepath, self.solver_params)
             
             # 构建COPT模型
             print("构建COPT模型...")
-            self.env = cp.Envr()
-            self.model = self.env.createModel("QPS_Model")
+            with self.profiler.span("env"):
+                if self.env is None:
+                    self.env = cp.Envr()
+                self.model = self.env.createModel("QPS_Model")
             
             # 设置日志
             self.model.setLogFile(self.log_filepath)
             
             # 分步骤构建
-            self._create_variables()
-            self._set_objective()
-            self._add_constraints()
+            with self.profiler.span("build"):
+                with self.profiler.span("build.variables"):
+                    self._create_variables()
+                with self.profiler.span("build.objective"):
+                    self._set_objective()
+                with self.profiler.span("build.constraints"):
+                    self._add_constraints()
             
             print("开始求解...")
             
             # 设置求解参数
-            try:
-                self.model.setParam("LpMethod", 2)
-                self.model.setParam("FeasTol", 1e-9)
-                self.model.setParam("OptTol", 1e-9)
-            except Exception:
-                pass
+            solver_params.apply(self.model, self.solver_params)
             
             # 记录求解时间
             import time
             start_time = time.time()
             
             # 求解
-            self.model.solve()
+            with self.profiler.span("solve"):
+                self.model.solve()
             
             self.solve_time = time.time() - start_time
             self.solve_status = self.model.Status
+            self.log.info("求解结束: 状态码 %s, 耗时 %.3f 秒", self.solve_status, self.solve_time)
             
             # 提取结果
             if self.solve_status == COPT.OPTIMAL:
                 self.objective_value = self.model.ObjVal
-                for var_name, var in self.variables.items():
-                    self.solution[var_name] = var.X
+                with self.profiler.span("extract_solution"):
+                    for var_name, var in self.variables.items():
+                        self.solution[var_name] = var.X
+                    if self.log.debug_enabled:
+                        for name, value in self.solution.items():
+                            self.log.debug("%s = %.12g", name, value)
                 
                 print(f"求解成功！")
                 print(f"最优目标值: {self.objective_value:.12g}")
@@ -428,6 +520,7 @@ class QPSSolver:
                 nonzero_vars = {k: v for k, v in self.solution.items() if abs(v) > 1e-12}
                 print(f"非零变量: {len(nonzero_vars)}/{len(self.solution)}")
                 
+                self._store_result()
                 return True
             else:
                 status_map = {
@@ -437,24 +530,21 @@ class QPSSolver:
                 }
                 status_text = status_map.get(self.solve_status, f"状态码: {self.solve_status}")
                 print(f"求解失败: {status_text}")
+                self._store_result()
                 return False
                 
         except Exception as e:
             print(f"求解过程发生错误: {e}")
+            self.log.error("求解过程发生错误: %s", e)
             import traceback
             traceback.print_exc()
             return False
+        finally:
+            self.log.flush()
         
     def _create_variables(self):
         """创建变量"""
-        all_vars = set()
-        
-        # 收集所有变量
-        for col_name in self.parser.cols.keys():
-            all_vars.add(col_name)
-        for var1, var2 in self.parser.quadobj.keys():
-            all_vars.add(var1)
-            all_vars.add(var2)
+        all_vars = self.var_names or self._collect_variable_names()
         
         # 使用智能排序创建COPT变量
         for var_name in sorted(all_vars, key=self._get_variable_sort_key):
@@ -795,7 +885,7 @@ class QPSSolver:
         """总结变量边界信息"""
         bounds_summary = {}
         
-        for var_name in self.variables.keys():
+        for var_name in self.var_names:
             lb, ub = self.parser.bounds.get(var_name, (0.0, float('inf')))
             
             if lb == 0 and ub == float('inf'):
@@ -820,6 +910,8 @@ class QPSSolver:
         
         analysis = ""
         
+        import numpy as np
+        
         # 变量值统计
         values = list(self.solution.values())
         nonzero_values = [v for v in values if abs(v) > 1e-12]
@@ -846,7 +938,7 @@ class QPSSolver:
         model_name = os.path.splitext(os.path.basename(self.qps_filepath))[0]
         
         # 统计信息
-        num_vars = len(self.variables)
+        num_vars = len(self.var_names)
         num_constraints = len([r for r in self.parser.rows.values() if r[0] != 'N'])
         num_quadratic = len(self.parser.quadobj)
         
@@ -924,20 +1016,22 @@ class QPSSolver:
 """
         
         # 添加详细的数学模型
-        latex_content += self._build_mathematical_model_latex()
+        with self.profiler.span("report.model"):
+            latex_content += self._build_mathematical_model_latex()
         
         # 求解结果
         latex_content += "\\section{求解结果}\n\n"
         
         if self.solve_status == COPT.OPTIMAL:
             nonzero_solution = {k: v for k, v in self.solution.items() if abs(v) > 1e-12}
-            solution_stats = self._analyze_solution()
+            with self.profiler.span("report.analysis"):
+                solution_stats = self._analyze_solution()
             
             latex_content += f"""\\subsection{{最优解}}
 \\begin{{itemize}}
 \\item \\textbf{{求解状态:}} \\textcolor{{green}}{{最优解}}
 \\item \\textbf{{目标函数值:}} ${self.objective_value:.12g}$
-\\item \\textbf{{求解时间:}} {self.solve_time:.3f} 秒
+\\item \\textbf{{求解时间:}} {self.solve_time:.3f} 秒{" (取自求解结果缓存)" if self.from_cache else ""}
 \\item \\textbf{{非零变量:}} {len(nonzero_solution)}/{len(self.solution)}
 \\end{{itemize}}
 
@@ -962,21 +1056,22 @@ class QPSSolver:
 """
             
             # 显示所有非零变量 - 使用智能排序
-            sorted_vars = sorted(nonzero_solution.items(), key=lambda x: self._get_variable_sort_key(x[0]))
-            for var_name, value in sorted_vars:
-                lb, ub = self.parser.bounds.get(var_name, (0.0, float('inf')))
-                
-                # 处理变量名下标
-                var_display = self._parse_variable_name(var_name)
-                
-                # 格式化数值显示
-                if abs(value) >= 1e-3:
-                    value_str = f"{value:.6f}"
-                else:
-                    value_str = f"{value:.3e}"
-                
-                bound_str = f"[{lb:.3g}, {ub:.3g}]" if ub != float('inf') else f"[{lb:.3g}, ∞)"
-                latex_content += f"${var_display}$ & {value_str} & {bound_str} \\\\\n"
+            with self.profiler.span("report.solution"):
+                sorted_vars = sorted(nonzero_solution.items(), key=lambda x: self._get_variable_sort_key(x[0]))
+                for var_name, value in sorted_vars:
+                    lb, ub = self.parser.bounds.get(var_name, (0.0, float('inf')))
+                    
+                    # 处理变量名下标
+                    var_display = self._parse_variable_name(var_name)
+                    
+                    # 格式化数值显示
+                    if abs(value) >= 1e-3:
+                        value_str = f"{value:.6f}"
+                    else:
+                        value_str = f"{value:.3e}"
+                    
+                    bound_str = f"[{lb:.3g}, {ub:.3g}]" if ub != float('inf') else f"[{lb:.3g}, ∞)"
+                    latex_content += f"${var_display}$ & {value_str} & {bound_str} \\\\\n"
             
             latex_content += """\\bottomrule
 \\caption{所有非零变量值（按变量名排序）}
@@ -992,18 +1087,43 @@ class QPSSolver:
             latex_content += f"求解状态: \\textbf{{{status_text}}}\n\n"
             latex_content += "未能获得可行解。\n\n"
         
+        latex_content += solver_params.to_latex(self.solver_params)
+        latex_content += self.profiler.to_latex()
         latex_content += "\\end{document}"
         
-        with open(output_filepath, 'w', encoding='utf-8') as f:
-            f.write(latex_content)
+        with self.profiler.span("write"):
+            with open(output_filepath, 'w', encoding='utf-8') as f:
+                f.write(latex_content)
         
         print(f"已生成求解报告: {output_filepath}")
         return output_filepath
     
+    def export_solution(self, formats=None, output_dir=None):
+        """
+        把解导出为机器可读格式 (.sol、非零取值 CSV、.solbin，见 solution_export.py)
+
+        参数:
+        formats - 格式列表，默认全部格式
+        output_dir - 输出目录，默认 solution_exports/
+
+        返回:
+        写出的文件路径列表，没有解时为空列表
+        """
+        if not self.solution:
+            print("没有可导出的解。")
+            return []
+        import solution_export
+        formats = solution_export.FORMATS if formats is None else formats
+        output_dir = solution_export.DEFAULT_DIR if output_dir is None else output_dir
+        base_name = os.path.splitext(os.path.basename(self.qps_filepath))[0]
+        return solution_export.export(self.solution, os.path.join(output_dir, f"{base_name}_QPS"), formats,
+                                      objective=self.objective_value)
+
     def __del__(self):
         """清理COPT环境资源"""
         try:
-            if hasattr(self, 'env') and self.env:
+            self.log.close()
+            if hasattr(self, 'env') and self.env and self._owns_env:
                 self.env.close()
         except Exception:
             pass
@@ -1020,8 +1140,15 @@ def find_qps_file(filename_input):
         os.path.join("qps", f"{base_name}.txt"),
     ]
     
+    if os.path.isfile(filename_input):
+        return filename_input
+    # 优先查询实例目录；.txt 格式的QPS文件不在目录中，由下面的路径探测处理
+    import catalog
+    path = catalog.find_instance(filename_input, ("qps", "mps"))
+    if path is not None:
+        return path
     for path in possible_paths:
-        if path and os.path.exists(path):
+        if path and os.path.isfile(path):
             return path
     return None
 
@@ -1032,6 +1159,22 @@ def main():
     print("支持智能变量格式化和排序")
     print("=" * 60)
     
+    import result_cache
+    import solution_export
+    profiler = profiling.from_argv()
+    force_solve = result_cache.from_argv()
+    try:
+        solver_log.from_argv()
+        export_formats = solution_export.from_argv()
+    except ValueError as e:
+        print(f"错误: {e}")
+        return
+    try:
+        param_profile, param_overrides = solver_params.from_argv()
+        params = solver_params.resolve("copt", param_profile, param_overrides)
+    except (ValueError, OSError) as e:
+        print(f"求解参数错误: {e}")
+        return
     try:
         # 检查命令行参数
         if len(sys.argv) > 1:
@@ -1048,19 +1191,32 @@ def main():
                 print("输入被中断，程序退出。")
                 return
         
-        actual_filepath = find_qps_file(filename_input)
+        with profiler.span("discover"):
+            actual_filepath = find_qps_file(filename_input)
         
         if actual_filepath is None:
             print(f"文件 '{filename_input}' 未找到。请检查文件名和路径。")
+            import catalog
+            suggestions = catalog.suggest_instances(filename_input, ("qps",))
+            if suggestions:
+                print("您是否要找: " + ", ".join(suggestions))
             return
         
         print(f"找到文件: {actual_filepath}")
         
-        solver = QPSSolver(actual_filepath)
+        profiler.name = os.path.splitext(os.path.basename(actual_filepath))[0]
+        solver = QPSSolver(actual_filepath, profiler=profiler, force_solve=force_solve, params=params)
         success = solver.solve_model()
         
         print("正在生成LaTeX报告...")
-        report_path = solver.generate_latex_report()
+        with profiler.span("report"):
+            report_path = solver.generate_latex_report()
+
+        if export_formats:
+            with profiler.span("export"):
+                export_paths = solver.export_solution(export_formats)
+            for path in export_paths:
+                print(f"解文件: {os.path.abspath(path)}")
         
         if report_path:
             print("任务完成!")
@@ -1082,6 +1238,7 @@ def main():
         traceback.print_exc()
     
     finally:
+        profiler.finish()
         print("\n" + "=" * 60)
 
 if __name__ == "__main__":
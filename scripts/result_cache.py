@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按内容寻址的求解结果缓存
+
+本模块让 mps.py / mps_gurobi.py / qps.py 在重复运行同一实例 (例如只为重新生成报告) 时
+直接读取上一次的求解结果，而不是重新求解。
+主要功能:
+- 缓存键 = 实例文件内容哈希 + 求解器 + 求解器版本 + 生效的求解参数
+- 缓存内容: 求解状态、目标值、最优界、解向量和求解统计 (时间、节点数、迭代数)
+- 原子写入 (临时文件 + os.replace)，并行批处理的多个进程可以同时读写
+- 按总大小的LRU淘汰 (命中时更新文件修改时间)
+- --force-solve 跳过缓存读取，重新求解并覆盖缓存
+
+详细中文注释:
+每个结果保存为 cache/solve_results/<键前两位>/<键>.json.gz。读取不需要加锁，因为
+文件只会被完整地替换；淘汰操作在 .lock 文件上加排他锁 (fcntl.flock)，避免多个进程
+同时删除。实例的内容哈希优先取自实例目录 (catalog.py)，文件大小和修改时间与目录
+记录一致时无需重新读取文件。
+"""
+import contextlib
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import sys
+import tempfile
+
+try:
+    import fcntl
+except ImportError:  # Windows: 不加锁，淘汰时的竞争只会导致重复删除
+    fcntl = None
+
+DEFAULT_CACHE_DIR = os.path.join("cache", "solve_results")
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+FORMAT_VERSION = 1
+
+
+def file_hash(path):
+    """
+    返回实例文件内容的 SHA-256
+
+    优先使用实例目录中的记录 (大小和修改时间一致时)，否则直接读取文件计算。
+    """
+    try:
+        import catalog
+        stat = os.stat(path)
+        db = catalog.InstanceCatalog()
+        try:
+            entry = db.entry(path)
+        finally:
+            db.close()
+        if entry and (entry['size'], entry['mtime']) == (stat.st_size, stat.st_mtime) and entry['content_hash']:
+            return entry['content_hash']
+    except Exception:
+        pass
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def solver_version(package):
+    """返回求解器Python包的版本号，无法确定时返回 "unknown" """
+    module = sys.modules.get(package)
+    if module is not None and getattr(module, 'STUB', False):
+        return "stub"
+    try:
+        from importlib import metadata
+        return metadata.version(package)
+    except Exception:
+        return "unknown"
+
+
+def make_key(content_hash, solver, version, params=None):
+    """由实例内容哈希、求解器、版本和参数生成缓存键 (参数顺序无关)"""
+    payload = json.dumps({
+        'format': FORMAT_VERSION,
+        'instance': content_hash,
+        'solver': solver,
+        'version': version,
+        'params': {str(k): v for k, v in (params or {}).items()},
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def collect_attrs(model, names):
+    """读取模型属性，不存在或不可用的属性跳过 (例如LP模型没有节点数)"""
+    values = {}
+    for name in names:
+        try:
+            value = getattr(model, name)
+        except Exception:
+            continue
+        if isinstance(value, (int, float)):
+            values[name] = value
+    return values
+
+
+class ResultCache:
+    """
+    求解结果缓存
+
+    参数:
+    cache_dir - 缓存目录
+    max_bytes - 缓存总大小上限，超过后按最近使用时间淘汰
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json.gz")
+
+    @contextlib.contextmanager
+    def _lock(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(os.path.join(self.cache_dir, ".lock"), 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get(self, key):
+        """读取缓存结果 (dict)，未命中或文件损坏时返回 None"""
+        path = self._path(key)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                result = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, ValueError):
+            # 损坏的缓存文件 (例如磁盘写满) 当作未命中并删除
+            with contextlib.suppress(OSError):
+                os.remove(path)
+            return None
+        if result.get('format') != FORMAT_VERSION:
+            return None
+        with contextlib.suppress(OSError):
+            os.utime(path)  # LRU: 命中即视为最近使用
+        return result
+
+    def put(self, key, result):
+        """
+        原子地写入缓存结果，然后按需淘汰
+
+        返回:
+        缓存文件路径
+        """
+        path = self._path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        record = dict(result, format=FORMAT_VERSION, key=key,
+                      created=datetime.datetime.now().isoformat(timespec='seconds'))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=5) as f:
+                f.write(json.dumps(record, ensure_ascii=False).encode('utf-8'))
+            os.replace(tmp_path, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+        return path
+
+    def entries(self):
+        """[(路径, 大小, 最近使用时间)]"""
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".json.gz"):
+                    with contextlib.suppress(OSError):
+                        stat = entry.stat()
+                        entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def evict(self, max_bytes=None):
+        """淘汰最久未使用的结果，直到总大小不超过上限，返回删除的文件数"""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        with self._lock():
+            entries = self.entries()
+            total = sum(size for _, size, _ in entries)
+            removed = 0
+            for path, size, _ in sorted(entries, key=lambda e: e[2]):
+                if total <= max_bytes:
+                    break
+                with contextlib.suppress(OSError):
+                    os.remove(path)
+                    removed += 1
+                total -= size
+        return removed
+
+
+def lookup_key(instance_path, solver, package, params=None, content_hash=None):
+    """计算某个实例的缓存键 (已知实例文件的哈希时通过 content_hash 传入，避免重新读取文件)"""
+    return make_key(content_hash or file_hash(instance_path), solver, solver_version(package), params)
+
+
+def from_argv(argv=None):
+    """从命令行参数中取出 --force-solve (原地删除)，返回是否强制重新求解"""
+    argv = sys.argv if argv is None else argv
+    if '--force-solve' in argv:
+        argv.remove('--force-solve')
+        return True
+    return False
+
+
+def main():
+    """
+    查看或清理求解结果缓存
+
+    用法:
+    python result_cache.py                 # 显示缓存文件数和总大小
+    python result_cache.py --max-mb 500    # 按LRU淘汰到 500 MB 以下
+    python result_cache.py --clear         # 清空缓存
+    """
+    args = sys.argv[1:]
+    cache = ResultCache()
+    if '--clear' in args:
+        removed = cache.evict(max_bytes=0)
+        print(f"已删除 {removed} 个缓存结果")
+        return
+    if '--max-mb' in args:
+        max_mb = float(args[args.index('--max-mb') + 1])
+        removed = cache.evict(max_bytes=int(max_mb * 1024 ** 2))
+        print(f"已淘汰 {removed} 个缓存结果")
+    entries = cache.entries()
+    total = sum(size for _, size, _ in entries)
+    print(f"求解结果缓存: {cache.cache_dir}, {len(entries)} 个结果, {total / 1024 ** 2:.1f} MB "
+          f"(上限 {cache.max_bytes / 1024 ** 2:.0f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+求解结果数据库
+
+本模块提供所有脚本共享的求解结果存储 (SQLite)，默认位置为 results/results.db。
+主要内容:
+- log_files: 已摄取的求解日志文件及其读取偏移量，用于增量摄取 (以设备号+inode 和内容指纹识别，见 log_ingest.py)
+- solve_stats: 从求解日志中提取的统计信息 (预处理缩减、根节点LP时间、节点吞吐量、割平面、最终结果等)，
+  每个日志一行 (log_id 对应 log_files.id)
+
+详细中文注释:
+使用标准库 sqlite3 实现，无需额外依赖。数据库以 WAL 模式打开，
+允许多个批处理进程同时读取，写入时由 SQLite 自身的锁机制保证一致性。
+可以直接使用 sqlite3 命令行或任意SQL工具查询这些表。
+旧版本的数据库按路径记录日志文件，打开时把两张表迁移为当前结构 (保留全部数据，见 _migrate)。
+"""
+import os
+import sqlite3
+
+DEFAULT_DB_PATH = os.path.join("results", "results.db")
+
+# 从日志中提取的统计字段及其SQL类型
+STAT_COLUMNS = {
+    'solver': 'TEXT',
+    'instance': 'TEXT',
+    'run_timestamp': 'TEXT',
+    'solver_version': 'TEXT',
+    'orig_rows': 'INTEGER',
+    'orig_cols': 'INTEGER',
+    'orig_nonzeros': 'INTEGER',
+    'presolved_rows': 'INTEGER',
+    'presolved_cols': 'INTEGER',
+    'presolved_nonzeros': 'INTEGER',
+    'presolve_rows_removed': 'INTEGER',
+    'presolve_cols_removed': 'INTEGER',
+    'presolve_time': 'REAL',
+    'root_lp_time': 'REAL',
+    'root_lp_objective': 'REAL',
+    'nodes': 'INTEGER',
+    'node_throughput': 'REAL',
+    'cuts': 'INTEGER',
+    'threads': 'INTEGER',
+    'solve_time': 'REAL',
+    'status': 'TEXT',
+    'objective': 'REAL',
+    'best_bound': 'REAL',
+    'gap': 'REAL',
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS log_files (
+    id INTEGER PRIMARY KEY,
+    path TEXT,
+    device INTEGER,
+    inode INTEGER,
+    fingerprint TEXT,
+    solver TEXT,
+    size INTEGER,
+    mtime REAL,
+    offset INTEGER,
+    state TEXT,
+    ingested_at TEXT
+);
+CREATE INDEX IF NOT EXISTS log_files_inode ON log_files(device, inode);
+CREATE INDEX IF NOT EXISTS log_files_fingerprint ON log_files(fingerprint);
+CREATE TABLE IF NOT EXISTS solve_stats (
+    log_id INTEGER PRIMARY KEY,
+    path TEXT,
+    {columns}
+);
+CREATE INDEX IF NOT EXISTS solve_stats_instance ON solve_stats(instance);
+"""
+
+
+def _migrate(conn, columns):
+    """
+    把旧版本 (log_files 以 path 为主键) 的两张表迁移为当前结构，保留全部已有数据
+
+    SQLite 不能修改主键，因此在一个事务中改名旧表、按当前结构建表并复制数据后删除旧表。
+    迁移来的记录 device/inode/fingerprint 为空，由 log_ingest.py 打开数据库时按路径补齐。
+    """
+    old_stats = {row['name'] for row in conn.execute("PRAGMA table_info(solve_stats)")}
+    names = ['path'] + [name for name in STAT_COLUMNS if name in old_stats]
+    rename_stats = ("ALTER TABLE solve_stats RENAME TO solve_stats_v1;\n"
+                    "DROP INDEX IF EXISTS solve_stats_instance;" if old_stats else "")
+    script = f"""
+BEGIN;
+ALTER TABLE log_files RENAME TO log_files_v1;
+{rename_stats}
+{_SCHEMA.format(columns=columns)}
+INSERT INTO log_files (path, solver, size, mtime, offset, state, ingested_at)
+    SELECT path, solver, size, mtime, offset, state, ingested_at FROM log_files_v1;
+DROP TABLE log_files_v1;
+"""
+    if old_stats:
+        script += f"""
+INSERT INTO log_files (path) SELECT path FROM solve_stats_v1 WHERE path NOT IN (SELECT path FROM log_files);
+INSERT INTO solve_stats (log_id, {", ".join(names)})
+    SELECT log_files.id, {", ".join(f"s.{name}" for name in names)}
+    FROM solve_stats_v1 AS s JOIN log_files ON log_files.path = s.path;
+DROP TABLE solve_stats_v1;
+"""
+    try:
+        conn.executescript(script + "COMMIT;")
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+
+
+def connect(db_path=DEFAULT_DB_PATH):
+    """
+    打开(必要时创建)结果数据库
+
+    参数:
+    db_path - 数据库文件路径
+
+    返回:
+    sqlite3.Connection 对象
+    """
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    columns = ",\n    ".join(f"{name} {sql_type}" for name, sql_type in STAT_COLUMNS.items())
+    existing = {row['name'] for row in conn.execute("PRAGMA table_info(log_files)")}
+    if existing and 'inode' not in existing:
+        _migrate(conn, columns)
+    conn.executescript(_SCHEMA.format(columns=columns))
+    return conn
+
+
+def save_stats(conn, log_id, path, stats):
+    """写入或更新一个日志 (log_files.id) 对应的统计信息 (未知字段将被忽略)，path 为日志文件当前的路径"""
+    names = ['path'] + [name for name in STAT_COLUMNS if name in stats]
+    placeholders = ", ".join("?" for _ in range(len(names) + 1))
+    updates = ", ".join(f"{name}=excluded.{name}" for name in names)
+    sql = (f"INSERT INTO solve_stats (log_id, {', '.join(names)}) VALUES ({placeholders}) "
+           f"ON CONFLICT(log_id) DO UPDATE SET {updates}")
+    conn.execute(sql, [log_id, path] + [stats[name] for name in names[1:]])
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+解的机器可读导出
+
+以前解只出现在LaTeX报告的长表格里，下游工具要用解只能解析 .tex 文件。本模块为
+mps.py / mps_gurobi.py / qps.py / ampl.py (以及 ampl_batch.py、ampl_sweep.py) 提供 --export:
+- sol: 文本解文件 (Gurobi/MIPLIB 格式: 注释行给出目标值，之后每行 "变量名 取值")，
+  COPT 和 Gurobi 都可以直接读入作为初始解
+- csv: 非零取值的 CSV (name,value)，绝对值不超过 NONZERO_TOL 的取值不写出
+- bin: 紧凑的二进制文件 (.solbin)，float64 取值数组可以直接内存映射，变量名单独成段
+
+详细中文注释:
+解按 CHUNK_SIZE 个变量一批流式写出，所有格式在同一遍遍历中写入，内存占用与变量数无关
+(二进制格式除外: 变量数在写入前已知，各段位置固定，同样不需要缓存)。每个文件先写到
+<路径>.tmp，全部成功后再改名，失败时不会留下不完整的文件。
+
+.solbin 格式 (小端):
+  0   头部 64 字节: 魔数 b"SOLBIN1\\0", 变量数 n, 取值偏移, 名称结束位置偏移, 名称偏移,
+      目标值 (float64，无目标值时为 NaN), 两个保留字段
+  64  取值: float64[n]
+      名称结束位置: uint64[n]，第 i 个名称是名称段中 [ends[i-1], ends[i]) 的 UTF-8 字节
+      名称段: 所有名称的 UTF-8 编码依次相连
+read_binary() 读回变量名列表，取值以 np.memmap 返回 (不读入内存)。
+"""
+import math
+import os
+import struct
+import sys
+from array import array
+from itertools import accumulate, chain, islice
+
+FORMATS = ('sol', 'csv', 'bin')
+DEFAULT_DIR = "solution_exports"
+CHUNK_SIZE = 65536      # 每批写出的变量数
+NONZERO_TOL = 1e-9      # CSV 只写出绝对值大于它的取值 (与报告中的非零判断一致)
+
+MAGIC = b"SOLBIN1\0"
+HEADER = struct.Struct("<8sQQQQdQQ")
+
+
+def _little_endian(values, typecode):
+    data = array(typecode, values)
+    if sys.byteorder != 'little':
+        data.byteswap()
+    return data
+
+
+class _Writer:
+    """一种导出格式: 先写到临时文件，finish() 时改名为正式文件"""
+
+    suffix = ""
+
+    def __init__(self, base_path, count, objective):
+        self.path = base_path + self.suffix
+        self.tmp_path = self.path + ".tmp"
+        self.count = count
+        self.objective = objective
+        self.file = self._open()
+
+    def _open(self):
+        return open(self.tmp_path, 'w', encoding='utf-8', newline='')
+
+    def write(self, names, values):
+        raise NotImplementedError
+
+    def finish(self):
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+class _SolWriter(_Writer):
+    suffix = ".sol"
+
+    def _open(self):
+        f = super()._open()
+        f.write("# Solution file\n")
+        if self.objective is not None:
+            f.write(f"# Objective value = {self.objective!r}\n")
+        return f
+
+    def write(self, names, values):
+        self.file.write("".join([f"{name} {value!r}\n" for name, value in zip(names, values)]))
+
+
+class _CsvWriter(_Writer):
+    suffix = "_nonzeros.csv"
+
+    def _open(self):
+        import csv
+        f = super()._open()
+        self.csv = csv.writer(f)
+        self.csv.writerow(("name", "value"))
+        return f
+
+    def write(self, names, values):
+        self.csv.writerows([(name, value) for name, value in zip(names, values) if abs(value) > NONZERO_TOL])
+
+
+class _BinaryWriter(_Writer):
+    suffix = ".solbin"
+
+    def _open(self):
+        f = open(self.tmp_path, 'wb')
+        self.values_pos = HEADER.size
+        self.ends_pos = self.values_pos + 8 * self.count
+        self.names_offset = self.names_pos = self.ends_pos + 8 * self.count
+        self.name_bytes = 0
+        objective = math.nan if self.objective is None else self.objective
+        f.write(HEADER.pack(MAGIC, self.count, self.values_pos, self.ends_pos, self.names_offset, objective, 0, 0))
+        return f
+
+    def write(self, names, values):
+        encoded = [name.encode('utf-8') for name in names]
+        blob = b"".join(encoded)
+        ends = _little_endian(accumulate((len(e) for e in encoded), initial=self.name_bytes), 'Q')[1:]
+        for position, data in ((self.values_pos, _little_endian(values, 'd').tobytes()),
+                               (self.ends_pos, ends.tobytes()), (self.names_pos, blob)):
+            self.file.seek(position)
+            self.file.write(data)
+        self.values_pos += 8 * len(names)
+        self.ends_pos += 8 * len(names)
+        self.names_pos += len(blob)
+        self.name_bytes += len(blob)
+
+
+WRITERS = {'sol': _SolWriter, 'csv': _CsvWriter, 'bin': _BinaryWriter}
+
+
+def export(solution, base_path, formats=FORMATS, objective=None):
+    """
+    把解流式写出为指定的格式
+
+    参数:
+    solution - {变量名: 取值}
+    base_path - 输出路径 (不含扩展名)，例如 solution_exports/22433_COPT
+    formats - 格式列表 (sol / csv / bin)
+    objective - 目标值，写入 .sol 的注释行和 .solbin 的头部
+
+    返回:
+    写出的文件路径列表
+    """
+    directory = os.path.dirname(base_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    writers = []
+    try:
+        for fmt in formats:
+            writers.append(WRITERS[fmt](base_path, len(solution), objective))
+        names_iter, values_iter = iter(solution), iter(solution.values())
+        while True:
+            names = list(islice(names_iter, CHUNK_SIZE))
+            if not names:
+                break
+            values = list(islice(values_iter, len(names)))
+            for writer in writers:
+                writer.write(names, values)
+    except BaseException:
+        for writer in writers:
+            writer.abort()
+        raise
+    for writer in writers:
+        writer.finish()
+    return [writer.path for writer in writers]
+
+
+def read_binary(path):
+    """
+    读取 .solbin 文件
+
+    返回:
+    (变量名列表, 取值数组, 目标值)；安装了 NumPy 时取值数组是只读的 np.memmap，否则为 array('d')，
+    文件没有目标值时目标值为 None
+    """
+    with open(path, 'rb') as f:
+        magic, count, values_offset, ends_offset, names_offset, objective, _, _ = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"不是 .solbin 文件: {path}")
+        f.seek(ends_offset)
+        ends = array('Q')
+        ends.fromfile(f, count)
+        if sys.byteorder != 'little':
+            ends.byteswap()
+        f.seek(names_offset)
+        blob = f.read(ends[-1] if count else 0)
+        try:
+            import numpy as np
+        except ImportError:
+            f.seek(values_offset)
+            values = array('d')
+            values.fromfile(f, count)
+            if sys.byteorder != 'little':
+                values.byteswap()
+        else:
+            values = (np.memmap(path, dtype='<f8', mode='r', offset=values_offset, shape=(count,)) if count
+                      else np.zeros(0))
+    names = [blob[start:end].decode('utf-8') for start, end in zip(chain((0,), ends[:-1]), ends)]
+    return names, values, None if math.isnan(objective) else objective
+
+
+def from_argv(argv=None):
+    """
+    从命令行参数中取出 --export (原地删除)，返回要导出的格式列表 (未指定时为空列表)
+
+    支持的参数:
+    --export sol,csv,bin   导出解 (all 表示全部格式)，写入 solution_exports/ 目录
+    """
+    argv = sys.argv if argv is None else argv
+    if '--export' not in argv:
+        return []
+    index = argv.index('--export')
+    value = argv[index + 1] if index + 1 < len(argv) else ""
+    del argv[index:index + 2]
+    formats = list(FORMATS) if value == "all" else [part.strip() for part in value.split(',') if part.strip()]
+    unknown = [fmt for fmt in formats if fmt not in WRITERS]
+    if not formats or unknown:
+        raise ValueError(f"--export 需要逗号分隔的格式 ({', '.join(FORMATS)} 或 all)，而不是 '{value}'")
+    return list(dict.fromkeys(formats))
@@ -0,0 +1,596 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+求解守护进程
+
+每次运行 mps.py / mps_gurobi.py / qps.py / ampl.py 都要重新创建求解器环境 (许可证检查、
+库初始化)，对大量小实例来说这部分开销占了大头。本守护进程常驻内存，为每种后端保留
+预热好的环境，通过本机 HTTP 接收求解任务。
+主要功能:
+- 后端: copt (MPS)、gurobi (MPS)、qps (COPT二次规划)、ampl
+- 有界工作线程池，环境在任务之间复用 (每个工作线程同一时刻独占一个环境)
+- JSON API: 提交、查询状态、获取结果、取消
+- 排队任务过多时拒绝新任务 (HTTP 503)
+
+详细中文注释:
+任务在工作线程中直接调用各脚本的求解器类，并通过 env= / ampl= 参数传入环境池中的
+环境，因此求解流程、结果缓存和报告与命令行运行完全一致。只监听 127.0.0.1。
+取消排队中的任务会直接将其移出队列；取消运行中但仍在读取/建模的任务时，任务在进入
+求解阶段前停止 (由传给求解器的 profiler 检查)；已经开始求解的任务调用求解器的中断接口
+(COPT interrupt / Gurobi terminate / AMPLSolver.kill)。AMPL 任务被取消时杀掉 AMPL 进程 (竞速时杀掉
+各求解器子进程，已得到的解仍会保留)，被杀掉的AMPL会话不再放回环境池。
+
+API:
+POST   /jobs              {"instance": "ran10x10", "backend": "copt", "report": true,
+                           "force_solve": false, "data": "ampl/x.dat", "solver": "auto", "solution": false,
+                           "param_profile": "fast-feasible", "params": {"time_limit": 60, "MIPFocus": 1}}
+GET    /jobs              所有任务的状态
+GET    /jobs/<id>         任务状态
+GET    /jobs/<id>/result  任务结果 (未完成时返回 409)
+DELETE /jobs/<id>         取消任务
+GET    /health            后端和环境池状态
+
+用法:
+python solve_daemon.py --port 8765 --workers 4 --warm copt,gurobi
+python solve_daemon.py submit ran10x10 --backend copt --wait
+python solve_daemon.py submit ran10x10 --backend gurobi --param-profile fast-feasible --time-limit 60
+python solve_daemon.py status <任务ID>
+python solve_daemon.py cancel <任务ID>
+"""
+import contextlib
+import datetime
+import json
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import solver_params
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_QUEUE = 100
+MAX_FINISHED_JOBS = 1000
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+
+# ---------------------------------------------------------------------------
+# 后端: 创建/关闭环境，运行一个任务
+# ---------------------------------------------------------------------------
+
+def _create_copt_env():
+    import mps
+    mps._load_copt()
+    return mps.cp.Envr()
+
+
+def _create_gurobi_env():
+    import mps_gurobi
+    mps_gurobi._load_gurobi()
+    return mps_gurobi.gp.Env()
+
+
+def _create_ampl():
+    from amplpy import AMPL
+    return AMPL()
+
+
+def _close_env(env):
+    for method in ("close", "dispose"):
+        if hasattr(env, method):
+            try:
+                getattr(env, method)()
+            except Exception:
+                pass
+            return
+
+
+def _env_alive(env):
+    """环境能否放回池中复用: AMPL 会话在 kill() 后进程已经退出 (没有 isRunning 的环境总是可以复用)"""
+    try:
+        return env.isRunning() if hasattr(env, 'isRunning') else True
+    except Exception:
+        return False
+
+
+def _interrupt_model(solver, method):
+    """调用求解器模型的中断接口 (模型可能尚未创建)"""
+    model = getattr(solver, 'model', None)
+    if model is not None and hasattr(model, method):
+        getattr(model, method)()
+
+
+class JobCancelled(BaseException):
+    """
+    运行中的任务在进入求解阶段前被取消时抛出
+
+    继承 BaseException，避免被各脚本 solve_model() 中的 except Exception 吞掉。
+    """
+
+
+class _CancelProfiler:
+    """进入求解阶段 (solve) 前检查任务是否已被取消的 profiler，接口与 profiling.NULL_PROFILER 相同"""
+
+    enabled = False
+    name = None
+
+    def __init__(self, job):
+        self.job = job
+
+    @contextlib.contextmanager
+    def span(self, name, **args):
+        self.begin(name, **args)
+        yield
+
+    def begin(self, name, **args):
+        if name == "solve" and self.job.cancel_requested:
+            raise JobCancelled(self.job.id)
+        return None
+
+    def end(self, token):
+        pass
+
+    def to_latex(self):
+        return ""
+
+    def finish(self):
+        return None
+
+
+def _run_copt(job, env):
+    import mps
+    path = mps.find_mps_file(job.request['instance'])
+    if path is None:
+        raise FileNotFoundError(f"未找到MPS文件: {job.request['instance']}")
+    solver = mps.MPSCOPTSolver(path, profiler=_CancelProfiler(job), force_solve=job.request.get('force_solve', False),
+                               env=env, params=job.params)
+    job.interrupt = lambda: _interrupt_model(solver, "interrupt")
+    solver.solve_model()
+    report = solver.extract_to_latex() if job.request.get('report', True) else None
+    return solver, path, report
+
+
+def _run_gurobi(job, env):
+    import mps_gurobi
+    path = mps_gurobi.find_mps_file(job.request['instance'])
+    if path is None:
+        raise FileNotFoundError(f"未找到MPS文件: {job.request['instance']}")
+    solver = mps_gurobi.MPSSolver(path, profiler=_CancelProfiler(job),
+                                  force_solve=job.request.get('force_solve', False), env=env, params=job.params)
+    job.interrupt = lambda: _interrupt_model(solver, "terminate")
+    solver.solve_model()
+    report = solver.extract_to_latex() if job.request.get('report', True) else None
+    return solver, path, report
+
+
+def _run_qps(job, env):
+    import qps
+    path = qps.find_qps_file(job.request['instance'])
+    if path is None:
+        raise FileNotFoundError(f"未找到QPS文件: {job.request['instance']}")
+    solver = qps.QPSSolver(path, profiler=_CancelProfiler(job), force_solve=job.request.get('force_solve', False),
+                           env=env, params=job.params)
+    job.interrupt = lambda: _interrupt_model(solver, "interrupt")
+    solver.solve_model()
+    report = solver.generate_latex_report() if job.request.get('report', True) else None
+    return solver, path, report
+
+
+def _run_ampl(job, ampl_env):
+    import ampl
+    mod_file, dat_file = ampl.find_ampl_files(job.request['instance'], job.request.get('data'))
+    if mod_file is None:
+        raise FileNotFoundError(f"未找到AMPL模型文件: {job.request['instance']}")
+    solver = ampl.AMPLSolver(mod_file, dat_file, ampl=ampl_env, profiler=_CancelProfiler(job), params=job.params)
+    job.interrupt = solver.kill
+    solver.solve_model(solver=job.request.get('solver', "auto"))
+    if job.cancel_requested and not _env_alive(ampl_env):
+        raise JobCancelled()  # AMPL 进程已被杀掉，没有可用的结果和报告
+    report = solver.generate_latex_report() if job.request.get('report', True) else None
+    return solver, mod_file, report
+
+
+# 后端名 -> (创建环境, 运行任务)
+BACKENDS = {
+    "copt": (_create_copt_env, _run_copt),
+    "gurobi": (_create_gurobi_env, _run_gurobi),
+    "qps": (_create_copt_env, _run_qps),
+    "ampl": (_create_ampl, _run_ampl),
+}
+
+# qps 与 copt 共用 COPT 环境
+_ENV_KIND = {"copt": "copt", "qps": "copt", "gurobi": "gurobi", "ampl": "ampl"}
+
+
+class EnvPool:
+    """
+    预热环境池
+
+    每种环境保留若干空闲实例；工作线程取出一个独占使用，任务结束后放回。
+    环境数量不超过工作线程数。创建失败 (例如没有许可证) 时异常传给任务。
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.idle = {}
+        self.created = {}
+
+    def acquire(self, backend):
+        kind = _ENV_KIND[backend]
+        with self.lock:
+            if self.idle.get(kind):
+                return self.idle[kind].pop()
+        env = BACKENDS[backend][0]()
+        with self.lock:
+            self.created[kind] = self.created.get(kind, 0) + 1
+        return env
+
+    def release(self, backend, env):
+        with self.lock:
+            self.idle.setdefault(_ENV_KIND[backend], []).append(env)
+
+    def discard(self, backend, env):
+        """环境在任务中出错后不再复用"""
+        _close_env(env)
+        with self.lock:
+            self.created[_ENV_KIND[backend]] -= 1
+
+    def warm(self, backends):
+        for backend in backends:
+            start = time.time()
+            env = self.acquire(backend)
+            self.release(backend, env)
+            print(f"已预热 {backend} 环境 (耗时 {time.time() - start:.2f} 秒)")
+
+    def status(self):
+        with self.lock:
+            return {kind: {'created': count, 'idle': len(self.idle.get(kind, []))}
+                    for kind, count in self.created.items()}
+
+    def close(self):
+        with self.lock:
+            for envs in self.idle.values():
+                for env in envs:
+                    _close_env(env)
+            self.idle.clear()
+
+
+# ---------------------------------------------------------------------------
+# 任务与调度
+# ---------------------------------------------------------------------------
+
+class Job:
+    """一个求解任务"""
+
+    def __init__(self, request):
+        self.id = uuid.uuid4().hex[:12]
+        self.request = request
+        self.backend = request.get('backend', "copt")
+        self.state = QUEUED
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.future = None
+        self.interrupt = None
+        self.cancel_requested = False
+        self.params = {}  # 生效的求解参数 (由参数方案和 params 字段计算)
+
+    def status(self):
+        def stamp(t):
+            return datetime.datetime.fromtimestamp(t).isoformat(timespec='seconds') if t else None
+        return {
+            'id': self.id,
+            'backend': self.backend,
+            'instance': self.request.get('instance'),
+            'state': self.state,
+            'submitted': stamp(self.submitted),
+            'started': stamp(self.started),
+            'finished': stamp(self.finished),
+            'error': self.error,
+        }
+
+
+def _solver_result(job, solver, instance_path, report):
+    """从求解器对象中提取可序列化的结果"""
+    result = {
+        'instance_path': instance_path,
+        'status': solver.solve_status,
+        'objective': solver.objective_value,
+        'solve_time': solver.solve_time,
+        'from_cache': getattr(solver, 'from_cache', False),
+        'num_solution_values': len(solver.solution),
+        'report': os.path.abspath(report) if report else None,
+        'log': os.path.abspath(solver.log_filepath) if solver.log_filepath else None,
+    }
+    if job.request.get('solution'):
+        result['solution'] = solver.solution
+    return result
+
+
+class SolveDaemon:
+    """
+    任务调度器
+
+    参数:
+    workers - 工作线程数 (同时运行的求解任务数)
+    max_queue - 最多排队的任务数，超过时拒绝提交
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, max_queue=DEFAULT_MAX_QUEUE):
+        from concurrent.futures import ThreadPoolExecutor
+        self.pool = EnvPool()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="solve")
+        self.workers = workers
+        self.max_queue = max_queue
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+
+    def submit(self, request):
+        """提交任务，返回 Job；参数错误抛出 ValueError，队列已满抛出 OverflowError"""
+        if not isinstance(request, dict):
+            raise ValueError("请求体必须是 JSON 对象")
+        if not request.get('instance'):
+            raise ValueError("缺少 instance 字段")
+        if request.get('backend', "copt") not in BACKENDS:
+            raise ValueError(f"未知的后端: {request.get('backend')} (可选: {', '.join(BACKENDS)})")
+        job = Job(request)
+        job.params = solver_params.resolve(_ENV_KIND[job.backend], request.get('param_profile'),
+                                           request.get('params'))
+        with self.lock:
+            queued = sum(1 for j in self.jobs.values() if j.state == QUEUED)
+            if queued >= self.max_queue:
+                raise OverflowError(f"排队任务已达上限 ({self.max_queue})")
+            self.jobs[job.id] = job
+            self._trim()
+        job.future = self.executor.submit(self._run, job)
+        return job
+
+    def _trim(self):
+        """只保留最近的 MAX_FINISHED_JOBS 个已结束任务"""
+        finished = [jid for jid, j in self.jobs.items() if j.state in (DONE, FAILED, CANCELLED)]
+        for jid in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[jid]
+
+    def _run(self, job):
+        with self.lock:
+            if job.state != QUEUED:
+                return
+            job.state = RUNNING
+            job.started = time.time()
+        env = None
+        healthy = True
+        try:
+            env = self.pool.acquire(job.backend)
+            solver, path, report = BACKENDS[job.backend][1](job, env)
+            job.result = _solver_result(job, solver, path, report)
+            job.state = CANCELLED if job.cancel_requested else DONE
+        except JobCancelled:
+            job.state = CANCELLED
+        except Exception as e:
+            # 找不到文件与环境无关，其他异常后环境状态未知，不再复用
+            healthy = isinstance(e, FileNotFoundError)
+            job.error = f"{type(e).__name__}: {e}"
+            job.state = CANCELLED if job.cancel_requested else FAILED
+            traceback.print_exc()
+        finally:
+            job.finished = time.time()
+            job.interrupt = None
+            if env is not None:
+                if healthy and _env_alive(env):
+                    self.pool.release(job.backend, env)
+                else:
+                    self.pool.discard(job.backend, env)
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """取消任务，返回取消后的 Job (不存在时返回 None)"""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        with self.lock:
+            if job.state == QUEUED:
+                job.future.cancel()
+                job.state = CANCELLED
+                job.finished = time.time()
+                return job
+            if job.state != RUNNING:
+                return job
+            job.cancel_requested = True
+            interrupt = job.interrupt
+        if interrupt is not None:
+            try:
+                interrupt()
+            except Exception as e:
+                print(f"中断任务 {job.id} 失败: {e}")
+        return job
+
+    def health(self):
+        with self.lock:
+            states = {}
+            for job in self.jobs.values():
+                states[job.state] = states.get(job.state, 0) + 1
+        return {'backends': list(BACKENDS), 'workers': self.workers, 'jobs': states, 'environments': self.pool.status()}
+
+    def shutdown(self):
+        for job in list(self.jobs.values()):
+            if job.state in (QUEUED, RUNNING):
+                self.cancel(job.id)
+        self.executor.shutdown(wait=True)
+        self.pool.close()
+
+
+# ---------------------------------------------------------------------------
+# HTTP 接口
+# ---------------------------------------------------------------------------
+
+class _Handler(BaseHTTPRequestHandler):
+    daemon = None  # 由 serve() 设置
+
+    def log_message(self, format, *args):
+        pass  # 求解输出已经足够多，不打印每个HTTP请求
+
+    def _send(self, code, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _job_from_path(self):
+        parts = [p for p in self.path.split("?")[0].split("/") if p]
+        if len(parts) < 2 or parts[0] != "jobs":
+            return None, parts
+        return self.daemon.get(parts[1]), parts
+
+    def do_GET(self):
+        path = self.path.split("?")[0].rstrip("/")
+        if path == "/health":
+            return self._send(200, self.daemon.health())
+        if path == "/jobs":
+            with self.daemon.lock:
+                jobs = [job.status() for job in self.daemon.jobs.values()]
+            return self._send(200, {'jobs': jobs})
+        job, parts = self._job_from_path()
+        if job is None:
+            return self._send(404, {'error': "任务不存在"})
+        if len(parts) == 3 and parts[2] == "result":
+            if job.state in (QUEUED, RUNNING):
+                return self._send(409, dict(job.status(), error="任务尚未完成"))
+            return self._send(200, dict(job.status(), result=job.result))
+        return self._send(200, job.status())
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/jobs":
+            return self._send(404, {'error': "未知的路径"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            job = self.daemon.submit(request)
+        except (ValueError, TypeError) as e:
+            return self._send(400, {'error': str(e)})
+        except OverflowError as e:
+            return self._send(503, {'error': str(e)})
+        return self._send(202, job.status())
+
+    def do_DELETE(self):
+        job, _ = self._job_from_path()
+        if job is None:
+            return self._send(404, {'error': "任务不存在"})
+        return self._send(200, self.daemon.cancel(job.id).status())
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=DEFAULT_WORKERS, max_queue=DEFAULT_MAX_QUEUE, warm=()):
+    """启动守护进程，直到 Ctrl+C"""
+    daemon = SolveDaemon(workers, max_queue)
+    daemon.pool.warm(warm)
+    handler = type("Handler", (_Handler,), {'daemon': daemon})
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f"求解守护进程已启动: http://{host}:{port} (工作线程 {workers}, 最多排队 {max_queue})")
+
+    def _terminate(signum, frame):
+        raise KeyboardInterrupt
+
+    # kill (SIGTERM) 与 Ctrl+C 一样正常停止，释放许可证
+    signal.signal(signal.SIGTERM, _terminate)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n正在停止守护进程...")
+    finally:
+        server.server_close()
+        daemon.shutdown()
+
+
+# ---------------------------------------------------------------------------
+# 命令行客户端
+# ---------------------------------------------------------------------------
+
+def request(method, path, payload=None, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=30):
+    """向守护进程发送请求，返回 (HTTP状态码, JSON)"""
+    import urllib.error
+    import urllib.request
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    req = urllib.request.Request(f"http://{host}:{port}{path}", data=data, method=method,
+                                 headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def wait_for(job_id, host=DEFAULT_HOST, port=DEFAULT_PORT, interval=0.5):
+    """轮询直到任务结束，返回结果"""
+    while True:
+        code, payload = request("GET", f"/jobs/{job_id}/result", host=host, port=port)
+        if code != 409:
+            return payload
+        time.sleep(interval)
+
+
+def main():
+    """主函数"""
+    args = sys.argv[1:]
+    param_profile, param_overrides = solver_params.from_argv(args)
+    options = {'--host': DEFAULT_HOST, '--port': DEFAULT_PORT, '--workers': DEFAULT_WORKERS,
+               '--max-queue': DEFAULT_MAX_QUEUE, '--warm': "", '--backend': "copt", '--data': None}
+    for flag in list(options):
+        if flag in args:
+            index = args.index(flag)
+            options[flag] = args[index + 1]
+            del args[index:index + 2]
+    host, port = options['--host'], int(options['--port'])
+    flags = {arg for arg in args if arg.startswith('--')}
+    args = [arg for arg in args if not arg.startswith('--')]
+
+    if not args or args[0] == "serve":
+        warm = [b for b in options['--warm'].split(",") if b]
+        unknown = [b for b in warm if b not in BACKENDS]
+        if unknown:
+            print(f"未知的后端: {', '.join(unknown)} (可选: {', '.join(BACKENDS)})")
+            return
+        serve(host, port, int(options['--workers']), int(options['--max-queue']), warm)
+        return
+
+    command = args[0]
+    if command == "submit" and len(args) > 1:
+        payload = {'instance': args[1], 'backend': options['--backend'],
+                   'force_solve': '--force-solve' in flags, 'report': '--no-report' not in flags}
+        if options['--data']:
+            payload['data'] = options['--data']
+        if param_profile:
+            payload['param_profile'] = param_profile
+        if param_overrides:
+            payload['params'] = param_overrides
+        code, reply = request("POST", "/jobs", payload, host, port)
+        if code == 202 and '--wait' in flags:
+            reply = wait_for(reply['id'], host, port)
+    elif command == "status":
+        code, reply = request("GET", f"/jobs/{args[1]}" if len(args) > 1 else "/jobs", host=host, port=port)
+    elif command == "result" and len(args) > 1:
+        code, reply = request("GET", f"/jobs/{args[1]}/result", host=host, port=port)
+    elif command == "cancel" and len(args) > 1:
+        code, reply = request("DELETE", f"/jobs/{args[1]}", host=host, port=port)
+    elif command == "health":
+        code, reply = request("GET", "/health", host=host, port=port)
+    else:
+        print(__doc__)
+        return
+    print(json.dumps(reply, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+缓冲的异步日志
+
+本模块为 mps.py / mps_gurobi.py / qps.py / ampl.py 提供脚本自身的事件日志。以前 ampl.py 的
+_log_message 每条消息都要打开日志文件、追加一行再关闭，求解过程中的数百条消息都付一次文件
+打开/关闭的代价。现在:
+- 调用方只把 (时间戳, 级别, 消息) 放进一个有界的内存队列，格式化和写文件由后台线程完成
+- 后台线程一次取出一批消息，按文件分组写入，每批只 flush 一次
+- 低于当前级别的消息在调用处直接返回 (只有一次整数比较)，参数不会被格式化；
+  循环中的详细诊断可以用 log.debug_enabled 整体跳过
+
+详细中文注释:
+所有日志文件共用一个后台写线程 (首次打开日志时启动，daemon 线程)。队列满时调用方阻塞等待，
+内存占用有上限而且不会丢消息。flush() 等待此前放入队列的消息全部写入文件；进程退出时
+(atexit) 自动 flush 所有日志。消息支持 logging 风格的延迟格式化: log.debug("x=%s", x)
+只在 DEBUG 级别启用时才执行 % 格式化。日志级别通过 --log-level debug|info|warning|error
+设置 (默认 info)，对本进程之后打开的所有日志生效。
+"""
+import atexit
+import datetime
+import queue
+import sys
+import threading
+import time
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVELS = {'debug': DEBUG, 'info': INFO, 'warning': WARNING, 'error': ERROR}
+LEVEL_NAMES = {value: name.upper() for name, value in LEVELS.items()}
+
+QUEUE_SIZE = 10000      # 队列中最多缓存的消息数
+BATCH_SIZE = 512        # 后台线程每批最多写入的消息数 (每批每个文件 flush 一次)
+
+default_level = INFO
+
+_CLOSE = object()
+_queue = queue.Queue(maxsize=QUEUE_SIZE)
+_writer = None
+_writer_lock = threading.Lock()
+_shutting_down = False  # atexit 已经写完队列: 之后的 flush/close 直接在调用线程完成
+
+
+def _format(record):
+    timestamp, level, message, args = record
+    if args:
+        try:
+            message = message % args
+        except (TypeError, ValueError):
+            message = f"{message} {args}"
+    clock = datetime.datetime.fromtimestamp(timestamp).strftime('%H:%M:%S')
+    prefix = "" if level == INFO else f"{LEVEL_NAMES.get(level, level)} "
+    return f"[{clock}] {prefix}{message}\n"
+
+
+def _write_loop():
+    """后台写线程: 成批取出消息，按日志文件分组写入"""
+    while True:
+        items = [_queue.get()]
+        while len(items) < BATCH_SIZE:
+            try:
+                items.append(_queue.get_nowait())
+            except queue.Empty:
+                break
+        done = []
+        for log, record in items:
+            try:
+                if record is _CLOSE:
+                    log._close_file()
+                elif isinstance(record, threading.Event):
+                    done.append(record)
+                else:
+                    log._file_write(record if isinstance(record, str) else _format(record))
+            except Exception as e:  # 写日志失败不能中断求解，只提示一次
+                if not log.failed:
+                    log.failed = True
+                    print(f"写入日志失败: {e}", file=sys.stderr)
+        for log in {log for log, _ in items if isinstance(log, SolverLog)}:
+            try:
+                log._file_flush()
+            except OSError:
+                pass
+        for event in done:
+            event.set()
+        for _ in items:
+            _queue.task_done()
+
+
+def _ensure_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_write_loop, name="solver-log-writer", daemon=True)
+            _writer.start()
+
+
+class SolverLog:
+    """
+    一个日志文件
+
+    参数:
+    path - 日志文件路径
+    level - 最低记录级别 (默认使用 default_level，即 --log-level 的设置)
+    mode - 'w' 新建 (覆盖)，'a' 追加
+    """
+
+    enabled = True
+
+    def __init__(self, path, level=None, mode='w'):
+        self.path = path
+        self.level = default_level if level is None else level
+        self.debug_enabled = self.level <= DEBUG
+        self.failed = False
+        self._file = open(path, mode, encoding='utf-8')
+        _ensure_writer()
+
+    def log(self, level, message, *args):
+        if level < self.level:
+            return
+        _queue.put((self, (time.time(), level, message, args)))
+
+    def debug(self, message, *args):
+        if self.debug_enabled:
+            _queue.put((self, (time.time(), DEBUG, message, args)))
+
+    def info(self, message, *args):
+        if self.level <= INFO:
+            _queue.put((self, (time.time(), INFO, message, args)))
+
+    def warning(self, message, *args):
+        self.log(WARNING, message, *args)
+
+    def error(self, message, *args):
+        self.log(ERROR, message, *args)
+
+    def write(self, text):
+        """原样写入一段文本 (例如日志文件头)，不加时间戳，不受级别限制"""
+        _queue.put((self, text))
+
+    def flush(self, timeout=5.0):
+        """等待此前放入队列的消息全部写入文件"""
+        if self._file is None or _shutting_down:
+            return
+        event = threading.Event()
+        _queue.put((self, event))
+        event.wait(timeout)
+
+    def close(self):
+        """写完队列中的消息后关闭文件"""
+        if self._file is None:
+            return
+        if _shutting_down:
+            self._close_file()
+            return
+        _queue.put((self, _CLOSE))
+        self.flush()
+
+    # 以下方法只在后台写线程中调用
+    def _file_write(self, text):
+        if self._file is not None:
+            self._file.write(text)
+
+    def _file_flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class _NullLog:
+    """未打开日志时使用的空实现"""
+
+    enabled = False
+    path = None
+    level = ERROR + 1
+    debug_enabled = False
+
+    def log(self, level, message, *args):
+        pass
+
+    def debug(self, message, *args):
+        pass
+
+    def info(self, message, *args):
+        pass
+
+    def warning(self, message, *args):
+        pass
+
+    def error(self, message, *args):
+        pass
+
+    def write(self, text):
+        pass
+
+    def flush(self, timeout=None):
+        pass
+
+    def close(self):
+        pass
+
+
+NULL_LOG = _NullLog()
+
+
+def open_log(path, level=None, mode='w'):
+    """打开日志文件，失败时提示并返回 NULL_LOG"""
+    try:
+        return SolverLog(path, level, mode)
+    except OSError as e:
+        print(f"创建日志文件时出错: {e}")
+        return NULL_LOG
+
+
+@atexit.register
+def flush_all(timeout=5.0):
+    """等待队列中的所有消息写入文件 (进程退出时自动调用)"""
+    global _shutting_down
+    if _writer is not None and _writer.is_alive():
+        event = threading.Event()
+        _queue.put((NULL_LOG, event))
+        event.wait(timeout)
+    _shutting_down = True
+
+
+def from_argv(argv=None):
+    """
+    从命令行参数中取出 --log-level (原地删除)，设置本进程的默认日志级别并返回
+
+    支持的参数:
+    --log-level debug|info|warning|error
+    """
+    global default_level
+    argv = sys.argv if argv is None else argv
+    if '--log-level' in argv:
+        index = argv.index('--log-level')
+        name = argv[index + 1].lower() if index + 1 < len(argv) else ""
+        del argv[index:index + 2]
+        if name not in LEVELS:
+            raise ValueError(f"未知的日志级别: {name} (可选 {', '.join(LEVELS)})")
+        default_level = LEVELS[name]
+    return default_level
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+求解参数配置
+
+本模块为 mps.py (COPT) / mps_gurobi.py (Gurobi) / qps.py (COPT) / ampl.py 统一提供求解参数:
+- 命名的参数方案 (profile): fast-feasible、prove-optimal、low-memory，可在 solver_profiles.json 中增加或覆盖
+- 每次运行的覆盖参数: --time-limit、--gap、--threads、--param 名称=值 (可重复)
+- 通用参数名 (time_limit、gap、threads 等) 自动翻译为各求解器自己的参数名
+- 生效的参数写入LaTeX报告
+- 自动使用 tune.py 为实例族调出的参数方案 (tuned:<实例族>)
+
+详细中文注释:
+参数方案是一个字典: 顶层为通用参数名；以后端名 (copt / gurobi / ampl) 为键的子字典为该求解器的原生参数，
+只在对应后端生效。合并顺序为: 脚本默认参数 -> 参数方案的通用参数 -> 参数方案的原生参数 -> 命令行参数。
+--param 的名称既可以是通用参数名，也可以是求解器的原生参数名 (例如 --param MIPFocus=1)。
+AMPL 后端的参数以 "<求解器>_options" 选项字符串传给求解器驱动 (例如 gurobi_options 'timelimit=60')。
+没有指定 --param-profile 时，如果 solver_profiles.json 中有当前实例族 (见 instance_family) 的
+调优方案 tuned:<实例族>，并且其中包含当前后端的参数，就自动使用它；--param-profile default 可以关闭。
+
+solver_profiles.json 示例:
+{
+    "overnight": {"time_limit": 28800, "gap": 0.0001, "gurobi": {"MIPFocus": 3}},
+    "fast-feasible": {"time_limit": 120}
+}
+"""
+import json
+import os
+import re
+import sys
+
+PROFILES_FILE = "solver_profiles.json"
+TUNED_PREFIX = "tuned:"
+BACKENDS = ("copt", "gurobi", "ampl")
+
+# 通用参数名 -> (COPT参数, Gurobi参数, AMPL求解器驱动关键字)
+GENERIC_PARAMS = {
+    "time_limit": ("TimeLimit", "TimeLimit", "timelimit"),
+    "gap": ("RelGap", "MIPGap", "mipgap"),
+    "abs_gap": ("AbsGap", "MIPGapAbs", "mipgapabs"),
+    "threads": ("Threads", "Threads", "threads"),
+    "feas_tol": ("FeasTol", "FeasibilityTol", "feastol"),
+    "int_tol": ("IntTol", "IntFeasTol", "inttol"),
+    "node_limit": ("NodeLimit", "NodeLimit", "nodelimit"),
+}
+
+BUILTIN_PROFILES = {
+    # 求解器默认参数 (同时关闭自动使用调优方案)
+    "default": {},
+    # 尽快找到质量尚可的可行解
+    "fast-feasible": {"gap": 0.05, "time_limit": 300, "copt": {"HeurLevel": 3}, "gurobi": {"MIPFocus": 1}},
+    # 证明最优性，不接受相对间隙
+    "prove-optimal": {"gap": 0.0, "abs_gap": 0.0, "gurobi": {"MIPFocus": 2}},
+    # 减少内存占用: 单线程，Gurobi 把分支树节点写到磁盘
+    "low-memory": {"threads": 1, "copt": {"MipTasks": 1}, "gurobi": {"NodefileStart": 0.5}},
+}
+
+# 命令行简写参数 -> 通用参数名
+_SHORTCUT_FLAGS = {"--time-limit": "time_limit", "--gap": "gap", "--threads": "threads"}
+
+
+def parse_value(text):
+    """把命令行中的参数值转换为 int / float，无法转换时保留字符串"""
+    for convert in (int, float):
+        try:
+            return convert(text)
+        except ValueError:
+            pass
+    return text
+
+
+def load_profiles(path=PROFILES_FILE):
+    """内置参数方案加上配置文件中的方案 (同名时配置文件优先)"""
+    profiles = {name: dict(profile) for name, profile in BUILTIN_PROFILES.items()}
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            profiles.update(json.load(f))
+    return profiles
+
+
+def instance_family(path):
+    """
+    实例族名称: 实例名开头的字母部分 (ran10x10 -> ran, bal8x12 -> bal)；
+    只有一个字母时再带上随后最多两位数字 (n3705 -> n37)
+    """
+    name = os.path.basename(path).split(".")[0]
+    match = re.match(r"([A-Za-z]+)(\d{0,2})", name)
+    if match is None:
+        return name
+    letters, digits = match.groups()
+    return letters if len(letters) > 1 else letters + digits
+
+
+def _native_name(name, backend):
+    """通用参数名翻译为后端参数名，非通用参数名原样返回"""
+    if name in GENERIC_PARAMS:
+        return GENERIC_PARAMS[name][BACKENDS.index(backend)]
+    return name
+
+
+def resolve(backend, profile=None, overrides=None, base=None, profiles_path=PROFILES_FILE, instance=None):
+    """
+    计算某个后端生效的求解参数
+
+    参数:
+    backend - copt / gurobi / ampl
+    profile - 参数方案名称，None 表示不使用方案
+    overrides - 命令行覆盖参数 {名称: 值}，名称可以是通用名或原生名
+    base - 脚本自身的默认参数 (原生参数名)
+    instance - 实例文件路径；未指定参数方案时查找该实例族的调优方案
+
+    返回:
+    {原生参数名: 值}
+
+    异常:
+    ValueError - 参数方案不存在
+    """
+    params = dict(base or {})
+    profiles = load_profiles(profiles_path) if profile or instance is not None else {}
+    if profile is None and instance is not None:
+        tuned = TUNED_PREFIX + instance_family(instance)
+        if backend in profiles.get(tuned, {}):
+            print(f"使用实例族调优参数方案: {tuned}")
+            profile = tuned
+    if profile:
+        if profile not in profiles:
+            raise ValueError(f"未知的参数方案: {profile} (可选: {', '.join(sorted(profiles))})")
+        settings = profiles[profile]
+        for name, value in settings.items():
+            if name in GENERIC_PARAMS:
+                params[_native_name(name, backend)] = value
+        params.update(settings.get(backend, {}))
+    for name, value in (overrides or {}).items():
+        params[_native_name(name, backend)] = value
+    return params
+
+
+def apply(model, params):
+    """
+    逐个设置求解参数 (COPT / Gurobi 模型的 setParam)，无法设置的参数打印警告后跳过
+
+    返回:
+    实际设置成功的参数
+    """
+    applied = {}
+    for name, value in params.items():
+        try:
+            model.setParam(name, value)
+            applied[name] = value
+        except Exception as e:
+            print(f"警告: 无法设置求解参数 {name}={value} ({e})")
+    return applied
+
+
+def ampl_options(solver_name, params):
+    """把参数转换为AMPL选项: {"<求解器>_options": "名称=值 ..."}"""
+    if not params:
+        return {}
+    return {f"{solver_name}_options": " ".join(f"{name}={value}" for name, value in params.items())}
+
+
+def to_latex(params):
+    """生成报告中的求解参数章节"""
+    latex = "\\section{求解参数}\n\n"
+    if not params:
+        return latex + "本次求解使用求解器的默认参数。\n\n"
+    latex += "\\begin{table}[h!]\n\\centering\n\\begin{tabular}{ll}\n\\toprule\n"
+    latex += "\\textbf{参数} & \\textbf{取值} \\\\\n\\midrule\n"
+    for name, value in params.items():
+        label = str(name).replace("_", "\\_")
+        text = str(value).replace("_", "\\_")
+        latex += f"\\texttt{{{label}}} & {text} \\\\\n"
+    latex += "\\bottomrule\n\\end{tabular}\n\\caption{生效的求解参数}\n\\end{table}\n\n"
+    return latex
+
+
+def from_argv(argv=None):
+    """
+    从命令行参数中取出求解参数相关的选项 (原地删除)
+
+    支持的参数:
+    --param-profile 名称       使用参数方案
+    --time-limit 秒            时间限制
+    --gap 相对间隙             MIP相对间隙
+    --threads 线程数
+    --param 名称=值            任意参数，可重复
+
+    返回:
+    (参数方案名称或 None, 覆盖参数 dict)
+    """
+    argv = sys.argv if argv is None else argv
+    profile = None
+    overrides = {}
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg in _SHORTCUT_FLAGS or arg in ('--param-profile', '--param'):
+            if i + 1 >= len(argv):
+                raise ValueError(f"{arg} 需要一个参数值")
+            value = argv[i + 1]
+            del argv[i:i + 2]
+            if arg == '--param-profile':
+                profile = value
+            elif arg == '--param':
+                if '=' not in value:
+                    raise ValueError(f"--param 的格式应为 名称=值: {value}")
+                name, text = value.split('=', 1)
+                overrides[name.strip()] = parse_value(text.strip())
+            else:
+                overrides[_SHORTCUT_FLAGS[arg]] = parse_value(value)
+            continue
+        i += 1
+    return profile, overrides
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+求解进度轨迹记录器
+
+本模块为 mps.py / mps_gurobi.py 的MIP求解提供进度轨迹记录功能。
+主要功能:
+- 在求解器回调中记录 (时间, 当前最优解, 最优界, 节点数) 四元组
+- 使用紧凑的 array('d') 在内存中保存轨迹，并定期追加写入磁盘
+- 计算原始积分 (primal integral) 和原始-对偶积分 (primal-dual integral)
+- 生成包含收敛曲线(pgfplots)的LaTeX章节
+
+详细中文注释:
+长时间运行的MIP求解在结束前无法观察其进展。本模块将求解器回调中得到的
+进度信息以每条记录4个float64的形式顺序存放，内存占用极小；轨迹文件为原始
+float64二进制流，可用 load_trajectory() 重新读取。原始积分按照 Berthold
+提出的定义计算：对原始间隙函数 p(t) 在求解时间上积分，数值越小说明越早
+找到高质量的可行解。
+"""
+import array
+import datetime
+import math
+import os
+import time
+
+# 求解器回调中表示"无值"的无穷大阈值 (COPT.INFINITY=1e30, GRB.INFINITY=1e100)
+INFINITY_THRESHOLD = 1e20
+RECORD_WIDTH = 4  # 每条记录: time, incumbent, bound, nodes
+
+
+def _clean_value(value):
+    """将求解器返回的无穷大或无效值统一转换为 NaN"""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return math.nan
+    if math.isnan(value) or abs(value) >= INFINITY_THRESHOLD:
+        return math.nan
+    return value
+
+
+def primal_gap(value, reference):
+    """
+    计算两个目标值之间的相对间隙 (取值范围 [0, 1])
+
+    定义:
+    - 任一值缺失时间隙为 1
+    - 两值均为 0 时间隙为 0
+    - 两值异号时间隙为 1
+    - 其余情况为 |reference - value| / max(|reference|, |value|)
+    """
+    if math.isnan(value) or math.isnan(reference):
+        return 1.0
+    if abs(value) < 1e-12 and abs(reference) < 1e-12:
+        return 0.0
+    if value * reference < 0:
+        return 1.0
+    return min(1.0, abs(reference - value) / max(abs(reference), abs(value)))
+
+
+class SolveTrajectory:
+    """
+    MIP求解进度轨迹
+
+    记录保存在一个扁平的 array('d') 中，每 RECORD_WIDTH 个元素构成一条记录。
+    仅当当前最优解或最优界发生变化、或距上次记录超过 sample_interval 秒时才追加记录，
+    因此即使回调非常频繁，轨迹规模也保持在很小的范围内。
+    """
+
+    def __init__(self, name, output_dir="trajectories", flush_interval=10.0, sample_interval=1.0):
+        """
+        参数:
+        name - 轨迹名称 (通常为实例文件名)
+        output_dir - 轨迹文件的输出目录
+        flush_interval - 追加写入磁盘的时间间隔(秒)
+        sample_interval - 值未变化时的最小采样间隔(秒)
+        """
+        self.name = name
+        self.data = array.array('d')
+        self.flush_interval = flush_interval
+        self.sample_interval = sample_interval
+        self.start_time = time.time()
+        self.end_time = None
+        self.reference_value = math.nan
+        self._flushed_count = 0
+        self._last_flush = self.start_time
+        self.listeners = []  # 每条新记录的回调函数列表 (time, incumbent, bound, nodes)
+
+        os.makedirs(output_dir, exist_ok=True)
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.filepath = os.path.join(output_dir, f"{name}_traj_{timestamp}.bin")
+
+    def __len__(self):
+        return len(self.data) // RECORD_WIDTH
+
+    def elapsed(self):
+        """返回从轨迹开始到现在的时间(秒)"""
+        return time.time() - self.start_time
+
+    def record(self, incumbent, bound, nodes=math.nan, elapsed=None):
+        """
+        记录一条进度信息
+
+        参数:
+        incumbent - 当前最优可行解目标值
+        bound - 当前最优界
+        nodes - 已探索节点数 (求解器不提供时为 NaN)
+        elapsed - 求解器报告的运行时间，缺省时使用墙钟时间
+        """
+        t = self.elapsed() if elapsed is None else float(elapsed)
+        incumbent = _clean_value(incumbent)
+        bound = _clean_value(bound)
+        nodes = _clean_value(nodes)
+
+        n = len(self.data)
+        if n:
+            last_t, last_inc, last_bnd = self.data[n - 4], self.data[n - 3], self.data[n - 2]
+            unchanged = (_same(incumbent, last_inc) and _same(bound, last_bnd))
+            if unchanged and t - last_t < self.sample_interval:
+                return
+
+        self.data.extend((t, incumbent, bound, nodes))
+        for listener in self.listeners:
+            try:
+                listener(t, incumbent, bound, nodes)
+            except Exception:
+                pass
+
+        if time.time() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """将尚未写入的记录追加到轨迹文件"""
+        self._last_flush = time.time()
+        if self._flushed_count >= len(self.data):
+            return
+        try:
+            with open(self.filepath, 'ab') as f:
+                self.data[self._flushed_count:].tofile(f)
+            self._flushed_count = len(self.data)
+        except OSError as e:
+            print(f"写入轨迹文件失败: {e}")
+
+    def finish(self, total_time=None, reference=None):
+        """
+        结束记录，写入剩余数据
+
+        参数:
+        total_time - 求解总时间(秒)，作为积分的时间上限
+        reference - 计算原始积分所用的参考目标值 (最优值或已知最优值)
+        """
+        self.end_time = self.elapsed() if total_time is None else float(total_time)
+        if reference is not None:
+            self.reference_value = _clean_value(reference)
+        elif len(self):
+            self.reference_value = self.data[len(self.data) - 3]
+        self.flush()
+
+    def records(self):
+        """按 (time, incumbent, bound, nodes) 元组迭代所有记录"""
+        data = self.data
+        for i in range(0, len(data), RECORD_WIDTH):
+            yield data[i], data[i + 1], data[i + 2], data[i + 3]
+
+    def _integrate(self, gap_of_record):
+        """对分段常数的间隙函数在 [0, end_time] 上积分"""
+        end_time = self.end_time if self.end_time is not None else self.elapsed()
+        total = 0.0
+        prev_t = 0.0
+        prev_gap = 1.0  # 第一条记录之前没有任何信息，间隙为1
+        for rec in self.records():
+            t = min(rec[0], end_time)
+            total += prev_gap * max(0.0, t - prev_t)
+            prev_t = t
+            prev_gap = gap_of_record(rec)
+        total += prev_gap * max(0.0, end_time - prev_t)
+        return total
+
+    def primal_integral(self, reference=None):
+        """原始积分: 当前最优解相对参考值的间隙对时间的积分"""
+        ref = self.reference_value if reference is None else _clean_value(reference)
+        return self._integrate(lambda rec: primal_gap(rec[1], ref))
+
+    def primal_dual_integral(self):
+        """原始-对偶积分: 当前最优解与最优界之间的间隙对时间的积分"""
+        return self._integrate(lambda rec: primal_gap(rec[1], rec[2]))
+
+    def time_to_first_incumbent(self):
+        """返回找到第一个可行解的时间，未找到时返回 None"""
+        for t, incumbent, _, _ in self.records():
+            if not math.isnan(incumbent):
+                return t
+        return None
+
+    def to_latex(self, max_points=200):
+        """
+        生成求解进度章节，包含积分指标和收敛曲线
+
+        曲线使用 pgfplots 绘制，需要报告导言区加载 pgfplots 宏包。
+        点数超过 max_points 时按等间隔抽样，保证编译速度。
+        """
+        if not len(self):
+            return ""
+
+        latex = "\\section{求解进度}\n\n"
+        latex += "\\begin{itemize}\n"
+        latex += f"\\item 轨迹记录数: {len(self)}\n"
+        first = self.time_to_first_incumbent()
+        if first is not None:
+            latex += f"\\item 首个可行解时间: {first:.3f} 秒\n"
+        if self.end_time is not None:
+            latex += f"\\item 求解总时间: {self.end_time:.3f} 秒\n"
+        latex += f"\\item 原始积分 (Primal Integral): {self.primal_integral():.6g}\n"
+        latex += f"\\item 原始-对偶积分 (Primal-Dual Integral): {self.primal_dual_integral():.6g}\n"
+        latex += "\\end{itemize}\n\n"
+
+        records = list(self.records())
+        if len(records) > max_points:
+            step = len(records) / max_points
+            records = [records[int(i * step)] for i in range(max_points)] + [records[-1]]
+
+        incumbent_coords = "".join(f"({t:.4g},{inc:.8g})" for t, inc, _, _ in records if not math.isnan(inc))
+        bound_coords = "".join(f"({t:.4g},{bnd:.8g})" for t, _, bnd, _ in records if not math.isnan(bnd))
+        if not incumbent_coords and not bound_coords:
+            return latex
+
+        latex += "\\begin{figure}[h!]\n\\centering\n\\begin{tikzpicture}\n"
+        latex += "\\begin{axis}[width=0.9\\textwidth, height=7cm, xlabel={时间 (秒)}, ylabel={目标值}, "
+        latex += "legend pos=north east, grid=major]\n"
+        if incumbent_coords:
+            latex += f"\\addplot[const plot, blue, thick] coordinates {{{incumbent_coords}}};\n"
+            latex += "\\addlegendentry{当前最优解}\n"
+        if bound_coords:
+            latex += f"\\addplot[const plot, red, dashed] coordinates {{{bound_coords}}};\n"
+            latex += "\\addlegendentry{最优界}\n"
+        latex += "\\end{axis}\n\\end{tikzpicture}\n"
+        latex += "\\caption{求解收敛曲线}\n\\end{figure}\n\n"
+        return latex
+
+
+def _same(a, b):
+    """比较两个可能为 NaN 的浮点数是否相同"""
+    if math.isnan(a) and math.isnan(b):
+        return True
+    return a == b
+
+
+def load_trajectory(filepath):
+    """
+    从轨迹文件中读取记录
+
+    返回:
+    (time, incumbent, bound, nodes) 元组列表
+    """
+    data = array.array('d')
+    with open(filepath, 'rb') as f:
+        data.frombytes(f.read())
+    usable = len(data) - len(data) % RECORD_WIDTH
+    return [tuple(data[i:i + RECORD_WIDTH]) for i in range(0, usable, RECORD_WIDTH)]
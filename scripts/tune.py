@@ -0,0 +1,498 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+求解参数调优
+
+按实例族 (ran*、bal*、n37xx 等) 手工调参费时且难以复现。本脚本在一组实例上自动搜索
+求解参数，并把每个实例族的最佳参数保存为参数方案，之后 mps.py / mps_gurobi.py 求解
+同族实例时自动使用。
+主要功能:
+- 参数搜索空间由 JSON 文件给出: 列表表示离散取值，{"min", "max"} 表示连续区间
+  ("int": true 取整数，"log": true 按对数均匀采样)；参数名可以是通用名 (gap、threads 等)
+- 搜索方法: random (随机搜索) 和 halving (逐次减半: 先用短时间限制评估全部配置，
+  每轮保留最好的 1/eta 并把时间限制乘以 eta)
+- 试验 (配置 x 实例) 在进程池中并行运行，每个试验有独立的时间限制
+- 排名指标: 求解时间的平移几何平均 (未求得最优解按时间限制计)，或原始积分的平移几何平均；
+  先比较求得最优解的实例数
+- 每个实例族的最佳配置写入 solver_profiles.json 的 tuned:<实例族> 方案
+
+详细中文注释:
+求解器默认参数 (空配置) 总是参加评估，作为比较基准；逐次减半的最后一轮也总会包含它。
+每个试验都强制重新求解 (不使用求解结果缓存和热启动)，保证计时可比。试验之间互相隔离:
+每个试验的求解日志和进度轨迹写入单独的目录 (tuning/trials_<后端>_<时间>_*/ 下)，且不读写
+检查点和解库，短时间限制的试验不会留下之后 --resume 会读取的检查点。原始积分以同一轮中
+该实例所有试验找到的最好目标值为参考值，对各试验的当前最优解轨迹积分。
+每个试验的线程数由 --threads-per-trial 控制 (默认 1)，避免并行试验之间争抢 CPU；
+时间限制和线程数不写入调优方案。所有试验记录保存在 tuning/ 目录。
+
+搜索空间示例 (space.json):
+{
+    "Presolve": [-1, 0, 1, 2],
+    "MIPFocus": [0, 1, 2, 3],
+    "Heuristics": {"min": 0.0, "max": 0.5},
+    "Cuts": {"min": -1, "max": 3, "int": true}
+}
+
+用法:
+python tune.py "ran*" --space space.json --backend copt --trials 20 --time-limit 60 --workers 4
+python tune.py ran10x10 ran12x12 --space space.json --search halving --eta 3 --metric primal-integral
+python tune.py "bal*" --space space.json --backend gurobi --no-save
+"""
+import concurrent.futures
+import contextlib
+import datetime
+import fnmatch
+import io
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+import solver_params
+from trajectory import primal_gap
+
+# 后端 -> (模块名, 求解器类名)
+SOLVERS = {
+    "copt": ("mps", "MPSCOPTSolver"),
+    "gurobi": ("mps_gurobi", "MPSSolver"),
+}
+METRICS = ("time", "primal-integral")
+SEARCHES = ("random", "halving")
+DEFAULT_SHIFT = 10.0
+DEFAULT_OUTPUT_DIR = "tuning"
+# 由调优程序控制的参数，不写入调优方案
+HARNESS_PARAMS = ("TimeLimit", "Threads")
+
+
+def load_space(path):
+    """读取参数搜索空间，检查每个参数的取值定义"""
+    with open(path, 'r', encoding='utf-8') as f:
+        space = json.load(f)
+    for name, spec in space.items():
+        if isinstance(spec, list):
+            if not spec:
+                raise ValueError(f"参数 {name} 的取值列表为空")
+        elif not (isinstance(spec, dict) and 'min' in spec and 'max' in spec):
+            raise ValueError(f"参数 {name} 的取值应为列表或 {{\"min\", \"max\"}} 区间")
+        elif spec.get('log') and spec['min'] <= 0:
+            raise ValueError(f"参数 {name} 按对数采样时 min 必须大于 0")
+    return space
+
+
+def sample_config(space, rng):
+    """从搜索空间中随机抽取一个配置"""
+    config = {}
+    for name, spec in space.items():
+        if isinstance(spec, list):
+            config[name] = rng.choice(spec)
+            continue
+        low, high = spec['min'], spec['max']
+        if spec.get('log'):
+            value = math.exp(rng.uniform(math.log(low), math.log(high)))
+        else:
+            value = rng.uniform(low, high)
+        config[name] = int(round(value)) if spec.get('int') else float(f"{value:.6g}")
+    return config
+
+
+def initial_configs(space, count, seed):
+    """默认配置加上 count - 1 个不重复的随机配置"""
+    rng = random.Random(seed)
+    configs = [{}]
+    seen = {json.dumps({}, sort_keys=True)}
+    attempts = 0
+    while len(configs) < count and attempts < count * 20:
+        attempts += 1
+        config = sample_config(space, rng)
+        key = json.dumps(config, sort_keys=True)
+        if key not in seen:
+            seen.add(key)
+            configs.append(config)
+    return configs
+
+
+def collect_instances(patterns, backend):
+    """把实例名或通配符 (ran*) 解析为MPS文件路径列表"""
+    import importlib
+    module = importlib.import_module(SOLVERS[backend][0])
+    candidates = None
+    paths = []
+    for pattern in patterns:
+        if any(ch in pattern for ch in "*?["):
+            if candidates is None:
+                candidates = module.list_mps_files()
+            matched = [p for p in candidates
+                       if fnmatch.fnmatch(os.path.basename(p), pattern) or fnmatch.fnmatch(p, pattern)]
+            if not matched:
+                print(f"警告: 没有与 {pattern} 匹配的MPS文件")
+            paths.extend(matched)
+        else:
+            path = module.find_mps_file(pattern)
+            if path is None:
+                print(f"警告: 未找到MPS文件 {pattern}")
+            else:
+                paths.append(path)
+    return list(dict.fromkeys(paths))
+
+
+def run_trial(backend, path, params, output_dir):
+    """
+    在工作进程中求解一次 (不生成报告)
+
+    参数:
+    output_dir - 本试验的求解日志和进度轨迹目录 (每个试验单独一个)
+
+    返回:
+    试验结果字典: 状态、目标值、求解时间、优化方向和当前最优解轨迹 [(时间, 目标值)]
+    """
+    import importlib
+    module_name, class_name = SOLVERS[backend]
+    result = {'path': path, 'params': params, 'output_dir': output_dir}
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            module = importlib.import_module(module_name)
+            solver = getattr(module, class_name)(path, force_solve=True, params=params, use_warm_start=False,
+                                                 output_dir=output_dir, record=False)
+            solver.solve_model()
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+        return result
+    if backend == "copt":
+        optimal = solver.solve_status == module.COPT.OPTIMAL
+        sense = solver.model.ObjSense
+    else:
+        optimal = solver.solve_status == module.GRB.OPTIMAL
+        sense = solver.model.ModelSense
+    trajectory = solver.trajectory
+    result.update({
+        'status': solver.solve_status,
+        'optimal': optimal,
+        'objective': solver.objective_value,
+        'sense': sense,
+        'solve_time': solver.solve_time,
+        'incumbents': [(t, inc) for t, inc, _, _ in trajectory.records() if inc == inc] if trajectory else [],
+    })
+    return result
+
+
+def shifted_geometric_mean(values, shift=DEFAULT_SHIFT):
+    """平移几何平均: exp(mean(log(v + shift))) - shift"""
+    if not values:
+        return math.nan
+    return math.exp(sum(math.log(max(v, 0.0) + shift) for v in values) / len(values)) - shift
+
+
+def primal_integral(incumbents, end_time, reference):
+    """当前最优解轨迹相对参考值的原始积分 (第一个可行解之前间隙为 1)"""
+    total = 0.0
+    prev_t, prev_gap = 0.0, 1.0
+    for t, incumbent in incumbents:
+        t = min(t, end_time)
+        total += prev_gap * max(0.0, t - prev_t)
+        prev_t, prev_gap = t, primal_gap(incumbent, reference)
+    return total + prev_gap * max(0.0, end_time - prev_t)
+
+
+def trial_values(trials, metric, time_limit):
+    """
+    计算每个试验的指标值 (越小越好)
+
+    返回:
+    与 trials 同序的指标值列表
+    """
+    references = {}
+    for trial in trials:
+        if trial.get('objective') is not None:
+            value = trial['objective'] * trial['sense']
+            best = references.get(trial['path'])
+            if best is None or value < best[0]:
+                references[trial['path']] = (value, trial['objective'])
+    values = []
+    for trial in trials:
+        if 'error' in trial:
+            values.append(time_limit)
+        elif metric == "time":
+            values.append(trial['solve_time'] if trial['optimal'] else time_limit)
+        else:
+            incumbents = trial['incumbents']
+            if not incumbents and trial.get('objective') is not None:
+                incumbents = [(trial['solve_time'], trial['objective'])]
+            reference = references.get(trial['path'], (None, math.nan))[1]
+            end_time = trial['solve_time'] if trial['optimal'] else time_limit
+            values.append(primal_integral(incumbents, end_time, reference))
+    return values
+
+
+def rank_configs(configs, trials, metric, time_limit, shift, paths=None):
+    """
+    按指标给配置排名: 先比较求得最优解的实例数 (多者优先)，再比较平移几何平均 (小者优先)
+
+    参数:
+    paths - 只使用这些实例的试验 (按实例族排名)，None 表示全部
+
+    返回:
+    [{'index', 'config', 'solved', 'score', 'trials'}]，最好的在前
+    """
+    selected = [t for t in trials if paths is None or t['path'] in paths]
+    values = trial_values(selected, metric, time_limit)
+    ranking = []
+    for index, config in enumerate(configs):
+        own = [(t, v) for t, v in zip(selected, values) if t['config_index'] == index]
+        if not own:
+            continue
+        ranking.append({
+            'index': index,
+            'config': config,
+            'solved': sum(1 for t, _ in own if t.get('optimal')),
+            'score': shifted_geometric_mean([v for _, v in own], shift),
+            'trials': len(own),
+        })
+    ranking.sort(key=lambda r: (-r['solved'], r['score']))
+    return ranking
+
+
+class Tuner:
+    """
+    参数调优器
+
+    参数:
+    backend - copt / gurobi
+    paths - 实例文件路径列表
+    metric - time / primal-integral
+    time_limit - 每个试验的时间限制 (逐次减半最后一轮的时间限制)
+    workers - 并行试验的进程数
+    threads_per_trial - 每个试验的求解器线程数
+    shift - 平移几何平均的平移量
+    output_dir - 试验目录和试验记录的上级目录
+    """
+
+    def __init__(self, backend, paths, metric="time", time_limit=60.0, workers=None, threads_per_trial=1,
+                 shift=DEFAULT_SHIFT, output_dir=DEFAULT_OUTPUT_DIR):
+        self.backend = backend
+        self.paths = paths
+        self.metric = metric
+        self.time_limit = time_limit
+        self.workers = workers or max(1, (os.cpu_count() or 2) // max(1, threads_per_trial))
+        self.threads_per_trial = threads_per_trial
+        self.shift = shift
+        self.output_dir = output_dir
+        self.trial_root = None  # 本次调优所有试验目录的上级目录 (第一次评估时创建)
+        self.trials = []   # 所有轮次的试验记录
+
+    def evaluate(self, configs, budget, round_index=0):
+        """
+        在所有实例上评估一组配置 (进程池并行)
+
+        返回:
+        本轮的试验记录 (含 config_index)
+        """
+        if self.trial_root is None:
+            os.makedirs(self.output_dir, exist_ok=True)
+            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            self.trial_root = tempfile.mkdtemp(prefix=f"trials_{self.backend}_{timestamp}_", dir=self.output_dir)
+        jobs = []
+        for index, config in enumerate(configs):
+            params = solver_params.resolve(self.backend, overrides=config)
+            params.setdefault("Threads", self.threads_per_trial)
+            params["TimeLimit"] = budget
+            for instance, path in enumerate(self.paths):
+                trial_dir = os.path.join(self.trial_root, f"round{round_index}_config{index}_instance{instance}")
+                jobs.append((index, path, params, trial_dir))
+        print(f"\n第 {round_index + 1} 轮: {len(configs)} 个配置 x {len(self.paths)} 个实例, "
+              f"时间限制 {budget:.1f} 秒, {self.workers} 个进程")
+        results = []
+        with concurrent.futures.ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(run_trial, self.backend, path, params, trial_dir): index
+                       for index, path, params, trial_dir in jobs}
+            for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+                trial = future.result()
+                trial.update({'config_index': futures[future], 'round': round_index, 'budget': budget})
+                results.append(trial)
+                if 'error' in trial:
+                    outcome = f"失败 ({trial['error']})"
+                else:
+                    outcome = f"{trial['solve_time']:.2f} 秒" + (" (最优)" if trial['optimal'] else "")
+                print(f"  [{done}/{len(jobs)}] 配置#{futures[future]} "
+                      f"{os.path.basename(trial['path'])}: {outcome}")
+        self.trials.extend(results)
+        return results
+
+    def random_search(self, configs):
+        """随机搜索: 所有配置使用完整的时间限制"""
+        trials = self.evaluate(configs, self.time_limit)
+        return configs, trials
+
+    def successive_halving(self, configs, eta=3):
+        """
+        逐次减半: 每轮保留排名前 1/eta 的配置，时间限制乘以 eta，最后一轮的时间限制为 time_limit
+        """
+        rounds = int(math.log(len(configs), eta)) + 1 if len(configs) > 1 else 1
+        budget = self.time_limit / eta ** (rounds - 1)
+        for round_index in range(rounds):
+            last = round_index == rounds - 1
+            if last and {} not in configs:
+                configs = configs + [{}]  # 最后一轮总是包含默认配置，作为比较基准
+            trials = self.evaluate(configs, budget, round_index)
+            if last:
+                return configs, trials
+            ranking = rank_configs(configs, trials, self.metric, budget, self.shift)
+            configs = [r['config'] for r in ranking[:max(1, len(configs) // eta)]]
+            budget *= eta
+        return configs, trials
+
+
+def print_ranking(ranking, metric, limit=10):
+    label = "时间" if metric == "time" else "原始积分"
+    print(f"\n{'排名':<6}{'最优数':>8}{label + '平移几何平均':>22}  配置")
+    for rank, r in enumerate(ranking[:limit], 1):
+        config = json.dumps(r['config'], ensure_ascii=False) if r['config'] else "(求解器默认参数)"
+        print(f"{rank:<6}{r['solved']:>5}/{r['trials']:<3}{r['score']:>20.4f}  {config}")
+
+
+def save_tuned_profile(family, backend, params, summary, path=solver_params.PROFILES_FILE):
+    """把实例族的最佳参数写入参数方案文件的 tuned:<实例族> (只替换该后端的参数)"""
+    profiles = {}
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            profiles = json.load(f)
+    entry = profiles.setdefault(solver_params.TUNED_PREFIX + family, {})
+    entry[backend] = params
+    entry.setdefault("_tuning", {})[backend] = summary
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(profiles, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def save_trials(tuner, options, output_dir=DEFAULT_OUTPUT_DIR):
+    """保存所有试验记录，返回文件路径"""
+    os.makedirs(output_dir, exist_ok=True)
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    path = os.path.join(output_dir, f"tune_{tuner.backend}_{timestamp}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'options': options, 'instances': tuner.paths, 'trials': tuner.trials},
+                  f, ensure_ascii=False, indent=1)
+    return path
+
+
+def main():
+    """
+    主函数
+
+    用法:
+    python tune.py 实例名或通配符... --space space.json [选项]
+
+    选项:
+    --backend copt|gurobi        求解器 (默认 copt)
+    --search random|halving      搜索方法 (默认 random)
+    --trials N                   配置数 (含默认配置，默认 20)
+    --eta N                      逐次减半的淘汰比例 (默认 3)
+    --time-limit 秒              每个试验的时间限制 (默认 60)
+    --metric time|primal-integral  排名指标 (默认 time)
+    --shift 值                   平移几何平均的平移量 (默认 10)
+    --workers N                  并行进程数 (默认 CPU 数 / 每个试验的线程数)
+    --threads-per-trial N        每个试验的求解器线程数 (默认 1)
+    --seed N                     随机种子 (默认 0)
+    --no-save                    不写入 solver_profiles.json
+    """
+    args = sys.argv[1:]
+    if not args or '-h' in args or '--help' in args:
+        print(main.__doc__)
+        return 0
+
+    options = {'--space': None, '--backend': "copt", '--search': "random", '--trials': 20, '--eta': 3,
+               '--time-limit': 60.0, '--metric': "time", '--shift': DEFAULT_SHIFT, '--workers': None,
+               '--threads-per-trial': 1, '--seed': 0}
+    for flag in list(options):
+        if flag in args:
+            index = args.index(flag)
+            options[flag] = args[index + 1]
+            del args[index:index + 2]
+    save = '--no-save' not in args
+    patterns = [arg for arg in args if not arg.startswith('--')]
+
+    if options['--space'] is None:
+        print("请用 --space 指定参数搜索空间 (JSON 文件)")
+        return 2
+    for flag, choices in (('--backend', SOLVERS), ('--search', SEARCHES), ('--metric', METRICS)):
+        if options[flag] not in choices:
+            print(f"{flag} 的取值无效: {options[flag]} (可选: {', '.join(choices)})")
+            return 2
+    try:
+        space = load_space(options['--space'])
+    except (OSError, ValueError) as e:
+        print(f"无法读取参数搜索空间: {e}")
+        return 2
+
+    backend = options['--backend']
+    paths = collect_instances(patterns, backend)
+    if not paths:
+        print("没有可用于调优的实例")
+        return 2
+
+    families = {}
+    for path in paths:
+        families.setdefault(solver_params.instance_family(path), []).append(path)
+    print(f"调优实例 ({len(paths)} 个): " + ", ".join(f"{family} x {len(members)}"
+                                                  for family, members in families.items()))
+
+    time_limit = float(options['--time-limit'])
+    shift = float(options['--shift'])
+    tuner = Tuner(backend, paths, options['--metric'], time_limit,
+                  int(options['--workers']) if options['--workers'] else None,
+                  int(options['--threads-per-trial']), shift)
+    configs = initial_configs(space, int(options['--trials']), int(options['--seed']))
+    start = time.time()
+    if options['--search'] == "halving":
+        configs, trials = tuner.successive_halving(configs, int(options['--eta']))
+    else:
+        configs, trials = tuner.random_search(configs)
+    elapsed = time.time() - start
+
+    ranking = rank_configs(configs, trials, tuner.metric, time_limit, shift)
+    print(f"\n调优完成: {len(tuner.trials)} 个试验, 用时 {elapsed:.1f} 秒")
+    print_ranking(ranking, tuner.metric)
+    print(f"试验记录: {save_trials(tuner, options)}")
+    print(f"试验日志和轨迹: {tuner.trial_root}")
+
+    for family, members in families.items():
+        family_ranking = rank_configs(configs, trials, tuner.metric, time_limit, shift, set(members))
+        best = family_ranking[0]
+        baseline = next((r for r in family_ranking if not r['config']), None)
+        params = {name: value for name, value in solver_params.resolve(backend, overrides=best['config']).items()
+                  if name not in HARNESS_PARAMS}
+        line = f"\n实例族 {family}: 最佳配置 {json.dumps(params, ensure_ascii=False)}"
+        line += f" (最优 {best['solved']}/{best['trials']}, 得分 {best['score']:.4f}"
+        if baseline is not None:
+            line += f"; 默认参数 最优 {baseline['solved']}/{baseline['trials']}, 得分 {baseline['score']:.4f}"
+        print(line + ")")
+        if not save:
+            continue
+        summary = {
+            'metric': tuner.metric,
+            'score': best['score'],
+            'baseline_score': baseline['score'] if baseline is not None else None,
+            'solved': best['solved'],
+            'instances': [os.path.basename(p) for p in members],
+            'time_limit': time_limit,
+            'tuned_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        }
+        try:
+            save_tuned_profile(family, backend, params, summary)
+            print(f"已保存参数方案 {solver_params.TUNED_PREFIX}{family} 到 {solver_params.PROFILES_FILE}")
+        except (OSError, ValueError) as e:
+            print(f"保存参数方案失败: {e}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
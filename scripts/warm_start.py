@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""
+热启动解库
+
+同一实例经常被反复求解 (参数扫描、求解器升级、重新生成报告)，但每次都从零开始。本模块
+保存每次求解得到的解，并在下一次求解 MIP 时自动把以前找到的最好的解作为 MIP 初始解
+(MIP start) 传给 COPT / Gurobi。
+主要功能:
+- 解库按实例指纹 (文件内容哈希) 索引，保存在 cache/warm_starts.db
+- 内容完全相同时选目标值最好的解；实例被修改过 (内容哈希不同、名称相同) 时选最近的解，
+  按变量名重新映射，只保留当前模型中仍存在的变量
+- 解与求解器无关，COPT 求得的解可以作为 Gurobi 的初始解，反之亦然
+- 报告中记录热启动的来源、变量覆盖率，以及与冷启动相比首个可行解时间和总求解时间的变化
+
+详细中文注释:
+解向量以 zlib 压缩的 JSON 保存在 SQLite 的 BLOB 字段中，每个实例名称最多保留
+MAX_SOLUTIONS_PER_INSTANCE 个解 (优先保留目标值好的)。冷启动基准取同一内容哈希下最近一次
+未使用热启动的求解记录。使用 --no-warm-start 可以关闭自动热启动。
+"""
+import datetime
+import json
+import os
+import sqlite3
+import sys
+import zlib
+
+DEFAULT_DB_PATH = os.path.join("cache", "warm_starts.db")
+MAX_SOLUTIONS_PER_INSTANCE = 5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS solutions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    instance TEXT,
+    content_hash TEXT,
+    solver TEXT,
+    sense INTEGER,
+    objective REAL,
+    status INTEGER,
+    solve_time REAL,
+    first_incumbent_time REAL,
+    warm_started INTEGER,
+    num_values INTEGER,
+    saved_at TEXT,
+    solution BLOB
+);
+CREATE INDEX IF NOT EXISTS solutions_hash ON solutions(content_hash);
+CREATE INDEX IF NOT EXISTS solutions_instance ON solutions(instance);
+"""
+
+_META_COLUMNS = ("id", "instance", "content_hash", "solver", "sense", "objective", "status", "solve_time",
+                 "first_incumbent_time", "warm_started", "num_values", "saved_at")
+
+
+def instance_name(path):
+    """实例名称 (不含目录和扩展名)，用于匹配被修改过的实例"""
+    name = os.path.basename(path)
+    for ext in (".gz", ".bz2", ".xz", ".mps", ".qps"):
+        if name.lower().endswith(ext):
+            name = name[:-len(ext)]
+    return name
+
+
+class WarmStartStore:
+    """
+    热启动解库
+
+    参数:
+    db_path - 数据库文件路径
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def _fetch(self, where, params, order):
+        row = self.conn.execute(
+            f"SELECT {', '.join(_META_COLUMNS)}, solution FROM solutions WHERE {where} ORDER BY {order} LIMIT 1",
+            params).fetchone()
+        if row is None:
+            return None
+        record = dict(zip(_META_COLUMNS, row[:-1]))
+        record['solution'] = json.loads(zlib.decompress(row[-1]))
+        return record
+
+    def best(self, content_hash, name, sense):
+        """
+        查找最适合作为初始解的历史解
+
+        参数:
+        content_hash - 当前实例的内容哈希
+        name - 当前实例名称
+        sense - 优化方向 (1 最小化, -1 最大化)
+
+        返回:
+        解记录 (dict，含 solution 和 match: "exact" / "name")，没有时返回 None
+        """
+        record = self._fetch("content_hash = ?", (content_hash,), f"objective * {int(sense)}, id DESC")
+        if record is not None:
+            record['match'] = "exact"
+            return record
+        record = self._fetch("instance = ?", (name,), "id DESC")
+        if record is not None:
+            record['match'] = "name"
+        return record
+
+    def baseline(self, content_hash):
+        """同一实例最近一次冷启动 (未使用热启动) 的求解记录，用于对比"""
+        row = self.conn.execute(
+            "SELECT solve_time, first_incumbent_time, solver FROM solutions "
+            "WHERE content_hash = ? AND warm_started = 0 ORDER BY id DESC LIMIT 1", (content_hash,)).fetchone()
+        if row is None:
+            return None
+        return {'solve_time': row[0], 'first_incumbent_time': row[1], 'solver': row[2]}
+
+    def record(self, name, content_hash, solver, sense, objective, status, solve_time,
+               first_incumbent_time, warm_started, solution):
+        """保存一次求解得到的解，并清理该实例多余的旧解"""
+        blob = zlib.compress(json.dumps(solution).encode('utf-8'), 6)
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO solutions (instance, content_hash, solver, sense, objective, status, solve_time, "
+                "first_incumbent_time, warm_started, num_values, saved_at, solution) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (name, content_hash, solver, int(sense), objective, status, solve_time, first_incumbent_time,
+                 int(bool(warm_started)), len(solution), datetime.datetime.now().isoformat(timespec='seconds'),
+                 blob))
+            # 保留目标值最好的若干个解，另外保留每个内容哈希最近的冷启动记录作为对比基准
+            keep = self.conn.execute(
+                f"SELECT id FROM solutions WHERE instance = ? ORDER BY objective * {int(sense)}, id DESC LIMIT ?",
+                (name, MAX_SOLUTIONS_PER_INSTANCE)).fetchall()
+            baselines = self.conn.execute(
+                "SELECT MAX(id) FROM solutions WHERE instance = ? AND warm_started = 0 GROUP BY content_hash",
+                (name,)).fetchall()
+            ids = {r[0] for r in keep} | {r[0] for r in baselines}
+            self.conn.execute(
+                f"DELETE FROM solutions WHERE instance = ? AND id NOT IN ({','.join('?' for _ in ids)})",
+                [name] + list(ids))
+
+
+def remap(solution, names):
+    """
+    按变量名把历史解映射到当前模型
+
+    返回:
+    (当前模型中存在的变量的取值 dict, 覆盖率 = 映射到的变量数 / 当前模型变量数)
+    """
+    mapped = {name: solution[name] for name in names if name in solution}
+    coverage = len(mapped) / len(names) if names else 0.0
+    return mapped, coverage
+
+
+class WarmStartInfo:
+    """一次求解的热启动信息，用于终端输出和报告"""
+
+    def __init__(self, record, coverage, baseline):
+        self.match = record['match']
+        self.objective = record['objective']
+        self.source_solver = record['solver']
+        self.saved_at = record['saved_at']
+        self.coverage = coverage
+        self.baseline = baseline
+
+    def describe(self):
+        source = "同一实例" if self.match == "exact" else "同名的旧版本实例 (按变量名映射)"
+        return (f"热启动: 使用{source}的历史解 (目标值 {self.objective:.8g}, {self.source_solver} 求得, "
+                f"保存于 {self.saved_at}, 变量覆盖率 {self.coverage * 100:.1f}%)")
+
+    def to_latex(self, first_incumbent_time, solve_time):
+        """生成热启动章节，对比冷启动的首个可行解时间和总求解时间"""
+        source = "同一实例" if self.match == "exact" else "同名的旧版本实例 (按变量名重新映射)"
+        latex = "\\section{热启动}\n\n"
+        latex += "\\begin{itemize}\n"
+        latex += f"\\item 初始解来源: {source}，由 {self.source_solver} 求得 (保存于 {self.saved_at})\n"
+        latex += f"\\item 初始解目标值: {self.objective:.8g}\n"
+        latex += f"\\item 变量覆盖率: {self.coverage * 100:.1f}\\%\n"
+        latex += "\\end{itemize}\n\n"
+        if self.baseline is None:
+            latex += "解库中没有该实例的冷启动记录，无法对比求解时间。\n\n"
+            return latex
+        latex += "\\begin{table}[h!]\n\\centering\n\\begin{tabular}{lrrr}\n\\toprule\n"
+        latex += "\\textbf{指标} & \\textbf{冷启动} & \\textbf{热启动} & \\textbf{减少} \\\\\n\\midrule\n"
+        rows = (("首个可行解时间 (秒)", self.baseline['first_incumbent_time'], first_incumbent_time),
+                ("总求解时间 (秒)", self.baseline['solve_time'], solve_time))
+        for label, cold, warm in rows:
+            if cold is None or warm is None:
+                latex += f"{label} & {_fmt(cold)} & {_fmt(warm)} & -- \\\\\n"
+                continue
+            reduction = (cold - warm) / cold * 100 if cold > 0 else 0.0
+            latex += f"{label} & {cold:.3f} & {warm:.3f} & {reduction:.1f}\\% \\\\\n"
+        latex += "\\bottomrule\n\\end{tabular}\n\\caption{热启动效果 (冷启动为同一实例最近一次未使用热启动的求解)}\n"
+        latex += "\\end{table}\n\n"
+        return latex
+
+
+def _fmt(value):
+    return "--" if value is None else f"{value:.3f}"
+
+
+def find_warm_start(instance_path, names, sense, db_path=DEFAULT_DB_PATH, content_hash=None):
+    """
+    为当前实例查找热启动解
+
+    参数:
+    instance_path - 实例文件路径
+    names - 当前模型的变量名列表
+    sense - 优化方向 (1 最小化, -1 最大化)
+    content_hash - 实例文件的哈希 (省略时读取文件计算)
+
+    返回:
+    (映射后的取值 dict, WarmStartInfo)，没有可用的历史解时返回 (None, None)
+    """
+    import result_cache
+    try:
+        content_hash = content_hash or result_cache.file_hash(instance_path)
+        store = WarmStartStore(db_path)
+        try:
+            record = store.best(content_hash, instance_name(instance_path), sense)
+            if record is None:
+                return None, None
+            values, coverage = remap(record['solution'], names)
+            if not values:
+                return None, None
+            return values, WarmStartInfo(record, coverage, store.baseline(content_hash))
+        finally:
+            store.close()
+    except (sqlite3.Error, OSError, ValueError) as e:
+        print(f"读取热启动解库失败: {e}")
+        return None, None
+
+
+def save_solution(instance_path, solver, sense, objective, status, solve_time, first_incumbent_time,
+                  warm_started, solution, db_path=DEFAULT_DB_PATH, content_hash=None):
+    """把本次求解得到的解保存到解库 (失败时只打印警告)，content_hash 为实例文件的哈希 (省略时读取文件计算)"""
+    import result_cache
+    try:
+        content_hash = content_hash or result_cache.file_hash(instance_path)
+        store = WarmStartStore(db_path)
+        try:
+            store.record(instance_name(instance_path), content_hash, solver, sense,
+                         objective, status, solve_time, first_incumbent_time, warm_started, solution)
+        finally:
+            store.close()
+    except (sqlite3.Error, OSError) as e:
+        print(f"保存热启动解失败: {e}")
+
+
+def from_argv(argv=None):
+    """从命令行参数中取出 --no-warm-start (原地删除)，返回是否启用热启动"""
+    argv = sys.argv if argv is None else argv
+    if '--no-warm-start' in argv:
+        argv.remove('--no-warm-start')
+        return False
+    return True